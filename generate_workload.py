@@ -2,9 +2,14 @@ import argparse
 import sys
 import json
 
+import numpy as np
+
+from sebs.experiments.schedule import write_columnar
+
 args = argparse.ArgumentParser()
 args.add_argument("--scale", type=float, default=0.001, help="Scaling the workload")
 args.add_argument("--duration", type=int, default=1, help="How many minutes to run the workload for")
+args.add_argument("--output", type=str, default="generated_schedule.json", help="Output destination, a directory unless it ends with .json")
 opts = args.parse_args()
 
 schedule_config = {"functions": []}
@@ -20,9 +25,9 @@ SCALE = opts.scale
 DURATION = opts.duration
 
 fn_statistics = {}
+fn_invocations = {}
 
 for fn_name in fns.keys():
-    fn_sub_dict = {"name": fn_name}
     invocations = []  # Contain scheduled trigger in nanoseconds starting from origin
     origin = 0
     for i in range(DURATION):
@@ -31,17 +36,20 @@ for fn_name in fns.keys():
         if num_invocations == 0:
             continue
         interval = int(ONE_MINUTE / num_invocations)
-        for inv in range(num_invocations):
-            timestamp = origin + interval * inv
-            invocations.append(timestamp)
+        invocations.append(origin + interval * np.arange(num_invocations, dtype=np.int64))
         origin += ONE_MINUTE
-    fn_sub_dict["invocations"] = invocations
-    schedule_config["functions"].append(fn_sub_dict)
+    fn_invocations[fn_name] = np.concatenate(invocations) if invocations else np.zeros(0, np.int64)
     
-    fn_statistics[fn_name] = len(invocations)
+    fn_statistics[fn_name] = len(fn_invocations[fn_name])
 
-with open("generated_schedule.json", "w") as fp:
-    json.dump(schedule_config, fp, indent=4)
+if opts.output.endswith(".json"):
+    for fn_name, invocations in fn_invocations.items():
+        schedule_config["functions"].append({"name": fn_name, "invocations": invocations.tolist()})
+    with open(opts.output, "w") as fp:
+        json.dump(schedule_config, fp, indent=4)
+else:
+    # Columnar schedule for long traces
+    write_columnar(opts.output, fn_invocations)
 
 # Print some statistics
 statistics = f"Generated workload: scale={SCALE}, duration={DURATION}minutes"
@@ -5,13 +5,15 @@ import argparse
 import random
 from collections import defaultdict
 
+from sebs.experiments.schedule import write_columnar
+
 ONE_SECOND = 1_000_000_000
 
 parser = argparse.ArgumentParser("Generate Inter-arrival-times (IATs) schedule")
 parser.add_argument("-l", "--lambda_rate", default=4, type=int, help="Lambda rate for poisson per minute")
 parser.add_argument("-d", "--duration", default=1, type=int, help="Duration of schedule in minutes")
 parser.add_argument("-e", "--events", default="events.json", help="JSON file containing candidate serverless functions and their corresponding probabilities")
-parser.add_argument("-o", "--output_file", default="schedule.json", help="Output destination")
+parser.add_argument("-o", "--output_file", default="schedule.json", help="Output destination, a directory unless it ends with .json")
 parser.add_argument("-s", "--seed", default=42, type=int, help="Random seed")
 options = parser.parse_args()
 
@@ -65,8 +67,14 @@ def generate_poisson_workload(lambda_rate, duration_minutes, out_file: str):
     for fn_sub_dict in fn_dicts.values():
         schedule_config["functions"].append(fn_sub_dict)
     
-    with open(out_file, "w") as outf:
-        json.dump(schedule_config, outf, indent=4)
+    if out_file.endswith(".json"):
+        with open(out_file, "w") as outf:
+            json.dump(schedule_config, outf, indent=4)
+    else:
+        # Columnar schedule for long traces
+        write_columnar(
+            out_file, {name: fn["invocations"] for name, fn in fn_dicts.items()}
+        )
             
     max_width = max(len(fn_name) for fn_name in raw_counts.keys()) + 1
     print("*" * 20)
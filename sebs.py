@@ -2,36 +2,37 @@ import json
 import logging
 import functools
 import os
+import queue
 import traceback
-from typing import cast, Optional, List
+from typing import cast, Optional, List, Set, TYPE_CHECKING
 from datetime import datetime, timedelta
 import time
 import subprocess
 import sys
 import signal
 import shutil
-import matplotlib.pyplot as plt
+import tempfile
+import threading
 
-from multiprocessing import Process, Queue
-from dataclasses import dataclass
-from tqdm import tqdm
-import numpy as np
-
-from multiprocessing.pool import ThreadPool
+from collections import Counter
 
 import click
 
 import sebs
 from sebs import SeBS
 import sebs.experiments
-from sebs.experiments.schedule import ScheduleObject, ScheduleConfig
+from sebs.build_pipeline import BuildPipeline, step
+from sebs.experiments.archive import ARCHIVE_EXTENSION
 from sebs.types import Storage as StorageTypes
-from sebs.regression import regression_suite
 from sebs.utils import update_nested_dict, catch_interrupt
 from sebs.faas import System as FaaSSystem
-from sebs.faas.function import Trigger
+from sebs.faas.function import ExecutionResult, Trigger, NonBlockingExecutionResult
 import sebs.utils
 
+# Experiment drivers, NumPy and multiprocessing are imported by the commands using them
+if TYPE_CHECKING:
+    from sebs.experiments.schedule import ScheduleConfig
+
 
 PROJECT_DIR = os.path.dirname(os.path.realpath(__file__))
 
@@ -69,6 +70,13 @@ def simplified_common_params(func):
         default=os.path.join(os.path.curdir, "cache"),
         help="Location of experiments cache.",
     )
+    @click.option(
+        "--cache-backend",
+        default=None,
+        type=click.Choice(["json", "sqlite"]),
+        help="Store of the cache, JSON files or an SQLite database; "
+        "a cache with a database keeps using it.",
+    )
     @click.option("--verbose/--no-verbose", default=False, help="Verbose output.")
     @click.option(
         "--preserve-out/--no-preserve-out",
@@ -120,6 +128,181 @@ def common_params(func):
     return wrapper
 
 
+def schedule_params(func):
+    @click.option(
+        "--merge_schedule",
+        multiple=True,
+        type=str,
+        help="Additional schedule replayed together with the main one, can be repeated.",
+    )
+    @click.option(
+        "--window_begin",
+        default=None,
+        type=float,
+        help="Replay only invocations after this many seconds of the trace.",
+    )
+    @click.option(
+        "--window_end",
+        default=None,
+        type=float,
+        help="Replay only invocations before this many seconds of the trace.",
+    )
+    @click.option(
+        "--time_warp",
+        default=None,
+        type=float,
+        help="Speed up (> 1) or slow down (< 1) the trace by this factor.",
+    )
+    @click.option(
+        "--target_rps",
+        default=None,
+        type=float,
+        help="Drop or repeat invocations to reach this request rate, keeping bursts.",
+    )
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def load_schedule(
+    sebs_client: SeBS,
+    schedule_config: str,
+    merge_schedule: List[str],
+    window_begin: Optional[float],
+    window_end: Optional[float],
+    time_warp: Optional[float],
+    target_rps: Optional[float],
+) -> "ScheduleConfig":
+    """
+    Load JSON or columnar schedules and apply transforms in order:
+    merge, window, time warp and rate.
+    """
+    from sebs.experiments.schedule import ScheduleSpec
+
+    schedule = ScheduleSpec(
+        [schedule_config, *merge_schedule], window_begin, window_end, time_warp, target_rps
+    ).load()
+    for fn_name, count in schedule.unsorted.items():
+        sebs_client.logging.warning(
+            f"Invocations of {fn_name} are not sorted, {count} out of order"
+        )
+    sebs_client.logging.info(
+        f"Schedule with {len(schedule)} invocations over "
+        f"{schedule.duration / 1_000_000_000:.1f} seconds, {schedule.rps:.2f} requests/sec"
+    )
+    return schedule
+
+
+def _save_result(
+    result: "sebs.experiments.ExperimentResult", path: str, benchmark: str, export: Optional[str]
+) -> str:
+    """
+    Store invocations in the columnar format, optionally with the complete result exported
+    as JSON or as a compressed archive, and close the log of the result.
+    Returns the path of the columnar file.
+    """
+    result.save_records(f"{path}.npz")
+    if export == "json":
+        with open(f"{path}.json", "w") as out_f:
+            out_f.write(sebs.utils.serialize(result))
+    elif export == "archive":
+        result.save_archive(f"{path}{ARCHIVE_EXTENSION}", benchmark)
+    result.close_log()
+    return f"{path}.npz"
+
+
+def prewarm_params(func):
+    @click.option(
+        "--prewarm",
+        default=0,
+        type=int,
+        help="Warm containers of each function started before the experiment, 0 disables.",
+    )
+    @click.option(
+        "--invokers",
+        default=1,
+        type=int,
+        help="Number of invoker instances, limits the number of warm containers.",
+    )
+    @click.option(
+        "--invoker_memory",
+        default=2048,
+        type=int,
+        help="Memory of the container pool of each invoker in MB.",
+    )
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def timeline_params(func):
+    @click.option(
+        "--timeline_window",
+        default=10.0,
+        type=float,
+        help="Length of windows of the throughput and latency timeline, in seconds.",
+    )
+    @click.option(
+        "--plot_timeline",
+        is_flag=True,
+        default=False,
+        help="Plot the timeline to timeline.png.",
+    )
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _prewarm(
+    triggers_m: dict,
+    containers: int,
+    invokers: int,
+    invoker_memory: int,
+    result_dir: str,
+    export: Optional[str],
+    experiment_config,
+    sebs_client: SeBS,
+    deployment_client: FaaSSystem,
+):
+    """
+    Bring each function to the requested number of warm containers.
+    Warm-up invocations are stored in separate files and excluded from metrics.
+    """
+    from sebs.experiments.prewarm import Prewarmer, max_concurrency, plan_containers
+    if containers <= 0:
+        return
+    memory = {
+        benchmark: triggers_m[benchmark]["function"].config.memory
+        for benchmark in triggers_m.keys()
+    }
+    plan = plan_containers(containers, memory, invokers, invoker_memory)
+    sebs_client.logging.info(
+        f"Warming up at most {max_concurrency(invokers, invoker_memory)} containers "
+        f"of 128 MB: {plan}"
+    )
+    prewarmer = Prewarmer(
+        lambda fn_name: triggers_m[fn_name]["trigger"].sync_invoke(triggers_m[fn_name]["input"])
+    )
+    prewarmer.logging_handlers = sebs_client.logging_handlers
+    for benchmark, rets in prewarmer.run(plan).items():
+        result = sebs.experiments.ExperimentResult(experiment_config, deployment_client.config)
+        result.begin()
+        for ret in rets:
+            result.add_invocation(triggers_m[benchmark]["function"], ret.executionResult)
+        result.end()
+        _save_result(
+            result, os.path.join(result_dir, f"warmup_{benchmark}"), benchmark, export
+        )
+        # Measured window starts after the warm-up
+        triggers_m[benchmark]["result"].begin_measurement()
+
+
 def parse_common_params(
     config,
     output_dir,
@@ -135,7 +318,8 @@ def parse_common_params(
     resource_prefix: Optional[str] = None,
     initialize_deployment: bool = True,
     ignore_cache: bool = False,
-    storage_configuration: Optional[str] = None
+    storage_configuration: Optional[str] = None,
+    cache_backend: Optional[str] = None,
 ):
 
     global sebs_client, deployment_client
@@ -143,7 +327,7 @@ def parse_common_params(
     os.makedirs(output_dir, exist_ok=True)
     logging_filename = os.path.abspath(os.path.join(output_dir, output_file))
 
-    sebs_client = sebs.SeBS(cache, output_dir, verbose, logging_filename)
+    sebs_client = sebs.SeBS(cache, output_dir, verbose, logging_filename, cache_backend)
     output_dir = sebs.utils.create_output(output_dir, preserve_out, verbose)
     
     sebs_client.logging.info("Created experiment output at {}".format(output_dir))
@@ -221,6 +405,12 @@ def benchmark():
     type=str,
     help="Attach prefix to generated Docker image tag.",
 )
+@click.option(
+    "--result-format",
+    type=click.Choice(["json", "archive"]),
+    default="json",
+    help="Write results as JSON, read by benchmark process, or as a compressed archive.",
+)
 @common_params
 def invoke(
     benchmark,
@@ -231,6 +421,7 @@ def invoke(
     timeout,
     function_name,
     image_tag_prefix,
+    result_format,
     **kwargs,
 ):
 
@@ -265,6 +456,7 @@ def invoke(
     input_config = benchmark_obj.prepare_input(storage=storage, size=benchmark_input_size)
 
     result = sebs.experiments.ExperimentResult(experiment_config, deployment_client.config)
+    result.stream_to(os.path.join(output_dir, f"{benchmark}_experiments.jsonl"))
     result.begin()
 
     trigger_type = Trigger.TriggerType.get(trigger)
@@ -285,11 +477,85 @@ def invoke(
         result.add_invocation(func, ret)
     result.end()
 
-    result_file = os.path.join(output_dir, f"{benchmark}_experiments.json")
-    with open(result_file, "w") as out_f:
-        out_f.write(sebs.utils.serialize(result))
+    if result_format == "archive":
+        # Named like the JSON result, which statistics of a directory are keyed by
+        result_file = os.path.join(output_dir, f"{benchmark}_experiments{ARCHIVE_EXTENSION}")
+        result.save_archive(result_file, f"{benchmark}_experiments")
+    else:
+        result_file = os.path.join(output_dir, f"{benchmark}_experiments.json")
+        with open(result_file, "w") as out_f:
+            out_f.write(sebs.utils.serialize(result))
+    result.close_log()
     sebs_client.logging.info("Save results to {}".format(os.path.abspath(result_file)))
     
+def _prepare_triggers(
+    fns: List[str],
+    trigger_t: str,
+    memory: Optional[int],
+    timeout: Optional[int],
+    experiment_config,
+    sebs_client: SeBS,
+    deployment_client: FaaSSystem,
+    logging_filename: Optional[str],
+    deploy_workers: int = 1,
+) -> dict:
+    """
+    Deploy each function of the schedule and prepare its trigger, input and result.
+    Functions are built and deployed by deploy_workers concurrent workers.
+    """
+    storage = deployment_client.get_storage(replace_existing=experiment_config.update_storage)
+    trigger_type = Trigger.TriggerType.get(trigger_t)
+    # Storage keeps the state of the benchmark whose input is being prepared
+    input_lock = threading.Lock()
+
+    def deploy(benchmark: str) -> dict:
+        with step("cache query"):
+            benchmark_obj = sebs_client.get_benchmark(
+                benchmark,
+                deployment_client,
+                experiment_config,
+                logging_filename=logging_filename
+            )
+        # TODO: Make this better
+        if memory is not None:
+            benchmark_obj.benchmark_config.memory = memory
+        if timeout is not None:
+            benchmark_obj.benchmark_config.timeout = timeout
+
+        with step("function"):
+            func = deployment_client.get_function(
+                benchmark_obj,
+                deployment_client.default_function_name(benchmark_obj),
+            )
+        # TODO: Make this individual
+        with input_lock, step("input upload"):
+            input_config = benchmark_obj.prepare_input(storage=storage, size="small")
+
+        result = sebs.experiments.ExperimentResult(experiment_config, deployment_client.config)
+        result.begin()
+
+        with step("trigger"):
+            triggers = func.triggers(trigger_type)
+            if len(triggers) == 0:
+                trigger = deployment_client.create_trigger(func, trigger_type)
+            else:
+                trigger = triggers[0]
+        return {"trigger": trigger, "function": func, "input": input_config, "result": result}
+
+    # Cached configs are written once all functions are deployed
+    with sebs_client.cache_client.batch():
+        return BuildPipeline(deploy_workers).run(fns, deploy)
+
+
+def deploy_params(func):
+    return click.option(
+        "--deploy_workers",
+        default=4,
+        type=int,
+        help="Number of functions built and deployed concurrently.",
+    )(func)
+
+
 """
 Schedule invocations with a json file of the format:
 {
@@ -341,6 +607,29 @@ Force usage of library. Exposing action as http prevents simple non-blocking usa
     type=str,
     help="Results directory"
 )
+@click.option(
+    "--max_inflight",
+    default=256,
+    type=int,
+    help="Maximum number of invocation requests being sent at the same time.",
+)
+@click.option(
+    "--collect_parallelism",
+    default=32,
+    type=int,
+    help="Maximum number of concurrent requests when collecting activation results.",
+)
+@click.option(
+    "--export",
+    type=click.Choice(["json", "archive"]),
+    default=None,
+    help="Export complete results as JSON or a compressed archive, in addition to the "
+    "columnar records.",
+)
+@schedule_params
+@prewarm_params
+@timeline_params
+@deploy_params
 @common_params
 def run_schedule(
     schedule_config,
@@ -348,8 +637,25 @@ def run_schedule(
     memory,
     timeout,
     result_dir,
+    max_inflight,
+    collect_parallelism,
+    merge_schedule,
+    window_begin,
+    window_end,
+    time_warp,
+    target_rps,
+    prewarm,
+    invokers,
+    invoker_memory,
+    export,
+    timeline_window,
+    plot_timeline,
+    deploy_workers,
     **kwargs,
 ):
+    from sebs.experiments.dispatcher import ScheduleDispatcher
+    from sebs.experiments.schedule import ScheduleObject
+    from sebs.openwhisk.collector import ActivationCollector
     (
         config,
         output_dir,
@@ -359,81 +665,81 @@ def run_schedule(
     ) = parse_common_params(**kwargs)
     
     experiment_config = sebs_client.get_experiment_config(config["experiments"])
-    with open(schedule_config, "r") as fp:
-        schedule_config = json.load(fp)
-    schedule_config = sebs_client.get_schedule_config(schedule_config)
+    schedule_config = load_schedule(
+        sebs_client,
+        schedule_config,
+        merge_schedule,
+        window_begin,
+        window_end,
+        time_warp,
+        target_rps,
+    )
 
     if os.path.exists(result_dir):
         shutil.rmtree(result_dir)
     os.mkdir(result_dir)
 
     # Loop and set up each benchmark trigger
-    triggers_m = {}
-    for benchmark in schedule_config.fns:
-        update_nested_dict(config, ["experiments", "benchmark"], benchmark)
-        benchmark_obj = sebs_client.get_benchmark(
-            benchmark,
-            deployment_client,
-            experiment_config,
-            logging_filename=logging_filename
-        )
-        # TODO: Make this better
-        if memory is not None:
-            benchmark_obj.benchmark_config.memory = memory
-        if timeout is not None:
-            benchmark_obj.benchmark_config.timeout = timeout
-
-        func = deployment_client.get_function(
-            benchmark_obj,
-            deployment_client.default_function_name(benchmark_obj),
-        )
-        storage = deployment_client.get_storage(replace_existing=experiment_config.update_storage)
-        # TODO: Make this individual
-        input_config = benchmark_obj.prepare_input(storage=storage, size="small")
-        
-        result = sebs.experiments.ExperimentResult(experiment_config, deployment_client.config)
-        result.begin()
-        
-        trigger_type = Trigger.TriggerType.get(trigger_t)
-        triggers = func.triggers(trigger_type)
-        if len(triggers) == 0:
-            trigger = deployment_client.create_trigger(func, trigger_type)
-        else:
-            trigger = triggers[0]
-        print(f"{benchmark=}")
-        triggers_m[benchmark] = {}
-        triggers_m[benchmark]["trigger"] = trigger
-        triggers_m[benchmark]["function"] = func
-        triggers_m[benchmark]["input"] = input_config
-        triggers_m[benchmark]["result"] = result
+    triggers_m = _prepare_triggers(
+        schedule_config.fns,
+        trigger_t,
+        memory,
+        timeout,
+        experiment_config,
+        sebs_client,
+        deployment_client,
+        logging_filename,
+        deploy_workers,
+    )
+    for benchmark in triggers_m.keys():
         triggers_m[benchmark]["activation_ids"] = []
         triggers_m[benchmark]["success"] = 0
         triggers_m[benchmark]["failure"] = 0
+        triggers_m[benchmark]["result"].stream_to(
+            os.path.join(result_dir, f"experiments_scheduled_{benchmark}.jsonl")
+        )
+    _prewarm(
+        triggers_m,
+        prewarm,
+        invokers,
+        invoker_memory,
+        result_dir,
+        export,
+        experiment_config,
+        sebs_client,
+        deployment_client,
+    )
     
     # Scheduling main loop
-    invocation_start = time.time_ns()
-    for so in schedule_config.schedule:
-        now = time.time_ns()
-        scheduled_time = invocation_start + so.timestamp  # in nanoseconds
-        if scheduled_time > now:
-            delta_s = (scheduled_time - now) / 1_000_000_000
-            # sebs_client.logging.info(f"Sleeping for {delta_s} seconds")
-            time.sleep(delta_s)
-
-        sebs_client.logging.info(f"Invoking {so.fn_name} at {scheduled_time}")
-        trigger = triggers_m[so.fn_name]["trigger"] 
-        input_config = triggers_m[so.fn_name]["input"]
-        aids = triggers_m[so.fn_name]["activation_ids"]
-        
-        ret = trigger.openwhisk_nonblocking_invoke(input_config)
+    # Requests are dispatched at their scheduled time without waiting for
+    # earlier requests; at most max_inflight requests are being sent at once.
+    def invoke(fn_name: str):
+        return triggers_m[fn_name]["trigger"].openwhisk_nonblocking_invoke(
+            triggers_m[fn_name]["input"]
+        )
+
+    def dispatched(so: ScheduleObject, scheduled_time: int, send_time: int, ret):
+        if ret is None:
+            ret = NonBlockingExecutionResult()
+            ret.failure = True
+        sebs_client.logging.debug(f"Invoked {so.fn_name} scheduled at {scheduled_time}")
         # Store request time here
-        if "request_time" not in triggers_m[so.fn_name].keys():
-            triggers_m[so.fn_name]["request_time"] = {}
         if not ret.failure:
             triggers_m[so.fn_name]["request_time"][ret.request_id] = scheduled_time
-        aids.append(ret)
+            triggers_m[so.fn_name]["lateness"][ret.request_id] = send_time - scheduled_time
+            # Logged right away, an interrupted replay keeps the activations sent so far
+            triggers_m[so.fn_name]["result"].add_dispatch(
+                triggers_m[so.fn_name]["function"], ret.request_id, scheduled_time, send_time
+            )
+        triggers_m[so.fn_name]["activation_ids"].append(ret)
+
+    for benchmark in triggers_m.keys():
+        triggers_m[benchmark]["request_time"] = {}
+        triggers_m[benchmark]["lateness"] = {}
+    dispatcher = ScheduleDispatcher(invoke, max_inflight)
+    dispatcher.logging_handlers = sebs_client.logging_handlers
     # End of actual invocation duration, most likely will not be DURATION
-    invocation_end = time.time_ns()
+    invocation_start, invocation_end = dispatcher.run(schedule_config.schedule, dispatched)
 
     time.sleep(2)
     # Collect results main loop, can now block until result is done
@@ -441,29 +747,50 @@ def run_schedule(
     
     # Keep track of failures
     failures = {}
-    collection_start = time.time_ns()
+    pending = []
     for benchmark in triggers_m.keys():
         trigger = triggers_m[benchmark]["trigger"]
-        func = triggers_m[benchmark]["function"]
-        result = triggers_m[benchmark]["result"]
         for aid in triggers_m[benchmark]["activation_ids"]:
             if aid.request_id == "":
                 # Means that invocation attempt itself wasnt even successful
                 triggers_m[benchmark]["failure"] += 1
                 continue
-            
-            ret = trigger.parse_nb_results(aid)
-            if ret.stats.failure:
-                triggers_m[benchmark]["failure"] += 1
-                failures[ret.request_id] = ret.failureReason
-            else:
-                triggers_m[benchmark]["success"] += 1
-            result.add_invocation(func, ret.executionResult)
+            pending.append((benchmark, trigger, aid))
+
+    def collected(benchmark: str, ret):
+        times = ret.executionResult.times
+        times.sendLateness = triggers_m[benchmark]["lateness"][ret.request_id]
+        times.scheduled = triggers_m[benchmark]["request_time"][ret.request_id]
+        times.sent = times.scheduled + times.sendLateness
+        if ret.stats.failure:
+            triggers_m[benchmark]["failure"] += 1
+            failures[ret.request_id] = ret.failureReason
+        else:
+            triggers_m[benchmark]["success"] += 1
+        triggers_m[benchmark]["result"].add_invocation(
+            triggers_m[benchmark]["function"], ret.executionResult
+        )
+
+    collection_start = time.time_ns()
+    collector = ActivationCollector(parallelism=collect_parallelism)
+    collector.logging_handlers = sebs_client.logging_handlers
+    # Activations list API works in milliseconds, widen the window to cover clock skew
+    collector.collect(
+        pending,
+        collected,
+        since=invocation_start // 1_000_000 - 60_000,
+        upto=time.time_ns() // 1_000_000 + 60_000,
+    )
+    for benchmark in triggers_m.keys():
+        result = triggers_m[benchmark]["result"]
         result.end()
         # Save separately
-        result_file = os.path.join(result_dir, f"experiments_scheduled_{benchmark}.json")
-        with open(result_file, "w") as out_f:
-            out_f.write(sebs.utils.serialize(result))
+        result_file = _save_result(
+            result,
+            os.path.join(result_dir, f"experiments_scheduled_{benchmark}"),
+            benchmark,
+            export,
+        )
         sebs_client.logging.info("Save results to {}".format(os.path.abspath(result_file)))
 
     collection_end = time.time_ns()
@@ -476,16 +803,11 @@ def run_schedule(
         result_dir,
         invocation_start,
         invocation_end,
-        prefix="experiments_scheduled")
+        prefix="experiments_scheduled",
+        timeline_window=timeline_window,
+        plot_timeline=plot_timeline,
+    )
     
-def __convert_str_to_timestamp(ts: str):
-    seconds, microseconds = ts.split(".")
-    seconds = int(seconds)
-    microseconds = int(float('0.' + microseconds) * 1e6)
-    dt = datetime.fromtimestamp(seconds)
-    dt = dt + timedelta(microseconds=microseconds)
-    return dt
-
 def __convert_unix_to_timestamp(ts: int):
     # originally in nanosecond precision
     seconds = ts // 1e9
@@ -495,13 +817,15 @@ def __convert_unix_to_timestamp(ts: int):
     dt = dt + timedelta(microseconds=microseconds)
     return dt
     
-    
+
 def __analyze_schedule_results(
     triggers_m: dict, 
     result_dir: str,
     client_start: int,
     client_end: int,
     prefix: str,
+    timeline_window: float = 10.0,
+    plot_timeline: bool = False,
     ):
     """Calculates the following metrics
     From the main schedule script, we obtained the following metrics:
@@ -513,125 +837,100 @@ def __analyze_schedule_results(
     Func request -> queued -> Func invocation
 
     """
+    import numpy as np
+    from sebs.experiments import analysis
+
     result_f = open(os.path.join(result_dir, "results_log.txt"), "w")
     # Actual scheduling
     result_f.write("Done with schedule experiment\n")
     result_f.write(f"Start =  {client_start}\n")
     result_f.write(f"End   =  {client_end}\n")
     result_f.write(f"Actual scheduled duration was {(client_end-client_start)/1_000_000_000} seconds.\n")
-    
-    # Obtain actual invocation per second for experiment
-    earliest_invocation_start = None
-    latest_invocation_end = None
-    successful_invocations = 0
-    failed_invocations = 0
-    
+
+    successful_invocations = sum(triggers_m[benchmark]["success"] for benchmark in triggers_m)
+    failed_invocations = sum(triggers_m[benchmark]["failure"] for benchmark in triggers_m)
+
+    # All invocations are analyzed together, grouped by function
+    records = analysis.load(
+        [os.path.join(result_dir, f"{prefix}_{benchmark}.npz") for benchmark in triggers_m]
+    )
+    without_id = np.count_nonzero(records.empty("output_request_id"))
+    if without_id > 0:
+        print(f"Ignoring {without_id} failures w/o request id")
+    functions, overall = analysis.breakdown(analysis.measured(records))
+
     # Overall metrics for plotting stacked bar chart
     benchmarks = []
     overall_queueing_latencies = []
     overall_initialization_latencies = []
     overall_execution_latencies = []
-    total_num_warm = 0
-    total_num_cold = 0
-    
+    summary = {}
+
     # Benchmark specific metric
     for benchmark in triggers_m.keys():
-        with open(os.path.join(result_dir, f"{prefix}_{benchmark}.json")) as outf:
-            json_dict = json.load(outf)
         result_f.write("***********************************************\n")
         result_f.write(f"Statistics for {benchmark}\n")
         result_f.write(f"{triggers_m[benchmark]['success']} successes\n")
         result_f.write(f"{triggers_m[benchmark]['failure']} failures\n")
-        successful_invocations += triggers_m[benchmark]['success']
-        failed_invocations += triggers_m[benchmark]['failure']
-        
-        queueing_latencies = []  # in milliseconds
-        initialization_latencies = []  # in milliseconds
-        function_execution_durations = []  # in milliseconds
-        end_to_end_latencies = []  # in milliseconds
-        num_warm = 0
-        num_cold = 0
-        # If somehow not in _invocations
-        if len(json_dict["_invocations"].keys()) == 0:
+
+        stats = functions.get(triggers_m[benchmark]["function"].name)
+        if stats is None:
             print(f"No invocations for {benchmark}.")
             continue
         benchmarks.append(benchmark)
-        # Will only have one invocations key
-        invocation_key = list(json_dict["_invocations"].keys())[0]
-        
-        for key in json_dict["_invocations"][invocation_key].keys():
-            sub_result = json_dict["_invocations"][invocation_key][key]
-            if "request_id" not in sub_result["output"].keys():
-                print(f"Ignoring failure w/o request id")
-                continue
-            times = sub_result["times"]
-            
-            queueing_latency = times["waitTime"]
-            init_time = 0
-            
-            queueing_latencies.append(queueing_latency)
-            
-            if "initTime" in times:
-                init_time = times["initTime"]
-                num_cold += 1
-            else:
-                num_warm += 1
-            initialization_latencies.append(init_time)
-            
-            # Both are in string
-            invocation_began = __convert_str_to_timestamp(sub_result["output"]["begin"])
-            client_end = __convert_str_to_timestamp(sub_result["output"]["end"])
-            
-            if earliest_invocation_start is None or invocation_began < earliest_invocation_start:
-                earliest_invocation_start = invocation_began
-            if latest_invocation_end is None or client_end > latest_invocation_end:
-                latest_invocation_end = client_end
-                
-            function_duration = int((client_end - invocation_began) / timedelta(milliseconds=1))
-            function_execution_durations.append(function_duration)
-            
-            end_to_end_latency = queueing_latency + init_time + function_duration
-            end_to_end_latencies.append(end_to_end_latency)
-            
-        
-        queueing_latencies = np.array(queueing_latencies)
-        initialization_latencies = np.array(initialization_latencies)
-        function_execution_durations = np.array(function_execution_durations)
-        end_to_end_latencies = np.array(end_to_end_latencies)
-        result_f.write(f"Average queueing latency: {np.mean(queueing_latencies)}\n")
-        result_f.write(f"Average initialization latency: {np.mean(initialization_latencies)}\n")
-        result_f.write(f"Average function execution: {np.mean(function_execution_durations)}\n")
-        result_f.write(f"Num warm: {num_warm}\n")
-        result_f.write(f"Num cold: {num_cold}\n")
-        result_f.write(f"End to end latency: {np.mean(end_to_end_latencies)}\n")
+        summary[benchmark] = stats.serialize()
+        lat = stats.latencies
+
+        result_f.write(f"Average queueing latency: {lat['queueing'].mean}\n")
+        result_f.write(f"Average initialization latency: {lat['initialization'].mean}\n")
+        result_f.write(f"Average function execution: {lat['execution'].mean}\n")
+        result_f.write(f"Num warm: {stats.num_warm}\n")
+        result_f.write(f"Num cold: {stats.num_cold}\n")
+        result_f.write(f"Server-side latency: {lat['server_side'].mean}\n")
+        result_f.write(f"End to end latency: {lat['end_to_end'].mean}\n")
+        __write_latencies(result_f, lat)
         result_f.write("***********************************************\n")
-        
-        overall_queueing_latencies.append(np.mean(queueing_latencies))
-        overall_initialization_latencies.append(np.mean(initialization_latencies))
-        overall_execution_latencies.append(np.mean(function_execution_durations))
-        total_num_warm += num_warm
-        total_num_cold += num_cold
+
+        overall_queueing_latencies.append(lat["queueing"].mean)
+        overall_initialization_latencies.append(lat["initialization"].mean)
+        overall_execution_latencies.append(lat["execution"].mean)
 
     # Actual requests/sec
+    earliest_invocation_start = latest_invocation_end = None
+    if overall.count > 0:
+        earliest_invocation_start = datetime.fromtimestamp(overall.begin)
+        latest_invocation_end = datetime.fromtimestamp(overall.end)
     result_f.write(f"Actual invocation start: {earliest_invocation_start}\n")
     result_f.write(f"Actual invocation end: {latest_invocation_end}\n")
     
     total = successful_invocations + failed_invocations
-    percent_succ = float(successful_invocations/total * 100)
-    percent_fail = float(failed_invocations/total * 100)
+    percent_succ = float(successful_invocations/total * 100) if total > 0 else 0.0
+    percent_fail = float(failed_invocations/total * 100) if total > 0 else 0.0
     
     result_f.write(f"Num successful invocations {successful_invocations}\n")
     result_f.write(f"% successful invocations {percent_succ:.3f}\n")
     result_f.write(f"Num failed invocations {failed_invocations}\n")
     result_f.write(f"% failed invocations {percent_fail:.3f}\n")
     
-    result_f.write(f"Num warm invocations {total_num_warm}\n")
-    result_f.write(f"Num cold invocations {total_num_cold}\n")
-    result_f.write(f"% Warm invocations {total_num_warm/(total_num_warm + total_num_cold) * 100.0}\n")
+    result_f.write(f"Num warm invocations {overall.num_warm}\n")
+    result_f.write(f"Num cold invocations {overall.num_cold}\n")
+    if overall.count > 0:
+        result_f.write(f"% Warm invocations {overall.num_warm / overall.count * 100.0}\n")
+    __write_latencies(result_f, overall.latencies)
+    summary["overall"] = overall.serialize()
+    with open(os.path.join(result_dir, "results_summary.json"), "w") as out_f:
+        json.dump(summary, out_f, indent=2)
     
-    invocation_delta = int((latest_invocation_end - earliest_invocation_start) / timedelta(seconds=1))
-    result_f.write(f"Actual invocations/second: {successful_invocations / invocation_delta}\n")
+    invocation_delta = overall.end - overall.begin if overall.count > 0 else 0
+    if invocation_delta > 0:
+        result_f.write(f"Actual invocations/second: {successful_invocations / invocation_delta}\n")
     result_f.close()
+
+    # Throughput and latency over time, e.g., while invokers are scaled
+    table = analysis.timeline(analysis.measured(records), timeline_window)
+    analysis.write_timeline(os.path.join(result_dir, "timeline.csv"), table)
+    if plot_timeline and len(table["begin"]) > 0:
+        plot_timeline_windows(table, result_dir)
     plot_function_breakdown(benchmarks,
                             overall_queueing_latencies,
                             overall_initialization_latencies,
@@ -639,6 +938,45 @@ def __analyze_schedule_results(
                             result_dir)  
 
 
+def __write_latencies(result_f, latencies: dict):
+    """Percentiles of latencies of a function or of all invocations, in milliseconds."""
+    labels = {
+        "queueing": "Queueing latency",
+        "initialization": "Initialization latency",
+        "execution": "Function execution",
+        "server_side": "Server-side latency",
+        "end_to_end": "End to end latency",
+        "send_lateness": "Send lateness",
+    }
+    for name, label in labels.items():
+        if latencies[name].count > 0:
+            result_f.write(f"{label} (ms): {latencies[name]}\n")
+
+
+def plot_timeline_windows(table: dict, result_dir: str):
+    from sebs.experiments import analysis
+    import matplotlib.pyplot as plt
+
+    fig, (rates, in_flight, latency) = plt.subplots(3, 1, sharex=True, figsize=(8, 8))
+    rates.plot(table["begin"], table["arrival_rate"], label="Arrivals")
+    rates.plot(table["begin"], table["completion_rate"], label="Completions")
+    rates.set_ylabel("Requests/s")
+    rates.legend(loc="upper right")
+    in_flight.plot(table["begin"], table["in_flight"], label="In flight")
+    in_flight.set_ylabel("Requests")
+    cold = in_flight.twinx()
+    cold.plot(table["begin"], table["cold_fraction"], color="tab:red", label="Cold starts")
+    cold.set_ylabel("Cold start fraction")
+    for p in analysis.TIMELINE_PERCENTILES:
+        latency.plot(table["begin"], table[f"latency_p{p:g}"], label=f"p{p:g}")
+    latency.set_ylabel("Latency from schedule [ms]")
+    latency.set_xlabel("Time [s]")
+    latency.legend(loc="upper right")
+    fig.tight_layout()
+    fig.savefig(os.path.join(result_dir, "timeline.png"), bbox_inches="tight", dpi=100)
+    plt.close(fig)
+
+
 def plot_function_breakdown(
     benchmarks,
     overall_queueing_latencies,
@@ -646,6 +984,9 @@ def plot_function_breakdown(
     overall_execution_latencies,
     result_dir
 ):
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     bars = {
         "Queueing": np.array(overall_queueing_latencies),
         "Initialization": np.array(overall_initialization_latencies),
@@ -665,78 +1006,243 @@ def plot_function_breakdown(
     plt.show()
     plt.savefig(os.path.join(result_dir, "results.png"), bbox_inches="tight", dpi=100)
 
-def _split_schedule(n: int, root_schedule: ScheduleConfig):
-    """
-    Split the schedule into n workers
-    We use a simple round robin distribution to distribute the schedule uniformly.
-    This could be changed to some more sophisticated distribution
-    """
-    schedules = [[] for _ in range(n)]
-    for i, so in enumerate(root_schedule.schedule):
-        idx = i % n
-        schedules[idx].append(so)
-    return schedules
-
-def worker_thread(idx: int, triggers: dict, schedule: List[ScheduleObject], queue: Queue):
-    """Closed loop worker thread with latency correction"""
-    # Scheduling worker loop
-    invocation_start = time.time_ns()
-    counters = {}  # dict of success/failure counter
-    rets = {}  # dict of ExecutionResult
-    for fn_name in triggers.keys():
-        counters[fn_name] = {
-            "success": 0,
-            "failure": 0
-        }
-        rets[fn_name] = []
-    for i, so in enumerate(schedule):
-        now = time.time_ns()
-        scheduled_time = invocation_start + so.timestamp
-        waiting_time = 0
-        if scheduled_time > now:
-            # We are on track, so sleep until desired time
-            delta_s = (scheduled_time - now) / 1_000_000_000
-            time.sleep(delta_s)
-        else:
-            # scheduled_time <= now
-            # We are behind, so we need to account that in our latency
-            waiting_time = now - scheduled_time
-        trigger = triggers[so.fn_name]["trigger"]
-        input_config = triggers[so.fn_name]["input"]
-        
-        # Modified to return OpenWhisk wrapper
-        ret = trigger.sync_invoke(input_config)
-        try:
-            if ret.executionResult.stats.failure:
-                counters[so.fn_name]["failure"] += 1
-            else:
-                # TODO: Is this actually correct?
-                ret.executionResult.times.latencyCorrection = waiting_time
-                counters[so.fn_name]["success"] += 1
-        except KeyError as e:
-            print(f"key error with {so.fn_name}")
-            print("All keys are ")
-            for key in counters.keys():
-                print(key)
-        rets[so.fn_name].append(ret.executionResult)
-    print(f"Worker {idx} is done with schedule.")
-    invocation_end = time.time_ns()
-    return_dict = {
-        "ret": rets,
-        "counter": counters,
-        "worker_start": invocation_start,
-        "worker_end": invocation_end,
-    }
-    queue.put(return_dict)
-
-
 @cli.group()
 def open_close():
     pass
 
+"""
+Run workers of a distributed open-closed workload on this host.
+Functions are deployed by the coordinator; the local configuration
+only has to provide access to the platform.
+"""
+@open_close.command()
+@click.option(
+    "--coordinator",
+    type=str,
+    required=True,
+    help="Address of the coordinator, host:port.",
+)
+@click.option(
+    "--n_workers",
+    type=int,
+    default=10,
+    help="Number of worker processes to spawn on this host"
+)
+@common_params
+def agent(coordinator, n_workers, **kwargs):
+    from sebs.experiments.loadgen import LoadAgent, parse_address
+    (
+        config,
+        output_dir,
+        logging_filename,
+        sebs_client,
+        deployment_client,
+    ) = parse_common_params(**kwargs)
+
+    def prepare_triggers(functions: dict) -> dict:
+        triggers_m = {}
+        for benchmark, data in functions.items():
+            func = deployment_client.function_type().deserialize(data["function"])
+            deployment_client.cached_function(func)
+            triggers_m[benchmark] = {
+                "trigger": func.triggers(Trigger.TriggerType.LIBRARY)[0],
+                "input": data["input"],
+            }
+        return triggers_m
+
+    load_agent = LoadAgent(parse_address(coordinator), n_workers, prepare_triggers)
+    load_agent.logging_handlers = sebs_client.logging_handlers
+    load_agent.run()
+
+"""
+Closed-loop sweep: keep N requests in flight for a range of N and report
+the throughput and latency reached at each level.
+Functions are invoked in the proportions of the schedule.
+"""
+@open_close.command()
+@click.option(
+    "--schedule_config",
+    type=str,
+    default="schedule.json",
+    help="path to schedule, defines functions and their share of requests"
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    multiple=True,
+    default=[8, 16, 32, 64, 128, 256, 512],
+    help="Number of requests in flight, can be repeated to sweep several levels.",
+)
+@click.option(
+    "--duration",
+    type=float,
+    default=60.0,
+    help="Measured time at each concurrency level, in seconds.",
+)
+@click.option(
+    "--warmup",
+    type=float,
+    default=10.0,
+    help="Time before measurement at each concurrency level, in seconds.",
+)
+@click.option(
+    "--think_time",
+    type=str,
+    default="0",
+    help="Think time between requests of a client in seconds: 0, constant:<s>, "
+    "exponential:<mean>, or uniform:<min>:<max>.",
+)
+@click.option(
+    "--trigger_t",
+    type=click.Choice(["library"]),
+    default="library",
+    help="Function trigger to be used.",
+)
+@click.option(
+    "--memory",
+    default=None,
+    type=int,
+    help="Override default memory settings for the benchmark function.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    type=int,
+    help="Override default timeout settings for the benchmark function.",
+)
+@click.option(
+    "--result_dir",
+    default="sweep-results",
+    type=str,
+    help="Results directory"
+)
+@click.option(
+    "--export",
+    type=click.Choice(["json", "archive"]),
+    default=None,
+    help="Export complete results as JSON or a compressed archive, in addition to the "
+    "columnar records.",
+)
+@deploy_params
+@common_params
+def sweep(
+    schedule_config,
+    concurrency,
+    duration,
+    warmup,
+    think_time,
+    trigger_t,
+    memory,
+    timeout,
+    result_dir,
+    export,
+    deploy_workers,
+    **kwargs,
+):
+    from sebs.experiments.closed_loop import ClosedLoopDriver, find_knee, parse_think_time
+    from sebs.experiments.schedule import ScheduleConfig
+    (
+        config,
+        output_dir,
+        logging_filename,
+        sebs_client,
+        deployment_client,
+    ) = parse_common_params(**kwargs)
+
+    experiment_config = sebs_client.get_experiment_config(config["experiments"])
+
+    if os.path.exists(result_dir):
+        shutil.rmtree(result_dir)
+    os.mkdir(result_dir)
+    schedule_config = ScheduleConfig.load(schedule_config)
+    weights = Counter(so.fn_name for so in schedule_config)
+
+    triggers_m = _prepare_triggers(
+        list(weights.keys()),
+        trigger_t,
+        memory,
+        timeout,
+        experiment_config,
+        sebs_client,
+        deployment_client,
+        logging_filename,
+        deploy_workers,
+    )
+
+    def invoke(fn_name: str):
+        return triggers_m[fn_name]["trigger"].sync_invoke(triggers_m[fn_name]["input"])
+
+    driver = ClosedLoopDriver(invoke, dict(weights), parse_think_time(think_time))
+    driver.logging_handlers = sebs_client.logging_handlers
+    levels = []
+    for n in sorted(concurrency):
+        results = {
+            benchmark: sebs.experiments.ExperimentResult(
+                experiment_config, deployment_client.config
+            )
+            for benchmark in triggers_m.keys()
+        }
+        for benchmark, result in results.items():
+            result.stream_to(
+                os.path.join(result_dir, f"experiments_closed_loop_{n}_{benchmark}.jsonl")
+            )
+            result.begin()
+
+        def add_result(benchmark: str, ret):
+            results[benchmark].add_invocation(
+                triggers_m[benchmark]["function"], ret.executionResult
+            )
+
+        level = driver.run(n, duration, warmup, add_result)
+        sebs_client.logging.info(str(level))
+        levels.append(level)
+        for benchmark, result in results.items():
+            result.end()
+            _save_result(
+                result,
+                os.path.join(result_dir, f"experiments_closed_loop_{n}_{benchmark}"),
+                benchmark,
+                export,
+            )
+
+    knee = find_knee(levels)
+    with open(os.path.join(result_dir, "sweep.json"), "w") as out_f:
+        json.dump(
+            {
+                "levels": [level.serialize() for level in levels],
+                "knee": knee.concurrency if knee else None,
+            },
+            out_f,
+            indent=2,
+        )
+    with open(os.path.join(result_dir, "results_log.txt"), "w") as out_f:
+        for level in levels:
+            out_f.write(f"{level}\n")
+        if knee:
+            out_f.write(f"Knee at N={knee.concurrency}: {knee.throughput:.2f} req/s\n")
+    if knee:
+        sebs_client.logging.info(f"Knee at N={knee.concurrency}: {knee.throughput:.2f} req/s")
+
+    # Throughput versus latency curve
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    throughput = [level.throughput for level in levels]
+    for attr, label in [("latency_p50", "p50"), ("latency_p99", "p99")]:
+        ax.plot(throughput, [getattr(level, attr) for level in levels], marker="o", label=label)
+    for level in levels:
+        ax.annotate(f"N={level.concurrency}", (level.throughput, level.latency_p50))
+    ax.set_xlabel("Throughput [req/s]")
+    ax.set_ylabel("Latency [ms]")
+    ax.set_title("Closed-loop throughput versus latency")
+    ax.legend(loc="upper left")
+    fig.tight_layout()
+    plt.savefig(os.path.join(result_dir, "sweep.png"), bbox_inches="tight", dpi=100)
+
 """
 Run an open-closed workload.
-Workers == threads that send invocation requests to Openwhisk
+Workers == processes that send invocation requests to Openwhisk
+With --n_agents, workers run on remote hosts started with `open-close agent`.
 """
 @open_close.command()
 @click.option(
@@ -749,7 +1255,25 @@ Workers == threads that send invocation requests to Openwhisk
     "--n_workers", 
     type=int, 
     default=10, 
-    help="Number of worker threads to spawn"
+    help="Number of worker processes to spawn"
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=1,
+    help="Number of requests in flight in each worker, 1 is a closed loop.",
+)
+@click.option(
+    "--n_agents",
+    type=int,
+    default=0,
+    help="Number of remote agents running the workers; 0 runs workers locally.",
+)
+@click.option(
+    "--listen",
+    type=str,
+    default="0.0.0.0:7777",
+    help="Address on which the coordinator waits for agents.",
 )
 @click.option(
     "--trigger_t",
@@ -775,16 +1299,46 @@ Workers == threads that send invocation requests to Openwhisk
     type=str,
     help="Results directory"
 )
+@click.option(
+    "--export",
+    type=click.Choice(["json", "archive"]),
+    default=None,
+    help="Export complete results as JSON or a compressed archive, in addition to the "
+    "columnar records.",
+)
+@schedule_params
+@prewarm_params
+@timeline_params
+@deploy_params
 @common_params
 def open_close(
     schedule_config,
     n_workers,
+    concurrency,
+    n_agents,
+    listen,
     trigger_t,
     memory,
     timeout,
     result_dir,
+    merge_schedule,
+    window_begin,
+    window_end,
+    time_warp,
+    target_rps,
+    prewarm,
+    invokers,
+    invoker_memory,
+    export,
+    timeline_window,
+    plot_timeline,
+    deploy_workers,
     **kwargs,
 ):
+    from multiprocessing import Process, Queue
+
+    from sebs.experiments import analysis
+    from sebs.experiments.loadgen import LoadCoordinator, LoadResults, parse_address, run_worker
     # Universal common set up
     (
         config,
@@ -800,105 +1354,169 @@ def open_close(
         shutil.rmtree(result_dir)
     os.mkdir(result_dir)
     # Load schedule config
-    with open(schedule_config, "r") as fp:
-        schedule_config = json.load(fp)
-    schedule_config = sebs_client.get_schedule_config(schedule_config)
+    schedule_config = load_schedule(
+        sebs_client,
+        schedule_config,
+        merge_schedule,
+        window_begin,
+        window_end,
+        time_warp,
+        target_rps,
+    )
     
     # Set up each benchmark trigger here
     # We differ from open schedule here because we don't want to create n copies of the benchmark obj
-    triggers_m = {}
-    for benchmark in schedule_config.fns:
-        update_nested_dict(config, ["experiments", "benchmark"], benchmark)
-        benchmark_obj = sebs_client.get_benchmark(
-            benchmark,
-            deployment_client,
-            experiment_config,
-            logging_filename=logging_filename
+    triggers_m = _prepare_triggers(
+        schedule_config.fns,
+        trigger_t,
+        memory,
+        timeout,
+        experiment_config,
+        sebs_client,
+        deployment_client,
+        logging_filename,
+        deploy_workers,
+    )
+    for benchmark in triggers_m.keys():
+        triggers_m[benchmark]["result"].stream_to(
+            os.path.join(result_dir, f"experiments_open_close_{benchmark}.jsonl")
         )
-        if memory is not None:
-            benchmark_obj.benchmark_config.memory = memory
-        if timeout is not None:
-            benchmark_obj.benchmark_config.timeout = timeout
 
-        func = deployment_client.get_function(
-            benchmark_obj,
-            deployment_client.default_function_name(benchmark_obj),
+    _prewarm(
+        triggers_m,
+        prewarm,
+        invokers,
+        invoker_memory,
+        result_dir,
+        export,
+        experiment_config,
+        sebs_client,
+        deployment_client,
+    )
+
+    # Results are streamed by workers while they run
+    def add_result(benchmark: str, ret: ExecutionResult):
+        triggers_m[benchmark]["result"].add_invocation(triggers_m[benchmark]["function"], ret)
+
+    results = LoadResults(add_result)
+    run_begin = time.time_ns()
+    if n_agents > 0:
+        coordinator = LoadCoordinator(parse_address(listen), n_agents)
+        coordinator.logging_handlers = sebs_client.logging_handlers
+        functions = {
+            benchmark: {
+                "function": triggers_m[benchmark]["function"].serialize(),
+                "input": triggers_m[benchmark]["input"],
+            }
+            for benchmark in triggers_m.keys()
+        }
+        coordinator.run(functions, schedule_config, results, concurrency)
+    else:
+        # Workers load their shard of the schedule, and results are streamed by this process.
+        # Neither is passed to them, which works with every start method of processes.
+        worker_triggers = {
+            benchmark: {"trigger": trigger["trigger"], "input": trigger["input"]}
+            for benchmark, trigger in triggers_m.items()
+        }
+        result_queue = Queue()
+        workers = []
+        # Workers read their shards from columnar schedules, without parsing JSON files
+        schedule_dir = tempfile.mkdtemp(prefix="sebs_schedule_")
+        spec = schedule_config.spec.columnar(schedule_dir)
+        # Common start of all workers
+        start = time.time_ns() + 1_000_000_000
+        for i in range(n_workers):
+            p = Process(
+                target=run_worker,
+                args=(i, worker_triggers, spec, n_workers, start, result_queue),
+                kwargs={"concurrency": concurrency},
+            )
+            workers.append(p)
+            p.start()
+        finished: Set[int] = set()
+        while len(finished) < n_workers:
+            try:
+                msg = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                # Messages of a process are flushed before it exits, so the queue is drained
+                # before workers which exited in the meantime are considered failed.
+                exited = [i for i, p in enumerate(workers) if p.exitcode is not None]
+                while True:
+                    try:
+                        msg = result_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if results.handle(msg):
+                        finished.add(msg["worker"])
+                for i in exited:
+                    if i not in finished:
+                        sebs_client.logging.error(
+                            f"Worker {i} exited with code {workers[i].exitcode} "
+                            "before reporting results"
+                        )
+                        results.handle({"type": "exit", "worker": i})
+                        finished.add(i)
+                continue
+            if results.handle(msg):
+                finished.add(msg["worker"])
+        for p in workers:
+            p.join()
+        shutil.rmtree(schedule_dir)
+    run_end = time.time_ns()
+    if results.begin is None or results.end is None:
+        # No worker reported its times, e.g., all of them crashed
+        sebs_client.logging.error(
+            f"No worker reported results, failed workers: {results.failed_workers}"
         )
-        storage = deployment_client.get_storage(replace_existing=experiment_config.update_storage)
-        input_config = benchmark_obj.prepare_input(storage=storage, size="small")
-        
-        result = sebs.experiments.ExperimentResult(experiment_config, deployment_client.config)
-        result.begin()
-        
-        trigger_type = Trigger.TriggerType.get(trigger_t)
-        triggers = func.triggers(trigger_type)
-        if len(triggers) == 0:
-            trigger = deployment_client.create_trigger(func, trigger_type)
-        else:
-            trigger = triggers[0]
-        print(f"{benchmark=}")
-        triggers_m[benchmark] = {}
-        triggers_m[benchmark]["trigger"] = trigger
-        triggers_m[benchmark]["function"] = func
-        triggers_m[benchmark]["input"] = input_config
-        triggers_m[benchmark]["result"] = result
-    # Split the schedule among the n worker threads
-    schedules = _split_schedule(n_workers, schedule_config)
-    result_queue = Queue(maxsize=n_workers)
-    workers = []
-    for i in range(n_workers):
-        p = Process(target=worker_thread, args=(i, triggers_m, schedules[i], result_queue))
-        workers.append(p)
-        p.start()
+        results.begin, results.end = run_begin, run_end
+
     # We need to aggregate all results from each worker now
     for benchmark in triggers_m.keys():
-        triggers_m[benchmark]["success"] = 0
-        triggers_m[benchmark]["failure"] = 0
-    # Worker invocation times
-    earliest_client_begin = None
-    latest_client_end = None
-    for i in range(n_workers):
-        return_dict = result_queue.get()
-        
-        client_start = return_dict["worker_start"]
-        client_end = return_dict["worker_end"]
-        if earliest_client_begin is None or client_start < earliest_client_begin:
-            earliest_client_begin = client_start
-        if latest_client_end is None or client_end > latest_client_end:
-            latest_client_end = client_end
-        
-        rets = return_dict["ret"]   
-        sub_counter = return_dict["counter"]
-        for benchmark in triggers_m.keys():
-            func = triggers_m[benchmark]["function"]
-            for ret in rets[benchmark]:
-                triggers_m[benchmark]["result"].add_invocation(func, ret)
-            triggers_m[benchmark]["success"] += sub_counter[benchmark]["success"]
-            triggers_m[benchmark]["failure"] += sub_counter[benchmark]["failure"]
-    
-    for p in workers:
-        p.join()
+        counter = results.counters.get(benchmark, {"success": 0, "failure": 0})
+        triggers_m[benchmark]["success"] = counter["success"]
+        triggers_m[benchmark]["failure"] = counter["failure"]
 
     # Write all files
     for benchmark in triggers_m.keys():
         result = triggers_m[benchmark]["result"]
         
         result.end()  # This call is redundant, but just to make sure the time is non null
-        result_file = os.path.join(result_dir, f"experiments_open_close_{benchmark}.json")
-        with open(result_file, "w") as out_f:
-            out_f.write(sebs.utils.serialize(result))
+        _save_result(
+            result,
+            os.path.join(result_dir, f"experiments_open_close_{benchmark}"),
+            benchmark,
+            export,
+        )
     
     __analyze_schedule_results(
         triggers_m,
         result_dir,
-        earliest_client_begin,
-        latest_client_end,
-        prefix="experiments_open_close"
+        results.begin,
+        results.end,
+        prefix="experiments_open_close",
+        timeline_window=timeline_window,
+        plot_timeline=plot_timeline,
     )
+    # Percentiles of sketches merged from all workers, measured when responses were received
+    with open(os.path.join(result_dir, "results_log.txt"), "a") as result_f:
+        for benchmark, sketch in results.latencies.items():
+            if sketch.count > 0:
+                result_f.write(
+                    f"Latency from schedule of {benchmark}, merged from workers (ms): "
+                    f"{analysis.Summary.from_sketch(sketch)}\n"
+                )
+
+
 
 @benchmark.command()
+@click.option(
+    "--result-file",
+    default="experiments.json",
+    type=str,
+    help="Results in the output directory, as JSON or a compressed archive.",
+)
 @common_params
-def process(**kwargs):
+def process(result_file, **kwargs):
 
     (
         config,
@@ -908,15 +1526,13 @@ def process(**kwargs):
         deployment_client,
     ) = parse_common_params(**kwargs)
 
-    result_file = os.path.join(output_dir, "experiments.json")
+    result_file = os.path.join(output_dir, result_file)
     sebs_client.logging.info("Load results from {}".format(os.path.abspath(result_file)))
-    with open(result_file, "r") as in_f:
-        config = json.load(in_f)
-        experiments = sebs.experiments.ExperimentResult.deserialize(
-            config,
-            sebs_client.cache_client,
-            sebs_client.generate_logging_handlers(logging_filename),
-        )
+    experiments = sebs.experiments.ExperimentResult.load(
+        result_file,
+        sebs_client.cache_client,
+        sebs_client.generate_logging_handlers(logging_filename),
+    )
 
     for func in experiments.functions():
         deployment_client.download_metrics(
@@ -956,6 +1572,9 @@ def regression(benchmark_input_size, benchmark_name, **kwargs):
     (config, output_dir, logging_filename, sebs_client, _) = parse_common_params(
         initialize_deployment=False, **kwargs
     )
+    # Imports SDKs of all platforms
+    from sebs.regression import regression_suite
+
     regression_suite(
         sebs_client,
         config["experiments"],
@@ -1255,5 +1874,114 @@ def resources_remove(resource, prefix, wait, dry_run, **kwargs):
             sebs_client.logging.info(f"Removing resource group: {group}")
             deployment_client.config.resources.delete_resource_group(deployment_client.cli_instance, group, wait)
 
+@cli.group()
+def archive():
+    pass
+
+
+@archive.command("pack")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=str)
+@click.option(
+    "--compression",
+    type=click.Choice(["zstd", "zlib"]),
+    default=None,
+    help="Compression of the archive, zstd when the zstandard package is installed.",
+)
+def archive_pack(directory, output, compression):
+    """
+    Write JSON results of a directory to a single compressed archive,
+    with results of each file stored as a benchmark named after the file.
+    """
+    from sebs.experiments import archive as result_archive
+    from sebs.experiments.benchmark_statistics import (
+        CACHE_FILE,
+        STATISTICS_FILE,
+        check_exported,
+        experiment_name,
+    )
+
+    check_exported(directory)
+    paths = {
+        experiment_name(filename): os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.endswith(".json") and filename not in (STATISTICS_FILE, CACHE_FILE)
+    }
+    result_archive.pack(paths, output, compression)
+    click.echo(f"Packed {len(paths)} results of {directory} to {output}")
+
+
+@archive.command("unpack")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("directory", type=click.Path(file_okay=False))
+def archive_unpack(path, directory):
+    """
+    Write every result of an archive to a JSON file named after its benchmark.
+    """
+    from sebs.experiments import archive as result_archive
+
+    os.makedirs(directory, exist_ok=True)
+    written = result_archive.unpack(path, directory)
+    click.echo(f"Unpacked {len(written)} results to {directory}")
+
+
+@cli.group()
+def statistics():
+    pass
+
+
+@statistics.command("compute")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--processes", default=None, type=int, help="Number of processes, all CPUs by default."
+)
+@click.option("--plots", is_flag=True, default=False, help="Render CDF and PDF plots.")
+@click.option(
+    "--expected_repetitions",
+    default=None,
+    type=int,
+    help="Fail on results with a different number of invocations.",
+)
+def statistics_compute(directory, processes, plots, expected_repetitions):
+    """
+    Summarize runtime and memory usage of benchmark results in a directory.
+    Only results changed since the previous run are parsed again.
+    """
+    from sebs.experiments import benchmark_statistics
+
+    data = benchmark_statistics.collect(directory, processes, plots, expected_repetitions)
+    click.echo(
+        f"Statistics of {len(data)} experiments written to "
+        f"{os.path.join(directory, benchmark_statistics.STATISTICS_FILE)}"
+    )
+
+
+@statistics.command("overhead")
+@click.argument("baseline", type=click.Path(exists=True, file_okay=False))
+@click.argument("other", type=click.Path(exists=True, file_okay=False))
+@click.option("--benchmark", multiple=True, type=str, help="Experiments to compare.")
+@click.option(
+    "--processes", default=None, type=int, help="Number of processes, all CPUs by default."
+)
+def statistics_overhead(baseline, other, benchmark, processes):
+    """
+    Statistics of OTHER results as percentage of BASELINE, e.g., QEMU over host.
+    """
+    from sebs.experiments import benchmark_statistics
+
+    ret = benchmark_statistics.overhead(
+        benchmark_statistics.collect(baseline, processes),
+        benchmark_statistics.collect(other, processes),
+        list(benchmark) if benchmark else None,
+    )
+    for name, metrics in ret.items():
+        click.echo("*" * 25)
+        click.echo(name)
+        for metric, stats in metrics.items():
+            for key, value in stats.items():
+                click.echo(f"{key:<5} {metric} overhead {value}")
+        click.echo("*" * 25)
+
+
 if __name__ == "__main__":
     cli()
@@ -1,5 +1,4 @@
 import glob
-import hashlib
 import json
 import os
 import shutil
@@ -7,16 +6,19 @@ import subprocess
 from abc import abstractmethod
 from typing import Any, Callable, Dict, List, Tuple, Optional
 
-import docker
-
+from sebs.build_pipeline import step
 from sebs.config import SeBSConfig
 from sebs.cache import Cache
+from sebs.dependency_cache import DependencyCache
 from sebs.faas.config import Resources
 from sebs.utils import find_benchmark, project_absolute_path, LoggingBase
 from sebs.faas.storage import PersistentStorage
+from sebs.source_hash import SourceHashes, combine, file_digest
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    import docker
+
     from sebs.experiments.config import Config as ExperimentConfig
     from sebs.faas.function import Language
 
@@ -158,8 +160,16 @@ class Benchmark(LoggingBase):
 
     @property  # noqa: A003
     def hash(self):
-        path = os.path.join(self.benchmark_path, self.language_name)
-        self._hash_value = Benchmark.hash_directory(path, self._deployment_name, self.language_name)
+        # Sources do not change during a run, the hash is computed once
+        if self._hash_value is None:
+            path = os.path.join(self.benchmark_path, self.language_name)
+            self._hash_value = Benchmark.hash_directory(
+                path,
+                self._deployment_name,
+                self.language_name,
+                SourceHashes.get(self._cache_client.cache_dir),
+                self.hash_algorithm(self._experiment_config),
+            )
         return self._hash_value
 
     @hash.setter  # noqa: A003
@@ -195,7 +205,7 @@ class Benchmark(LoggingBase):
         system_config: SeBSConfig,
         output_dir: str,
         cache_client: Cache,
-        docker_client: docker.client,
+        docker_client: "docker.client",
     ):
         super().__init__()
         self._deployment_name = deployment_name
@@ -216,6 +226,7 @@ class Benchmark(LoggingBase):
                 "Benchmark {} not available for language {}".format(self.benchmark, self.language)
             )
         self._cache_client = cache_client
+        self._dependency_cache = DependencyCache(cache_client.cache_dir)
         self._docker_client = docker_client
         self._system_config = system_config
         self._hash_value = None
@@ -228,14 +239,25 @@ class Benchmark(LoggingBase):
         if config.update_code:
             self._is_cached_valid = False
 
+    @staticmethod
+    def hash_algorithm(config: "ExperimentConfig") -> str:
+        return "blake2b" if config.check_flag("fast_source_hash") else "md5"
+
     """
-        Compute MD5 hash of an entire directory.
+        Compute hash of sources and wrappers of a benchmark.
+        Files are hashed in sorted order, and their digests are reused
+        from the memo while they are unchanged.
     """
 
     @staticmethod
-    def hash_directory(directory: str, deployment: str, language: str):
+    def hash_directory(
+        directory: str,
+        deployment: str,
+        language: str,
+        memo: Optional[SourceHashes] = None,
+        algorithm: str = "md5",
+    ):
 
-        hash_sum = hashlib.md5()
         FILES = {
             "python": ["*.py", "requirements.txt*"],
             "nodejs": ["*.js", "package.json"],
@@ -243,20 +265,25 @@ class Benchmark(LoggingBase):
         WRAPPERS = {"python": "*.py", "nodejs": "*.js"}
         NON_LANG_FILES = ["*.sh", "*.json"]
         selected_files = FILES[language] + NON_LANG_FILES
+        sources = set()
         for file_type in selected_files:
-            for f in glob.glob(os.path.join(directory, file_type)):
-                path = os.path.join(directory, f)
-                with open(path, "rb") as opened_file:
-                    hash_sum.update(opened_file.read())
+            sources.update(glob.glob(os.path.join(directory, file_type)))
         # wrappers
         wrappers = project_absolute_path(
             "benchmarks", "wrappers", deployment, language, WRAPPERS[language]
         )
-        for f in glob.glob(wrappers):
-            path = os.path.join(directory, f)
-            with open(path, "rb") as opened_file:
-                hash_sum.update(opened_file.read())
-        return hash_sum.hexdigest()
+        files = [(os.path.basename(path), path) for path in sorted(sources)]
+        files += [
+            (os.path.join("wrappers", os.path.basename(path)), path)
+            for path in sorted(glob.glob(wrappers))
+        ]
+        digests = [
+            (name, memo.digest(path, algorithm) if memo else file_digest(path, algorithm))
+            for name, path in files
+        ]
+        if memo:
+            memo.save()
+        return combine(digests, algorithm)
 
     def serialize(self) -> dict:
         return {"size": self.code_size, "hash": self.hash}
@@ -405,7 +432,38 @@ class Benchmark(LoggingBase):
         sizes = [f.stat().st_size for f in root.glob("**/*") if f.is_file()]
         return sum(sizes)
 
+    def dependencies_key(self, output_dir: str, image_id: str) -> str:
+        """
+        Key of installed dependencies in the dependency cache. Benchmark sources are
+        a part of it only when the benchmark has a package.sh, which runs on the sources.
+        """
+        DEPENDENCY_FILES = {
+            "python": ["requirements.txt", f"requirements.txt.{self.language_version}"],
+            "nodejs": ["package.json"],
+        }
+        files = [os.path.join(output_dir, f) for f in DEPENDENCY_FILES[self.language_name]]
+        package_script = os.path.join(self._benchmark_path, self.language_name, "package.sh")
+        files.append(package_script)
+        if os.path.exists(package_script):
+            files.extend(
+                sorted(
+                    os.path.join(root, f)
+                    for root, _, dir_files in os.walk(output_dir)
+                    for f in dir_files
+                )
+            )
+        return DependencyCache.key(
+            files,
+            self._deployment_name,
+            self.language_name,
+            self.language_version,
+            image_id,
+            root=output_dir,
+        )
+
     def install_dependencies(self, output_dir):
+        import docker
+
         # do we have docker image for this run and language?
         if "build" not in self._system_config.docker_image_types(
             self._deployment_name, self.language_name
@@ -435,6 +493,7 @@ class Benchmark(LoggingBase):
                     self._docker_client.images.pull(repo_name, image_name)
                 except docker.errors.APIError:
                     raise RuntimeError("Docker pull of image {} failed!".format(image_name))
+            image_id = self._docker_client.images.get(repo_name + ":" + image_name).id
 
             # Create set of mounted volumes unless Docker volumes are disabled
             if not self._experiment_config.check_flag("docker_copy_build_files"):
@@ -453,6 +512,19 @@ class Benchmark(LoggingBase):
             PACKAGE_FILES = {"python": "requirements.txt", "nodejs": "package.json"}
             file = os.path.join(output_dir, PACKAGE_FILES[self.language_name])
             if os.path.exists(file):
+                # Dependencies installed before with the same requirements and build image
+                use_cache = not self._experiment_config.check_flag("no_dependency_cache")
+                dependencies_key = self.dependencies_key(output_dir, image_id)
+                if use_cache:
+                    cached_files = self._dependency_cache.get(dependencies_key, output_dir)
+                    if cached_files is not None:
+                        self.logging.info(
+                            "Reusing installed dependencies {} ({})".format(
+                                dependencies_key, ", ".join(cached_files)
+                            )
+                        )
+                        return
+                files_before = set(os.listdir(output_dir))
                 try:
                     self.logging.info(
                         "Docker build of benchmark dependencies in container "
@@ -539,6 +611,9 @@ class Benchmark(LoggingBase):
                     self.logging.error(e)
                     self.logging.error(f"Docker mount volumes: {volumes}")
                     raise e
+                if use_cache:
+                    installed = sorted(set(os.listdir(output_dir)) - files_before)
+                    self._dependency_cache.put(dependencies_key, output_dir, installed)
 
     def recalculate_code_size(self):
         self._code_size = Benchmark.directory_size(self._output_dir)
@@ -568,18 +643,21 @@ class Benchmark(LoggingBase):
             shutil.rmtree(self._output_dir)
         os.makedirs(self._output_dir)
 
-        self.copy_code(self._output_dir)
-        self.add_benchmark_data(self._output_dir)
-        self.add_deployment_files(self._output_dir)
-        self.add_deployment_package(self._output_dir)
-        self.install_dependencies(self._output_dir)
-        self._code_location, self._code_size = deployment_build_step(
-            os.path.abspath(self._output_dir),
-            self.language_name,
-            self.language_version,
-            self.benchmark,
-            self.is_cached_valid,
-        )
+        with step("code"):
+            self.copy_code(self._output_dir)
+            self.add_benchmark_data(self._output_dir)
+            self.add_deployment_files(self._output_dir)
+            self.add_deployment_package(self._output_dir)
+        with step("dependencies"):
+            self.install_dependencies(self._output_dir)
+        with step("package"):
+            self._code_location, self._code_size = deployment_build_step(
+                os.path.abspath(self._output_dir),
+                self.language_name,
+                self.language_version,
+                self.benchmark,
+                self.is_cached_valid,
+            )
         self.logging.info(
             (
                 "Created code package (source hash: {hash}), for run on {deployment}"
@@ -0,0 +1,112 @@
+import concurrent.futures
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+from sebs.utils import LoggingBase
+
+"""
+    Concurrent build and deployment of independent benchmarks.
+
+    Every benchmark is prepared by one task of a bounded pool of threads -
+    building the code package, building and pushing its image, registering
+    the function and uploading inputs wait on Docker, the registry and the
+    platform, so independent benchmarks proceed at the same time.
+    Steps of a task are timed with step(), which also works outside of the
+    pipeline, e.g., in the build code of platforms, and then records nothing.
+    Times of steps exclude their nested steps, and the time of a task outside
+    of its steps is reported as other.
+"""
+
+T = TypeVar("T")
+
+_current = threading.local()
+
+
+class StepTimes:
+    def __init__(self):
+        # Seconds spent in each step, excluding nested steps
+        self.steps: Dict[str, float] = {}
+        self.total = 0.0
+
+    def add(self, name: str, duration: float):
+        self.steps[name] = self.steps.get(name, 0.0) + duration
+
+
+@contextmanager
+def step(name: str) -> Iterator[None]:
+    """Time a step of the benchmark prepared by the current thread."""
+    times: Optional[StepTimes] = getattr(_current, "times", None)
+    # Time of nested steps of each running step
+    nested: List[float] = _current.__dict__.setdefault("nested", [])
+    nested.append(0.0)
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - begin
+        nested_duration = nested.pop()
+        if nested:
+            nested[-1] += duration
+        if times is not None:
+            times.add(name, duration - nested_duration)
+
+
+class BuildPipeline(LoggingBase):
+    @staticmethod
+    def typename() -> str:
+        return "BuildPipeline"
+
+    def __init__(self, workers: int):
+        super().__init__()
+        if workers < 1:
+            raise ValueError(f"Number of build workers must be positive, got {workers}")
+        self._workers = workers
+        self.times: Dict[str, StepTimes] = {}
+
+    def _run_task(self, name: str, task: Callable[[str], T]) -> T:
+        times = StepTimes()
+        self.times[name] = times
+        _current.times = times
+        begin = time.perf_counter()
+        try:
+            return task(name)
+        finally:
+            times.total = time.perf_counter() - begin
+            _current.times = None
+
+    def run(self, names: List[str], task: Callable[[str], T]) -> Dict[str, T]:
+        """
+        Run the task for every name, at most workers tasks at once.
+        The first failure cancels tasks that have not started and is raised
+        once running tasks finish.
+        """
+        begin = time.perf_counter()
+        results: Dict[str, T] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = {name: pool.submit(self._run_task, name, task) for name in names}
+            try:
+                for name in names:
+                    results[name] = futures[name].result()
+            except Exception:
+                for future in futures.values():
+                    future.cancel()
+                raise
+        self.logging.info(
+            f"Prepared {len(names)} benchmarks in {time.perf_counter() - begin:.1f} s "
+            f"with {self._workers} workers"
+        )
+        for line in self.summary():
+            self.logging.info(line)
+        return results
+
+    def summary(self) -> List[str]:
+        """Time of each step of each benchmark, in seconds."""
+        lines = []
+        for name, times in self.times.items():
+            steps = ", ".join(f"{key} {duration:.1f}" for key, duration in times.steps.items())
+            other = times.total - sum(times.steps.values())
+            steps += f"{', ' if steps else ''}other {other:.1f}"
+            lines.append(f"{name}: total {times.total:.1f} ({steps})")
+        return lines
@@ -1,14 +1,21 @@
 # https://stackoverflow.com/questions/3232943/update-value-of-a-nested-dictionary-of-varying-depth
 import collections.abc
+import copy
 import datetime
 import json
 import os
 import shutil
 import threading
-from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING  # noqa
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING  # noqa
 
 from sebs.utils import LoggingBase, serialize
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+
 if TYPE_CHECKING:
     from sebs.benchmark import Benchmark
     from sebs.faas.function import Function
@@ -33,6 +40,28 @@ def update_dict(cfg, val, keys):
     update(cfg, map_keys(cfg, val, keys))
 
 
+def set_nested(cfg: dict, keys: List[str], val, replace: bool = True):
+    for key in keys[:-1]:
+        cfg = cfg.setdefault(key, {})
+    if replace or keys[-1] not in cfg:
+        cfg[keys[-1]] = val
+
+
+"""
+    Configs of benchmarks are stored in <cache>/<benchmark>/config.json,
+    and every config is parsed once per process into memory, where code
+    packages are found by deployment, language and version, and functions are
+    also indexed by name. A config is parsed again only when another process
+    replaced its file, which is detected by the modification time and size.
+
+    Updates are applied in memory and recorded, and written by flush(), which
+    merges them into the current file under an exclusive lock of the cache
+    directory and replaces the file atomically. Thus, processes sharing a cache
+    never lose each other's updates. Outside of batch(), every update is
+    written immediately.
+"""
+
+
 class Cache(LoggingBase):
 
     cached_config: Dict[str, str] = {}
@@ -48,6 +77,14 @@ class Cache(LoggingBase):
         self.ignore_functions: bool = False
         self.ignore_storage: bool = False
         self._lock = threading.RLock()
+        # Parsed config of each benchmark, with modification time and size of its file
+        self._configs: Dict[str, dict] = {}
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        # Deployments and languages of functions, by benchmark and function name
+        self._functions: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        # Updates not yet written, by benchmark
+        self._pending: Dict[str, List[Tuple[List[str], Any, bool]]] = {}
+        self._batch_depth = 0
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir, exist_ok=True)
         else:
@@ -78,6 +115,31 @@ class Cache(LoggingBase):
             update_dict(self.cached_config, val, keys)
         self.config_updated = True
 
+    @staticmethod
+    def _write_config(path: str, config: dict):
+        """
+        Replace the file atomically, so that concurrent readers never see a partial config.
+        """
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as fp:
+            fp.write(serialize(config))
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """
+        Exclusive lock of the cache directory, shared with other processes.
+        Without fcntl, e.g., on Windows, only threads of this process are excluded.
+        """
+        with self._lock, open(os.path.join(self.cache_dir, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     def lock(self):
         self._lock.acquire()
 
@@ -85,13 +147,107 @@ class Cache(LoggingBase):
         self._lock.release()
 
     def shutdown(self):
+        self.flush()
         if self.config_updated:
-            for cloud in ["azure", "aws", "gcp", "openwhisk"]:
-                if cloud in self.cached_config:
-                    cloud_config_file = os.path.join(self.cache_dir, "{}.json".format(cloud))
-                    self.logging.info("Update cached config {}".format(cloud_config_file))
-                    with open(cloud_config_file, "w") as out:
-                        json.dump(self.cached_config[cloud], out, indent=2)
+            with self._file_lock():
+                for cloud in ["azure", "aws", "gcp", "openwhisk"]:
+                    if cloud in self.cached_config:
+                        cloud_config_file = os.path.join(self.cache_dir, "{}.json".format(cloud))
+                        self.logging.info("Update cached config {}".format(cloud_config_file))
+                        self._write_config(cloud_config_file, self.cached_config[cloud])
+
+    def _config_path(self, benchmark: str) -> str:
+        return os.path.join(self.cache_dir, benchmark, "config.json")
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _index(self, benchmark: str, config: dict, stamp: Optional[Tuple[int, int]]):
+        self._configs[benchmark] = config
+        self._stamps[benchmark] = stamp
+        functions: Dict[str, List[Tuple[str, str]]] = {}
+        for deployment, deployment_cfg in config.items():
+            for language, language_cfg in deployment_cfg.items():
+                if language != "storage" and "functions" in language_cfg:
+                    for name in language_cfg["functions"]:
+                        functions.setdefault(name, []).append((deployment, language))
+        self._functions[benchmark] = functions
+
+    def _read(self, benchmark: str, stamp: Optional[Tuple[int, int]]):
+        """Parse the file and apply updates of this process which are not yet written."""
+        config: dict = {}
+        if stamp is not None:
+            with open(self._config_path(benchmark), "r") as fp:
+                config = json.load(fp)
+        for keys, val, replace in self._pending.get(benchmark, []):
+            set_nested(config, keys, copy.deepcopy(val), replace)
+        self._index(benchmark, config, stamp)
+
+    def _load(self, benchmark: str) -> Optional[dict]:
+        """Config of the benchmark, None when it is not cached."""
+        with self._lock:
+            stamp = self._stamp(self._config_path(benchmark))
+            if benchmark not in self._configs or self._stamps[benchmark] != stamp:
+                self._read(benchmark, stamp)
+            if stamp is None and benchmark not in self._pending:
+                return None
+            return self._configs[benchmark]
+
+    def _set(self, benchmark: str, keys: List[str], val, replace: bool = True):
+        """Update the config in memory and record the update for flush()."""
+        with self._lock:
+            if self._load(benchmark) is None:
+                self._configs[benchmark] = {}
+                self._functions[benchmark] = {}
+            val = copy.deepcopy(val)
+            set_nested(self._configs[benchmark], keys, copy.deepcopy(val), replace)
+            self._pending.setdefault(benchmark, []).append((keys, val, replace))
+            if len(keys) == 4 and keys[2] == "functions":
+                locations = self._functions[benchmark].setdefault(keys[3], [])
+                if (keys[0], keys[1]) not in locations:
+                    locations.append((keys[0], keys[1]))
+
+    def _persist(self):
+        with self._lock:
+            if self._batch_depth == 0:
+                self.flush()
+
+    def flush(self):
+        """Write updated configs, merged with changes of other processes."""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._file_lock():
+                for benchmark, updates in self._pending.items():
+                    config: dict = {}
+                    path = self._config_path(benchmark)
+                    if os.path.exists(path):
+                        with open(path, "r") as fp:
+                            config = json.load(fp)
+                    for keys, val, replace in updates:
+                        set_nested(config, keys, val, replace)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._write_config(path, config)
+                    # The config now includes changes of other processes
+                    self._index(benchmark, config, self._stamp(path))
+                self._pending.clear()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer writing updates until the outermost batch ends."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+            self._persist()
 
     """
         Access cached config of a benchmark.
@@ -104,11 +260,9 @@ class Cache(LoggingBase):
     """
 
     def get_benchmark_config(self, deployment: str, benchmark: str):
-        benchmark_dir = os.path.join(self.cache_dir, benchmark)
-        if os.path.exists(benchmark_dir):
-            with open(os.path.join(benchmark_dir, "config.json"), "r") as fp:
-                cfg = json.load(fp)
-                return cfg[deployment] if deployment in cfg else None
+        with self._lock:
+            cfg = self._load(benchmark)
+            return copy.deepcopy(cfg[deployment]) if cfg and deployment in cfg else None
 
     """
         Access cached version of benchmark code.
@@ -123,20 +277,30 @@ class Cache(LoggingBase):
     def get_code_package(
         self, deployment: str, benchmark: str, language: str, language_version: str
     ) -> Optional[Dict[str, Any]]:
-        cfg = self.get_benchmark_config(deployment, benchmark)
-        if cfg and language in cfg and language_version in cfg[language]["code_package"]:
-            return cfg[language]["code_package"][language_version]
-        else:
-            return None
+        with self._lock:
+            cfg = self._load(benchmark)
+            if cfg is None:
+                return None
+            try:
+                code_package = cfg[deployment][language]["code_package"][language_version]
+            except KeyError:
+                return None
+            return copy.deepcopy(code_package)
 
     def get_functions(
         self, deployment: str, benchmark: str, language: str
     ) -> Optional[Dict[str, Any]]:
-        cfg = self.get_benchmark_config(deployment, benchmark)
-        if cfg and language in cfg and not self.ignore_functions:
-            return cfg[language]["functions"]
-        else:
+        if self.ignore_functions:
             return None
+        with self._lock:
+            cfg = self._load(benchmark)
+            if cfg is None:
+                return None
+            try:
+                functions = cfg[deployment][language]["functions"]
+            except KeyError:
+                return None
+            return copy.deepcopy(functions)
 
     """
         Access cached storage config of a benchmark.
@@ -148,21 +312,50 @@ class Cache(LoggingBase):
     """
 
     def get_storage_config(self, deployment: str, benchmark: str):
-        cfg = self.get_benchmark_config(deployment, benchmark)
-        return cfg["storage"] if cfg and "storage" in cfg and not self.ignore_storage else None
+        if self.ignore_storage:
+            return None
+        with self._lock:
+            cfg = self._load(benchmark)
+            if cfg is None:
+                return None
+            try:
+                storage = cfg[deployment]["storage"]
+            except KeyError:
+                return None
+            return copy.deepcopy(storage)
 
     def update_storage(self, deployment: str, benchmark: str, config: dict):
         if self.ignore_storage:
             return
-        benchmark_dir = os.path.join(self.cache_dir, benchmark)
         with self._lock:
-            with open(os.path.join(benchmark_dir, "config.json"), "r") as fp:
-                cached_config = json.load(fp)
-            cached_config[deployment]["storage"] = config
-            with open(os.path.join(benchmark_dir, "config.json"), "w") as fp:
-                json.dump(cached_config, fp, indent=2)
-                
-    def add_sequence_package(self, deployment_name: str, language_name: str, code_package: "SequenceBenchmark"):
+            self._set(benchmark, [deployment, "storage"], config)
+            self._persist()
+
+    def _add_package_config(
+        self,
+        deployment_name: str,
+        benchmark: str,
+        language: str,
+        language_version: str,
+        language_config: dict,
+        cached_location: str,
+    ):
+        # don't store absolute path to avoid problems with moving cache dir
+        language_config["location"] = os.path.relpath(cached_location, self.cache_dir)
+        date = str(datetime.datetime.now())
+        language_config["date"] = {
+            "created": date,
+            "modified": date,
+        }
+        # make sure to not replace other entries
+        keys = [deployment_name, language]
+        self._set(benchmark, keys + ["code_package", language_version], language_config)
+        self._set(benchmark, keys + ["functions"], {}, replace=False)
+        self._persist()
+
+    def add_sequence_package(
+        self, deployment_name: str, language_name: str, code_package: "SequenceBenchmark"
+    ):
         with self._lock:
             language = code_package.language_name
             language_version = code_package.language_version
@@ -172,42 +365,15 @@ class Cache(LoggingBase):
             cached_dir = os.path.join(benchmark_dir, deployment_name, language, language_version)
             if not os.path.exists(cached_dir):
                 os.makedirs(cached_dir, exist_ok=True)
-                language_config = code_package.serialize()
                 package_name = os.path.basename(code_package.benchmark)
-                print(f"Package name = {package_name}")
-                cached_location = os.path.join(cached_dir, package_name)
-                # don't store absolute path to avoid problems with moving cache dir
-                relative_cached_loc = os.path.relpath(cached_location, self.cache_dir)
-                language_config["location"] = relative_cached_loc
-                date = str(datetime.datetime.now())
-                language_config["date"] = {
-                    "created": date,
-                    "modified": date,
-                }
-                
-                config = {
-                    deployment_name: {
-                        language: {
-                            "code_package": {language_version: language_config},
-                            "functions": {},
-                        }
-                    }
-                }
-                
-                # make sure not to replace other entries
-                if os.path.exists(os.path.join(benchmark_dir, "config.json")):
-                    with open(os.path.join(benchmark_dir, "config.json"), "r") as fp:
-                        cached_config = json.load(fp)
-                        if deployment_name in cached_config:
-                            # Language known, platform known, extend dictionary
-                            if language in cached_config[deployment_name]:
-                                cached_config[deployment_name][language]["code_package"][language_version] = language_config
-                            # language unknown, platform known - add new dictionary
-                            else:
-                                cached_config[deployment_name][language] = config[deployment_name][language]
-                            config = cached_config
-                with open(os.path.join(benchmark_dir, "config.json"), "w") as fp:
-                    json.dump(config, fp, indent=2)
+                self._add_package_config(
+                    deployment_name,
+                    code_package.benchmark,
+                    language,
+                    language_version,
+                    code_package.serialize(),
+                    os.path.join(cached_dir, package_name),
+                )
             else:
                 # TODO: update
                 raise RuntimeError(
@@ -215,7 +381,6 @@ class Cache(LoggingBase):
                         code_package.benchmark, deployment_name
                     )
                 )
-            
 
     def add_code_package(self, deployment_name: str, language_name: str, code_package: "Benchmark"):
         with self._lock:
@@ -236,46 +401,14 @@ class Cache(LoggingBase):
                     package_name = os.path.basename(code_package.code_location)
                     cached_location = os.path.join(cached_dir, package_name)
                     shutil.copy2(code_package.code_location, cached_dir)
-                language_config = code_package.serialize()
-                # don't store absolute path to avoid problems with moving cache dir
-                relative_cached_loc = os.path.relpath(cached_location, self.cache_dir)
-                language_config["location"] = relative_cached_loc
-                date = str(datetime.datetime.now())
-                language_config["date"] = {
-                    "created": date,
-                    "modified": date,
-                }
-                # config = {deployment_name: {language: language_config}}
-                config = {
-                    deployment_name: {
-                        language: {
-                            "code_package": {language_version: language_config},
-                            "functions": {},
-                        }
-                    }
-                }
-
-                # make sure to not replace other entries
-                if os.path.exists(os.path.join(benchmark_dir, "config.json")):
-                    with open(os.path.join(benchmark_dir, "config.json"), "r") as fp:
-                        cached_config = json.load(fp)
-                        if deployment_name in cached_config:
-                            # language known, platform known, extend dictionary
-                            if language in cached_config[deployment_name]:
-                                cached_config[deployment_name][language]["code_package"][
-                                    language_version
-                                ] = language_config
-                            # language unknown, platform known - add new dictionary
-                            else:
-                                cached_config[deployment_name][language] = config[deployment_name][
-                                    language
-                                ]
-                        else:
-                            # language unknown, platform unknown - add new dictionary
-                            cached_config[deployment_name] = config[deployment_name]
-                        config = cached_config
-                with open(os.path.join(benchmark_dir, "config.json"), "w") as fp:
-                    json.dump(config, fp, indent=2)
+                self._add_package_config(
+                    deployment_name,
+                    code_package.benchmark,
+                    language,
+                    language_version,
+                    code_package.serialize(),
+                    cached_location,
+                )
             else:
                 # TODO: update
                 raise RuntimeError(
@@ -309,20 +442,29 @@ class Cache(LoggingBase):
                     if code_package.code_location != cached_location:
                         shutil.copy2(code_package.code_location, cached_dir)
 
-                with open(os.path.join(benchmark_dir, "config.json"), "r") as fp:
-                    config = json.load(fp)
-                    date = str(datetime.datetime.now())
-                    config[deployment_name][language]["code_package"][language_version]["date"][
-                        "modified"
-                    ] = date
-                    config[deployment_name][language]["code_package"][language_version][
-                        "hash"
-                    ] = code_package.hash
-                with open(os.path.join(benchmark_dir, "config.json"), "w") as fp:
-                    json.dump(config, fp, indent=2)
+                self._update_package_config(
+                    deployment_name,
+                    code_package.benchmark,
+                    language,
+                    language_version,
+                    code_package.hash,
+                )
             else:
                 self.add_code_package(deployment_name, language_name, code_package)
 
+    def _update_package_config(
+        self,
+        deployment_name: str,
+        benchmark: str,
+        language: str,
+        language_version: str,
+        code_hash: str,
+    ):
+        keys = [deployment_name, language, "code_package", language_version]
+        self._set(benchmark, keys + ["date", "modified"], str(datetime.datetime.now()))
+        self._set(benchmark, keys + ["hash"], code_hash)
+        self._persist()
+
     """
         Add new function to cache.
 
@@ -344,23 +486,13 @@ class Cache(LoggingBase):
         if self.ignore_functions:
             return
         with self._lock:
-            benchmark_dir = os.path.join(self.cache_dir, code_package.benchmark)
-            language = code_package.language_name
-            cache_config = os.path.join(benchmark_dir, "config.json")
-            if os.path.exists(cache_config):
-                functions_config: Dict[str, Any] = {function.name: {**function.serialize()}}
-
-                with open(cache_config, "r") as fp:
-                    cached_config = json.load(fp)
-                    if "functions" not in cached_config[deployment_name][language]:
-                        cached_config[deployment_name][language]["functions"] = functions_config
-                    else:
-                        cached_config[deployment_name][language]["functions"].update(
-                            functions_config
-                        )
-                    config = cached_config
-                with open(cache_config, "w") as fp:
-                    fp.write(serialize(config))
+            if self._load(code_package.benchmark) is not None:
+                self._set(
+                    code_package.benchmark,
+                    [deployment_name, code_package.language_name, "functions", function.name],
+                    function.serialize(),
+                )
+                self._persist()
             else:
                 raise RuntimeError(
                     "Can't cache function {} for a non-existing code package!".format(function.name)
@@ -370,24 +502,13 @@ class Cache(LoggingBase):
         if self.ignore_functions:
             return
         with self._lock:
-            benchmark_dir = os.path.join(self.cache_dir, function.benchmark)
-            cache_config = os.path.join(benchmark_dir, "config.json")
-
-            if os.path.exists(cache_config):
-
-                with open(cache_config, "r") as fp:
-                    cached_config = json.load(fp)
-                    for deployment, cfg in cached_config.items():
-                        for language, cfg2 in cfg.items():
-                            if "functions" not in cfg2:
-                                continue
-                            for name, func in cfg2["functions"].items():
-                                if name == function.name:
-                                    cached_config[deployment][language]["functions"][
-                                        name
-                                    ] = function.serialize()
-                with open(cache_config, "w") as fp:
-                    fp.write(serialize(cached_config))
+            if self._load(function.benchmark) is not None:
+                config = function.serialize()
+                locations = self._functions[function.benchmark].get(function.name, [])
+                for deployment, language in locations:
+                    keys = [deployment, language, "functions", function.name]
+                    self._set(function.benchmark, keys, config)
+                self._persist()
             else:
                 raise RuntimeError(
                     "Can't cache function {} for a non-existing code package!".format(function.name)
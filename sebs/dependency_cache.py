@@ -0,0 +1,100 @@
+import hashlib
+import os
+import shutil
+import uuid
+from typing import List, Optional
+
+from sebs.utils import LoggingBase
+
+"""
+    Content-addressed store of installed benchmark dependencies.
+
+    The key of an entry is a hash of everything the installation depends on:
+    requirement files, the benchmark's package script, the deployment, language
+    and version, and the build image. Package scripts run in the build directory,
+    so for benchmarks with one the sources are part of the key as well.
+    Otherwise, benchmarks with identical requirements share an entry, and edits
+    of benchmark sources do not change the key.
+    Entries hold the files created by the installation (.python_packages,
+    node_modules, or archives written by package scripts), and are copied
+    into and out of the build directory, which later build steps modify in place.
+"""
+
+
+def copy_entry(src: str, dst: str):
+    if os.path.isdir(src) and not os.path.islink(src):
+        shutil.copytree(src, dst, symlinks=True)
+    elif os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+class DependencyCache(LoggingBase):
+    @staticmethod
+    def typename() -> str:
+        return "Benchmark.DependencyCache"
+
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self._directory = os.path.join(cache_dir, "dependencies")
+
+    @staticmethod
+    def key(files: List[str], *attributes: str, root: Optional[str] = None) -> str:
+        """
+        Hash of contents of the existing files, in the given order, and of the attributes.
+        Files are named by their path relative to the root, by their basename without it.
+        """
+        hash_sum = hashlib.md5()
+        for attribute in attributes:
+            hash_sum.update(attribute.encode())
+            hash_sum.update(b"\0")
+        for path in files:
+            if os.path.exists(path):
+                name = os.path.relpath(path, root) if root else os.path.basename(path)
+                hash_sum.update(name.encode())
+                hash_sum.update(b"\0")
+                with open(path, "rb") as f:
+                    hash_sum.update(f.read())
+        return hash_sum.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    def get(self, key: str, output_dir: str) -> Optional[List[str]]:
+        """Copy files of the entry into the directory, returns None when there is no entry."""
+        entry = self.path(key)
+        if not os.path.exists(entry):
+            return None
+        files = sorted(os.listdir(entry))
+        for name in files:
+            target = os.path.join(output_dir, name)
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            elif os.path.lexists(target):
+                os.remove(target)
+            copy_entry(os.path.join(entry, name), target)
+        return files
+
+    def put(self, key: str, output_dir: str, files: List[str]):
+        """
+        Store files of the directory as the entry. The entry appears atomically,
+        and the first of concurrent builds with the same key is kept.
+        """
+        if os.path.exists(self.path(key)):
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        tmp_entry = os.path.join(self._directory, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(tmp_entry)
+        try:
+            for name in files:
+                copy_entry(os.path.join(output_dir, name), os.path.join(tmp_entry, name))
+            os.rename(tmp_entry, self.path(key))
+            self.logging.info(f"Cached installed dependencies {', '.join(files)} as {key}")
+        except OSError:
+            # Stored in the meantime by a concurrent build
+            if not os.path.exists(self.path(key)):
+                raise
+        finally:
+            if os.path.exists(tmp_entry):
+                shutil.rmtree(tmp_entry)
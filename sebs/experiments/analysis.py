@@ -0,0 +1,275 @@
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from sebs.experiments.archive import ResultArchive, is_archive
+from sebs.experiments.records import INT_MISSING, InvocationRecords
+from sebs.faas.function import ExecutionResult
+from sebs.statistics import QuantileSketch
+
+"""
+    Vectorized analysis of invocation records.
+
+    Latencies of all invocations are computed as whole columns, and statistics
+    of functions are computed over slices of a single sort by function name,
+    so the analysis does not visit invocations one by one in Python.
+    All latencies are in milliseconds; NaN marks a value that is not known.
+"""
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+def _known(column: np.ndarray) -> np.ndarray:
+    return column != INT_MISSING
+
+
+def _ns_to_ms(begin: np.ndarray, end: np.ndarray) -> np.ndarray:
+    known = _known(begin) & _known(end)
+    delta = np.where(known, end, 0) - np.where(known, begin, 0)
+    return np.where(known, delta / 1_000_000, np.nan)
+
+
+def _json_value(value: float) -> Optional[float]:
+    # NaN is not valid JSON, unknown values are written as null
+    return None if np.isnan(value) else value
+
+
+def measured(records: InvocationRecords) -> InvocationRecords:
+    """Invocations which returned a benchmark result, without the warm-up phase."""
+    return records.select(~records.empty("output_request_id") & ~records["warmup"])
+
+
+def latencies(records: InvocationRecords) -> Dict[str, np.ndarray]:
+    """
+    Latencies of each invocation.
+
+    End-to-end latency is measured from the scheduled send time, or from the actual send
+    time without a schedule, until the response was received, or until the end of execution
+    for non-blocking invocations. Measuring from the schedule keeps requests delayed by an
+    overloaded client in the tail (no coordinated omission). Server-side latency is the sum
+    of the time spent in the OpenWhisk queue, container initialization and execution of
+    the benchmark.
+    """
+    wait_time = records["waitTime"]
+    queueing = np.where(_known(wait_time), wait_time, 0).astype(np.float64)
+    init_time = records["initTime"]
+    initialization = np.where(_known(init_time), init_time, 0).astype(np.float64)
+    execution = np.floor((records["output_end"] - records["output_begin"]) * 1000)
+
+    begin = np.where(_known(records["scheduled"]), records["scheduled"], records["sent"])
+    end = np.where(_known(records["received"]), records["received"], records["finished"])
+    lateness = records["sendLateness"]
+    return {
+        "queueing": queueing,
+        "initialization": initialization,
+        "execution": execution,
+        "server_side": queueing + initialization + execution,
+        "end_to_end": _ns_to_ms(begin, end),
+        "send_lateness": np.where(_known(lateness), lateness / 1_000_000, np.nan),
+    }
+
+
+class Summary:
+    def __init__(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        self.count = len(values)
+        if self.count > 0:
+            self.mean = float(np.mean(values))
+            self.percentiles = [float(p) for p in np.percentile(values, PERCENTILES)]
+            self.max = float(np.max(values))
+        else:
+            self.mean = self.max = np.nan
+            self.percentiles = [np.nan] * len(PERCENTILES)
+
+    @staticmethod
+    def from_sketch(sketch: QuantileSketch) -> "Summary":
+        """Summary of values counted in a sketch, e.g., merged from sketches of workers."""
+        ret = Summary(np.zeros(0))
+        if sketch.count > 0:
+            ret.count = sketch.count
+            ret.mean = sketch.mean
+            ret.percentiles = [sketch.percentile(p) for p in PERCENTILES]
+            ret.max = sketch.max
+        return ret
+
+    def serialize(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": _json_value(self.mean),
+            **{f"p{p:g}": _json_value(v) for p, v in zip(PERCENTILES, self.percentiles)},
+            "max": _json_value(self.max),
+        }
+
+    def __str__(self) -> str:
+        percentiles = ", ".join(f"p{p:g} {v:.3f}" for p, v in zip(PERCENTILES, self.percentiles))
+        return f"mean {self.mean:.3f}, {percentiles}, max {self.max:.3f}"
+
+
+class Breakdown:
+    """Statistics of a group of invocations."""
+
+    def __init__(self, records: InvocationRecords, lat: Dict[str, np.ndarray]):
+        self.count = len(records)
+        self.num_cold = int(np.count_nonzero(_known(records["initTime"])))
+        self.num_warm = self.count - self.num_cold
+        self.latencies = {name: Summary(values) for name, values in lat.items()}
+        begin, end = records["output_begin"], records["output_end"]
+        self.begin = float(np.nanmin(begin)) if np.any(~np.isnan(begin)) else np.nan
+        self.end = float(np.nanmax(end)) if np.any(~np.isnan(end)) else np.nan
+
+    def serialize(self) -> dict:
+        return {
+            "count": self.count,
+            "num_warm": self.num_warm,
+            "num_cold": self.num_cold,
+            "begin": _json_value(self.begin),
+            "end": _json_value(self.end),
+            "latencies": {name: s.serialize() for name, s in self.latencies.items()},
+        }
+
+
+def group_by(keys: np.ndarray) -> Iterator[Tuple[str, np.ndarray]]:
+    """Indices of rows of each distinct key, from a single stable sort."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    for indices in np.split(order, boundaries):
+        if len(indices) > 0:
+            yield str(keys[indices[0]]), indices
+
+
+def breakdown(records: InvocationRecords) -> Tuple[Dict[str, Breakdown], Breakdown]:
+    """Statistics of each function and of all invocations."""
+    lat = latencies(records)
+    function = records.categories("function")
+    functions = {
+        function.vocabulary[int(code)]: Breakdown(
+            records.select(idx), {name: v[idx] for name, v in lat.items()}
+        )
+        for code, idx in group_by(function.codes)
+    }
+    return functions, Breakdown(records, lat)
+
+
+def _load_json(path: str) -> InvocationRecords:
+    """Records of a result exported as JSON, e.g., written before columnar records."""
+    with open(path, "r") as f:
+        result = json.load(f)
+    return InvocationRecords.from_stream(
+        (func, key, ExecutionResult.deserialize(invocation))
+        for func, func_invocations in result["_invocations"].items()
+        for key, invocation in func_invocations.items()
+    )
+
+
+def _load_archive(path: str) -> InvocationRecords:
+    """Records of all results of a compressed archive."""
+    with ResultArchive(path) as archive:
+        return InvocationRecords.from_stream(
+            (func, key, ExecutionResult.deserialize(invocation))
+            for benchmark in archive.benchmarks()
+            for func in archive.functions(benchmark)
+            for key, invocation in archive.invocations(benchmark, func)
+        )
+
+
+def load(paths: List[str]) -> InvocationRecords:
+    """Records of all results, given as .npz records, compressed archives or JSON exports."""
+    parts = []
+    for path in paths:
+        if path.endswith(".npz"):
+            parts.append(InvocationRecords.load(path))
+        elif is_archive(path):
+            parts.append(_load_archive(path))
+        else:
+            parts.append(_load_json(path))
+    return InvocationRecords.concat(parts)
+
+
+TIMELINE_PERCENTILES = [50, 90, 99]
+
+
+def _first_known(*columns: np.ndarray) -> np.ndarray:
+    """Element-wise first known value of nanosecond columns."""
+    ret = columns[0].copy()
+    for column in columns[1:]:
+        ret = np.where(_known(ret), ret, column)
+    return ret
+
+
+def _seconds_to_ns(column: np.ndarray) -> np.ndarray:
+    known = ~np.isnan(column)
+    return np.where(known, np.round(np.where(known, column, 0) * 1e9), INT_MISSING).astype(np.int64)
+
+
+def timeline(records: InvocationRecords, window: float) -> Dict[str, np.ndarray]:
+    """
+    Throughput and latency of consecutive time windows of the experiment.
+
+    Invocations arrive at their scheduled time (or when they were sent, or accepted by
+    the platform), start when their execution began, and complete when the response
+    was received (or when the execution finished). Rates are per second, in-flight
+    invocations are counted at the end of each window, cold starts are counted among
+    invocations started in the window and latency percentiles among invocations
+    completed in the window.
+
+    :param window: length of a window in seconds
+    :return: columns of the table, one row per window
+    """
+    if window <= 0:
+        raise ValueError(f"Timeline window must be positive, got {window}")
+    arrival = _first_known(records["scheduled"], records["sent"], records["accepted"])
+    start = _first_known(records["started"], _seconds_to_ns(records["output_begin"]))
+    completion = _first_known(
+        records["received"], records["finished"], _seconds_to_ns(records["output_end"])
+    )
+    known = [_known(arrival), _known(start), _known(completion)]
+    timestamps = np.concatenate([t[k] for t, k in zip([arrival, start, completion], known)])
+    window_ns = int(window * 1_000_000_000)
+    # Without any known timestamp, the table has all columns and no rows.
+    origin, n_windows = 0, 0
+    if len(timestamps) > 0:
+        origin = int(np.min(timestamps))
+        n_windows = (int(np.max(timestamps)) - origin) // window_ns + 1
+
+    def bins(timestamps: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        return (timestamps[mask] - origin) // window_ns
+
+    arrivals = np.bincount(bins(arrival, known[0]), minlength=n_windows)
+    completions = np.bincount(bins(completion, known[2]), minlength=n_windows)
+    started = np.bincount(bins(start, known[1]), minlength=n_windows)
+    cold = _known(records["initTime"]) & known[1]
+    cold_starts = np.bincount(bins(start, cold), minlength=n_windows)
+    # In-flight invocations are counted only when both their arrival and completion are known.
+    both = known[0] & known[2]
+    in_flight = np.cumsum(np.bincount(bins(arrival, both), minlength=n_windows)) - np.cumsum(
+        np.bincount(bins(completion, both), minlength=n_windows)
+    )
+
+    latency = latencies(records)["end_to_end"]
+    with_latency = known[2] & ~np.isnan(latency)
+    percentiles = np.full((n_windows, len(TIMELINE_PERCENTILES)), np.nan)
+    completed_bins = bins(completion, with_latency)
+    completed = latency[with_latency]
+    for idx, indices in group_by(completed_bins):
+        percentiles[int(idx)] = np.percentile(completed[indices], TIMELINE_PERCENTILES)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cold_fraction = np.where(started > 0, cold_starts / started, np.nan)
+    return {
+        "begin": np.arange(n_windows) * window,
+        "arrival_rate": arrivals / window,
+        "completion_rate": completions / window,
+        "in_flight": in_flight,
+        "cold_fraction": cold_fraction,
+        **{f"latency_p{p:g}": percentiles[:, i] for i, p in enumerate(TIMELINE_PERCENTILES)},
+    }
+
+
+def write_timeline(path: str, table: Dict[str, np.ndarray]):
+    """Write the timeline as a CSV table."""
+    with open(path, "w") as f:
+        f.write(",".join(table.keys()) + "\n")
+        for row in zip(*table.values()):
+            f.write(",".join(f"{v:g}" for v in row) + "\n")
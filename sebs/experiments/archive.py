@@ -0,0 +1,252 @@
+import json
+import os
+import struct
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sebs.utils import serialize
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+"""
+    Compressed archive of experiment results, indexed by benchmark and function.
+
+    Invocations of each function are stored in independently compressed blocks,
+    so reading one function decompresses only its own blocks. An archive holds
+    results of one or more benchmarks, e.g., of a whole results directory.
+
+    Layout: magic, blocks, JSON index, offset of the index and magic again.
+    Every block is a compressed JSON object - the metadata of a result (everything
+    except invocations) or at most BLOCK_INVOCATIONS invocations by request ID.
+    The index stores the compression and, for every benchmark, the location
+    [offset, length, count] of its metadata block and of blocks of each function.
+    Blocks are compressed with zstd when the zstandard package is installed,
+    and with zlib otherwise.
+"""
+
+ARCHIVE_EXTENSION = ".sebsz"
+MAGIC = b"SEBSARC1"
+VERSION = 1
+BLOCK_INVOCATIONS = 1000
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+_TRAILER = struct.Struct("<Q")
+
+Block = List[int]
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("Archives compressed with zstd require the zstandard package")
+
+
+def _compressor(compression: str) -> Callable[[bytes], bytes]:
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    elif compression == "zlib":
+        return lambda data: zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def _decompressor(compression: str) -> Callable[[bytes], bytes]:
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().decompress
+    elif compression == "zlib":
+        return zlib.decompress
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def is_archive(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ArchiveWriter:
+    """
+    Writes an archive, which replaces the file at path only when closed.
+    Invocations can be added one by one, e.g., while reading a result log.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = path
+        self.compression = compression or default_compression()
+        self._compress = _compressor(self.compression)
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+        self._index: Dict[str, dict] = {}
+        # Invocations not yet written, of each benchmark and function
+        self._pending: Dict[Tuple[str, str], Dict[str, dict]] = {}
+
+    def _write_block(self, data: dict) -> Block:
+        block = self._compress(serialize(data).encode())
+        offset = self._file.tell()
+        self._file.write(block)
+        return [offset, len(block), len(data)]
+
+    def add_metadata(self, benchmark: str, metadata: dict):
+        entry = self._index.setdefault(benchmark, {"metadata": None, "functions": {}})
+        entry["metadata"] = self._write_block(metadata)
+
+    def _flush(self, benchmark: str, function: str):
+        invocations = self._pending.pop((benchmark, function), None)
+        if invocations:
+            entry = self._index.setdefault(benchmark, {"metadata": None, "functions": {}})
+            entry["functions"].setdefault(function, []).append(self._write_block(invocations))
+
+    def add_invocation(self, benchmark: str, function: str, request_id: str, invocation: dict):
+        pending = self._pending.setdefault((benchmark, function), {})
+        pending[request_id] = invocation
+        if len(pending) >= BLOCK_INVOCATIONS:
+            self._flush(benchmark, function)
+
+    def add_result(self, benchmark: str, result: dict):
+        """Add a serialized result, e.g., a JSON export of ExperimentResult."""
+        self.add_metadata(benchmark, {k: v for k, v in result.items() if k != "_invocations"})
+        for function, invocations in result.get("_invocations", {}).items():
+            # Functions without invocations are kept in the index
+            self._index[benchmark]["functions"].setdefault(function, [])
+            self.add_invocations(benchmark, function, invocations.items())
+
+    def add_invocations(
+        self, benchmark: str, function: str, invocations: Iterable[Tuple[str, dict]]
+    ):
+        for request_id, invocation in invocations:
+            self.add_invocation(benchmark, function, request_id, invocation)
+
+    def close(self):
+        for benchmark, function in list(self._pending.keys()):
+            self._flush(benchmark, function)
+        offset = self._file.tell()
+        index = {"version": VERSION, "compression": self.compression, "results": self._index}
+        self._file.write(serialize(index).encode())
+        self._file.write(_TRAILER.pack(offset))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ResultArchive:
+    """Reads results of an archive, decompressing only the requested blocks."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        trailer_size = _TRAILER.size + len(MAGIC)
+        self._file.seek(-trailer_size, os.SEEK_END)
+        trailer = self._file.read(trailer_size)
+        magic_offset = _TRAILER.size
+        if trailer[magic_offset:] != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a result archive or it is incomplete")
+        (offset,) = _TRAILER.unpack(trailer[:magic_offset])
+        self._file.seek(offset)
+        index = json.loads(self._file.read()[:-trailer_size])
+        if index["version"] > VERSION:
+            self._file.close()
+            raise ValueError(f"{path} has unsupported archive version {index['version']}")
+        self.compression = index["compression"]
+        self._decompress = _decompressor(self.compression)
+        self._index: Dict[str, dict] = index["results"]
+
+    def _read_block(self, block: Block) -> dict:
+        offset, length, _ = block
+        self._file.seek(offset)
+        return json.loads(self._decompress(self._file.read(length)))
+
+    def benchmarks(self) -> List[str]:
+        return list(self._index.keys())
+
+    def functions(self, benchmark: str) -> List[str]:
+        return list(self._index[benchmark]["functions"].keys())
+
+    def count(self, benchmark: str, function: str) -> int:
+        return sum(block[2] for block in self._index[benchmark]["functions"][function])
+
+    def metadata(self, benchmark: str) -> dict:
+        block = self._index[benchmark]["metadata"]
+        return self._read_block(block) if block is not None else {}
+
+    def invocations(self, benchmark: str, function: str) -> Iterator[Tuple[str, dict]]:
+        """Serialized invocations of the function by request ID."""
+        for block in self._index[benchmark]["functions"][function]:
+            yield from self._read_block(block).items()
+
+    def result(self, benchmark: str) -> dict:
+        """Serialized result of the benchmark, as in a JSON export of ExperimentResult."""
+        return {
+            **self.metadata(benchmark),
+            "_invocations": {
+                function: dict(self.invocations(benchmark, function))
+                for function in self.functions(benchmark)
+            },
+        }
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "ResultArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_result(path: str, benchmark: Optional[str] = None) -> dict:
+    """
+    Serialized result from a JSON file or an archive.
+    The benchmark is required only for archives with results of several benchmarks.
+    """
+    if not is_archive(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    with ResultArchive(path) as archive:
+        if benchmark is None:
+            benchmarks = archive.benchmarks()
+            if len(benchmarks) != 1:
+                raise ValueError(
+                    f"{path} has results of benchmarks {', '.join(benchmarks)}, select one"
+                )
+            benchmark = benchmarks[0]
+        return archive.result(benchmark)
+
+
+def pack(paths: Dict[str, str], output: str, compression: Optional[str] = None):
+    """Write JSON results to a single archive, paths are given by benchmark name."""
+    with ArchiveWriter(output, compression) as writer:
+        for benchmark, path in paths.items():
+            writer.add_result(benchmark, read_result(path))
+
+
+def unpack(path: str, directory: str) -> List[str]:
+    """Write every result of the archive to a JSON file named after the benchmark."""
+    written = []
+    with ResultArchive(path) as archive:
+        for benchmark in archive.benchmarks():
+            output = os.path.join(directory, f"{benchmark}.json")
+            with open(output, "w") as f:
+                f.write(serialize(archive.result(benchmark)))
+            written.append(output)
+    return written
@@ -0,0 +1,235 @@
+import concurrent.futures
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sebs.experiments.archive import ARCHIVE_EXTENSION, ResultArchive
+from sebs.statistics import QuantileSketch
+
+"""
+    Runtime and memory statistics of closed-loop benchmark results.
+
+    Every result file of a directory is summarized in a pool of processes.
+    Summaries are cached in the directory together with the modification time
+    and size of their file, and the expected number of repetitions they were
+    checked against, so a rerun parses only new and changed results.
+    Plots are rendered by the same processes, and only on request.
+    Archives of results are summarized per benchmark, reading only
+    invocations of the first function of each benchmark.
+"""
+
+STATISTICS_FILE = "statistics.json"
+CACHE_FILE = ".statistics_cache.json"
+PERCENTILES = [1, 25, 50, 75, 99]
+# Fields of the benchmark output
+METRICS = {"memusage": "memusage", "runtime": "results_time"}
+# Names of metrics in plot files
+PLOT_NAMES = {"memusage": "memusage", "runtime": "latencies"}
+
+
+def describe(values: np.ndarray) -> dict:
+    sketch = QuantileSketch(exact_limit=len(values))
+    sketch.add_many(values)
+    stats = {"mean": sketch.mean, "p0": sketch.min}
+    for p in PERCENTILES:
+        stats[f"p{p}"] = sketch.percentile(p)
+    stats["p100"] = sketch.max
+    return stats
+
+
+def experiment_name(filename: str) -> str:
+    return ".".join(filename.split(".")[0:2])
+
+
+def _load_metrics(
+    path: str, expected_repetitions: Optional[int], benchmark: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    # Results of a single function
+    if benchmark is not None:
+        with ResultArchive(path) as archive:
+            function = archive.functions(benchmark)[0]
+            invocations = [inv for _, inv in archive.invocations(benchmark, function)]
+    else:
+        with open(path, "r") as f:
+            exp = json.load(f)
+        invocations = list(next(iter(exp["_invocations"].values())).values())
+    if expected_repetitions is not None and len(invocations) != expected_repetitions:
+        raise ValueError(
+            f"{path} has {len(invocations)} invocations, expected {expected_repetitions}"
+        )
+    return {
+        metric: np.array([inv["output"][field] for inv in invocations], dtype=float)
+        for metric, field in METRICS.items()
+    }
+
+
+def _plot(directory: str, exp_name: str, metric: str, data: np.ndarray):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    p99 = np.percentile(data, 99)
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.axvline(p99, color="r", linestyle="--", label="p99")
+    ax.annotate(
+        f"p99:{p99:.0f}",
+        xy=(p99, 0.9),
+        xytext=(p99 + 5000, 0.85),
+        arrowprops=dict(facecolor="black", arrowstyle="->"),
+        fontsize=12,
+    )
+    sns.ecdfplot(data=data, ax=ax)
+    fig.savefig(os.path.join(directory, f"{exp_name}_{metric}_percentile.png"))
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.kdeplot(data=data, ax=ax)
+    fig.savefig(os.path.join(directory, f"{exp_name}_{metric}_pdf.png"))
+    plt.close(fig)
+
+
+def _has_plots(directory: str, exp_name: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(directory, f"{exp_name}_{metric}_{kind}.png"))
+        for metric in PLOT_NAMES.values()
+        for kind in ("percentile", "pdf")
+    )
+
+
+def summarize_file(
+    path: str,
+    plots: bool,
+    expected_repetitions: Optional[int] = None,
+    benchmark: Optional[str] = None,
+) -> dict:
+    """
+    Statistics of a JSON result, or of a benchmark's result in an archive.
+    """
+    metrics = _load_metrics(path, expected_repetitions, benchmark)
+    if plots:
+        exp_name = benchmark if benchmark is not None else experiment_name(os.path.basename(path))
+        for metric, data in metrics.items():
+            _plot(os.path.dirname(path), exp_name, PLOT_NAMES[metric], data)
+    return {metric: describe(data) for metric, data in metrics.items()}
+
+
+def _file_key(path: str, expected_repetitions: Optional[int]) -> list:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, expected_repetitions]
+
+
+def check_exported(directory: str):
+    """
+    Raise when results of the directory are stored only as columnar records,
+    which schedule experiments write unless results are exported.
+    """
+    filenames = os.listdir(directory)
+    stems = {
+        os.path.splitext(filename)[0]
+        for filename in filenames
+        if filename.endswith((".json", ARCHIVE_EXTENSION))
+    }
+    records_only = sorted(
+        filename
+        for filename in filenames
+        if filename.endswith(".npz") and os.path.splitext(filename)[0] not in stems
+    )
+    if records_only:
+        raise ValueError(
+            f"Results {', '.join(records_only)} in {directory} are stored only as columnar "
+            "records: rerun the experiment with --export json or --export archive."
+        )
+
+
+def collect(
+    directory: str,
+    processes: Optional[int] = None,
+    plots: bool = False,
+    expected_repetitions: Optional[int] = None,
+) -> Dict[str, dict]:
+    """
+    Statistics of all results in the directory, also written to its statistics.json.
+
+    :param processes: size of the process pool, number of CPUs by default
+    :param plots: render CDF and PDF plots of files which are parsed
+    :param expected_repetitions: fail on results with a different number of invocations
+    """
+    cache_path = os.path.join(directory, CACHE_FILE)
+    cache: Dict[str, dict] = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+
+    files = sorted(
+        filename
+        for filename in os.listdir(directory)
+        if filename.endswith((".json", ARCHIVE_EXTENSION))
+        and filename not in (STATISTICS_FILE, CACHE_FILE)
+    )
+    check_exported(directory)
+    # Summarized units: JSON files and benchmarks of archives, by cache entry
+    units: Dict[str, Tuple[str, Optional[str], str]] = {}
+    for filename in files:
+        if filename.endswith(ARCHIVE_EXTENSION):
+            with ResultArchive(os.path.join(directory, filename)) as archive:
+                for benchmark in archive.benchmarks():
+                    units[f"{filename}:{benchmark}"] = (filename, benchmark, benchmark)
+        else:
+            units[filename] = (filename, None, experiment_name(filename))
+    keys = {
+        filename: _file_key(os.path.join(directory, filename), expected_repetitions)
+        for filename in files
+    }
+    changed = [
+        unit
+        for unit, (filename, _, exp_name) in units.items()
+        if unit not in cache
+        or cache[unit]["key"] != keys[filename]
+        or (plots and not _has_plots(directory, exp_name))
+    ]
+    if changed:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {
+                unit: pool.submit(
+                    summarize_file,
+                    os.path.join(directory, units[unit][0]),
+                    plots,
+                    expected_repetitions,
+                    units[unit][1],
+                )
+                for unit in changed
+            }
+            for unit, future in futures.items():
+                cache[unit] = {"key": keys[units[unit][0]], "summary": future.result()}
+    cache = {unit: cache[unit] for unit in units}
+    with open(cache_path, "w") as f:
+        json.dump(cache, f)
+
+    data = {exp_name: cache[unit]["summary"] for unit, (_, _, exp_name) in units.items()}
+    with open(os.path.join(directory, STATISTICS_FILE), "w") as f:
+        json.dump(data, f, indent=4)
+    return data
+
+
+def overhead(
+    baseline: Dict[str, dict], other: Dict[str, dict], benchmarks: Optional[List[str]] = None
+) -> Dict[str, dict]:
+    """
+    Statistics of the other results as percentage of the baseline, e.g., of QEMU over host.
+    Compares experiments present in both results when benchmarks are not given.
+    """
+    if benchmarks is None:
+        benchmarks = sorted(set(baseline.keys()) & set(other.keys()))
+    ret: Dict[str, dict] = {}
+    for benchmark in benchmarks:
+        ret[benchmark] = {}
+        for metric, stats in baseline[benchmark].items():
+            ret[benchmark][metric] = {
+                key: other[benchmark][metric][key] / value * 100 if value != 0 else float("nan")
+                for key, value in stats.items()
+            }
+    return ret
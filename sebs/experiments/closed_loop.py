@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from sebs.utils import LoggingBase
+
+"""
+    Closed-loop load driver.
+
+    Each of the N clients sends a request, waits for the response, optionally
+    waits for a think time, and repeats - so exactly N requests are in flight
+    when think time is zero. Functions are chosen at random with the given weights,
+    e.g., proportionally to their share of a schedule.
+
+    Running the driver at increasing N gives the throughput-latency curve of
+    the deployment: throughput grows with N until the platform saturates,
+    and afterwards only the latency grows.
+"""
+
+# Callback receiving function name and value returned by the invocation.
+# Client send and receive times are recorded in the result by the trigger.
+ClosedLoopCallback = Callable[[str, Any], None]
+
+
+def parse_think_time(spec: str) -> Callable[[random.Random], float]:
+    """
+    Think time distribution in seconds:
+    "0", "constant:<s>", "exponential:<mean s>" or "uniform:<min s>:<max s>".
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind in ("0", "none"):
+        return lambda rng: 0.0
+    elif kind == "constant" and len(values) == 1:
+        return lambda rng: values[0]
+    elif kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    elif kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    raise ValueError(f"Unknown think time distribution {spec}")
+
+
+class LevelResult:
+    def __init__(self, concurrency: int, duration: float, latencies: List[float], failures: int):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.completed = len(latencies)
+        self.failures = failures
+        self.throughput = self.completed / duration if duration > 0 else 0.0
+        if latencies:
+            lat = np.array(latencies) * 1000.0
+            self.latency_mean = float(np.mean(lat))
+            self.latency_p50, self.latency_p90, self.latency_p99 = (
+                float(x) for x in np.percentile(lat, [50, 90, 99])
+            )
+        else:
+            self.latency_mean = self.latency_p50 = self.latency_p90 = self.latency_p99 = 0.0
+
+    def serialize(self) -> dict:
+        return dict(self.__dict__)
+
+    def __str__(self) -> str:
+        return (
+            f"N={self.concurrency}: {self.throughput:.2f} req/s, "
+            f"latency mean {self.latency_mean:.1f} ms, p50 {self.latency_p50:.1f} ms, "
+            f"p90 {self.latency_p90:.1f} ms, p99 {self.latency_p99:.1f} ms, "
+            f"{self.failures} failures"
+        )
+
+
+def find_knee(levels: List[LevelResult], fraction: float = 0.9) -> Optional[LevelResult]:
+    """
+    Smallest concurrency reaching the given fraction of the peak throughput.
+    Adding clients beyond this point mostly increases latency.
+    """
+    if not levels:
+        return None
+    peak = max(level.throughput for level in levels)
+    return min(
+        (level for level in levels if level.throughput >= fraction * peak),
+        key=lambda level: level.concurrency,
+    )
+
+
+class ClosedLoopDriver(LoggingBase):
+    def __init__(
+        self,
+        invoke: Callable[[str], Any],
+        weights: Dict[str, float],
+        think_time: Callable[[random.Random], float],
+        seed: int = 42,
+    ):
+        """
+        :param invoke: blocking invocation of a function
+        :param weights: function names and their share of requests
+        :param think_time: samples time between a response and the next request
+        :param seed: seed of random choices of clients
+        """
+        super().__init__()
+        self._invoke = invoke
+        self._functions = list(weights.keys())
+        self._weights = list(weights.values())
+        self._think_time = think_time
+        self._seed = seed
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.ClosedLoopDriver"
+
+    def run(
+        self,
+        concurrency: int,
+        duration: float,
+        warmup: float = 0.0,
+        on_result: Optional[ClosedLoopCallback] = None,
+    ) -> LevelResult:
+        """
+        Run N clients for warmup + duration seconds.
+        Only requests sent after the warmup and finished before the end are measured.
+        """
+        lock = threading.Lock()
+        latencies: List[float] = []
+        failures = [0]
+        begin = time.perf_counter()
+        measure_begin = begin + warmup
+        measure_end = measure_begin + duration
+
+        def client(idx: int):
+            rng = random.Random(self._seed * 1_000_003 + idx)
+            while time.perf_counter() < measure_end:
+                fn_name = rng.choices(self._functions, weights=self._weights)[0]
+                sent = time.perf_counter()
+                try:
+                    ret = self._invoke(fn_name)
+                    failed = ret.stats.failure
+                except Exception as e:
+                    self.logging.error(f"Invocation of {fn_name} failed: {e}")
+                    ret = None
+                    failed = True
+                received = time.perf_counter()
+                if sent >= measure_begin and received <= measure_end:
+                    with lock:
+                        if failed:
+                            failures[0] += 1
+                        else:
+                            latencies.append(received - sent)
+                        if on_result is not None and ret is not None:
+                            on_result(fn_name, ret)
+                think = self._think_time(rng)
+                if think > 0:
+                    time.sleep(think)
+
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        return LevelResult(concurrency, duration, latencies, failures[0])
@@ -0,0 +1,90 @@
+import asyncio
+import concurrent.futures
+import functools
+import time
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from sebs.experiments.schedule import ScheduleObject
+from sebs.utils import LoggingBase
+
+"""
+    Open-loop dispatcher of a schedule.
+
+    Each schedule object is sent at its target time, independently of
+    requests that have not returned yet. Invocations are blocking calls
+    executed on a thread pool; the event loop only keeps the timing.
+    The number of requests in flight is bounded - once the limit is reached,
+    new requests are delayed and the delay is visible in the send lateness.
+"""
+
+# Callback receiving schedule object, scheduled and actual send time
+# (nanoseconds since epoch), and the value returned by the invocation.
+ResultCallback = Callable[[ScheduleObject, int, int, Any], None]
+
+
+class ScheduleDispatcher(LoggingBase):
+    def __init__(self, invoke: Callable[[str], Any], max_inflight: int = 256):
+        super().__init__()
+        self._invoke = invoke
+        self._max_inflight = max_inflight
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.ScheduleDispatcher"
+
+    @property
+    def max_inflight(self) -> int:
+        return self._max_inflight
+
+    def run(
+        self,
+        schedule: Iterable[ScheduleObject],
+        on_result: ResultCallback,
+        start: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        """
+        Dispatch the schedule and block until all invocations return.
+
+        :param schedule: schedule objects sorted by timestamp, relative to start
+        :param on_result: called in the dispatching thread for each finished invocation
+        :param start: schedule origin in nanoseconds since epoch, defaults to now
+        :return: timestamps of the schedule origin and of the last response
+        """
+        if start is None:
+            start = time.time_ns()
+        asyncio.run(self._dispatch(schedule, on_result, start))
+        return start, time.time_ns()
+
+    async def _dispatch(
+        self, schedule: Iterable[ScheduleObject], on_result: ResultCallback, start: int
+    ):
+        loop = asyncio.get_running_loop()
+        inflight = asyncio.Semaphore(self._max_inflight)
+        pending = set()
+
+        def finished(so: ScheduleObject, scheduled: int, sent: int, fut: asyncio.Future):
+            inflight.release()
+            pending.discard(fut)
+            try:
+                ret = fut.result()
+            except Exception as e:
+                self.logging.error(f"Invocation of {so.fn_name} failed: {e}")
+                ret = None
+            on_result(so, scheduled, sent, ret)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_inflight) as executor:
+            for so in schedule:
+                scheduled = start + so.timestamp
+                delay = scheduled - time.time_ns()
+                if delay > 0:
+                    await asyncio.sleep(delay / 1_000_000_000)
+                await inflight.acquire()
+
+                sent = time.time_ns()
+                fut = loop.run_in_executor(executor, self._invoke, so.fn_name)
+                pending.add(fut)
+                fut.add_done_callback(functools.partial(finished, so, scheduled, sent))
+            if pending:
+                await asyncio.wait(list(pending))
+            # Let the done callbacks of the last invocations run.
+            await asyncio.sleep(0)
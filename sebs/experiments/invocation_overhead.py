@@ -291,7 +291,7 @@ class InvocationOverhead(Experiment):
         return [
             is_cold,
             res.times.http_startup,
-            res.times.client_begin.timestamp(),
+            res.times.client_begin / 1_000_000_000,
             server_timestamp,
             request_id,
         ]
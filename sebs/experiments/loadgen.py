@@ -0,0 +1,506 @@
+import json
+import multiprocessing
+import queue
+import socket
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sebs.experiments.dispatcher import ScheduleDispatcher
+from sebs.experiments.schedule import ScheduleConfig, ScheduleObject, ScheduleSpec
+from sebs.faas.function import ExecutionResult
+from sebs.statistics import QuantileSketch
+from sebs.utils import LoggingBase, serialize
+
+"""
+    Distributed load generator for open-close workloads.
+
+    The coordinator deploys functions and sends the schedule files and their
+    transforms to agents, which must be able to read the files.
+    Agents connect to the coordinator, one per load-generating host, and
+    each one runs a number of worker processes. Every agent converts JSON
+    schedules to columnar ones once, and every worker process reads only its
+    shard from them and replays it with its own event loop, sending at most
+    `concurrency` requests at the same time - with a single request in flight,
+    the worker is a closed-loop client.
+
+    Before the start, the coordinator estimates the clock offset of each agent
+    from a series of ping-pong exchanges and keeps the sample with the shortest
+    round trip. All workers start at the same instant of the coordinator clock,
+    and client timestamps are moved to the coordinator clock before
+    being sent back.
+
+    Workers stream results in batches while the experiment runs - locally
+    through a multiprocessing queue, remotely over their own TCP connection
+    to the coordinator. Messages are newline-delimited JSON documents.
+"""
+
+Address = Tuple[str, int]
+
+# Seconds to wait for messages of workers sent over their own connections,
+# after the connection of their agent was closed
+DISCONNECT_GRACE = 10.0
+# Seconds to wait for the last results after the end of the schedule
+DRAIN_TIMEOUT = 900.0
+# Seconds between checks of closed connections and of the deadline
+POLL_INTERVAL = 1.0
+
+
+def parse_address(address: str) -> Address:
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class Connection:
+    """Newline-delimited JSON messages over a TCP socket."""
+
+    def __init__(self, sock: socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def connect(address: Address, timeout: float = 60.0) -> "Connection":
+        return Connection(socket.create_connection(address, timeout=timeout))
+
+    def send(self, msg: dict):
+        data = serialize(msg).encode() + b"\n"
+        with self._lock:
+            self._sock.sendall(data)
+
+    def recv(self) -> Optional[dict]:
+        line = self._reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def settimeout(self, timeout: Optional[float]):
+        self._sock.settimeout(timeout)
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+class SocketSink:
+    """Sends worker messages to the coordinator, connects lazily in the worker process."""
+
+    def __init__(self, address: Address):
+        self._address = address
+        self._conn: Optional[Connection] = None
+
+    def put(self, msg: dict):
+        if self._conn is None:
+            self._conn = Connection.connect(self._address)
+            self._conn.settimeout(None)
+        self._conn.send(msg)
+        if msg["type"] == "done":
+            self._conn.close()
+            self._conn = None
+
+
+class LoadWorker(LoggingBase):
+    def __init__(
+        self,
+        idx: int,
+        triggers: dict,
+        schedule: ScheduleSpec,
+        n_workers: int,
+        start: int,
+        sink: Any,
+        concurrency: int = 1,
+        clock_offset: int = 0,
+        batch_size: int = 64,
+    ):
+        """
+        :param idx: global worker index
+        :param triggers: function name to a dictionary with "trigger" and "input"
+        :param schedule: the entire schedule, the worker replays its shard idx out of n_workers
+        :param n_workers: number of workers of all agents
+        :param start: start of the experiment in nanoseconds since epoch, local clock
+        :param sink: object with a `put` method accepting messages
+        :param concurrency: maximal number of requests in flight
+        :param clock_offset: local clock minus coordinator clock, in nanoseconds
+        :param batch_size: number of results in a single message
+        """
+        super().__init__()
+        self._idx = idx
+        self._triggers = triggers
+        self._schedule = schedule
+        self._n_workers = n_workers
+        self._start = start
+        self._sink = sink
+        self._concurrency = concurrency
+        self._clock_offset = clock_offset
+        self._batch_size = batch_size
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.LoadWorker"
+
+    def run(self):
+        """Replay the shard of the schedule and stream results to the sink."""
+        idx, triggers, sink = self._idx, self._triggers, self._sink
+        clock_offset = self._clock_offset
+        counters = {fn_name: {"success": 0, "failure": 0} for fn_name in triggers.keys()}
+        # Latency from schedule of successful requests in milliseconds, merged by the coordinator.
+        latencies = {fn_name: QuantileSketch() for fn_name in triggers.keys()}
+        batch: List[Tuple[str, ExecutionResult]] = []
+
+        def invoke(fn_name: str):
+            return triggers[fn_name]["trigger"].sync_invoke(triggers[fn_name]["input"])
+
+        def flush():
+            sink.put({"type": "results", "worker": idx, "items": list(batch)})
+            batch.clear()
+
+        def finished(so: ScheduleObject, scheduled: int, sent: int, ret):
+            if ret is None or ret.executionResult.stats.failure:
+                counters[so.fn_name]["failure"] += 1
+                if ret is None:
+                    return
+            else:
+                # Time the request spent waiting for the previous ones to finish.
+                ret.executionResult.times.latencyCorrection = sent - scheduled
+                counters[so.fn_name]["success"] += 1
+            times = ret.executionResult.times
+            times.scheduled = scheduled
+            if not ret.executionResult.stats.failure and hasattr(times, "received"):
+                latencies[so.fn_name].add((times.received - scheduled) / 1_000_000)
+            if clock_offset != 0:
+                for field in ("client_begin", "client_end", "scheduled", "sent", "received"):
+                    if hasattr(times, field):
+                        setattr(times, field, getattr(times, field) - clock_offset)
+            batch.append((so.fn_name, ret.executionResult))
+            if len(batch) >= self._batch_size:
+                flush()
+
+        shard = self._schedule.shard(idx, self._n_workers)
+        dispatcher = ScheduleDispatcher(invoke, self._concurrency)
+        worker_start, worker_end = dispatcher.run(shard, finished, self._start)
+        if batch:
+            flush()
+        self.logging.info(f"Worker {idx} is done with its schedule")
+        sink.put(
+            {
+                "type": "done",
+                "worker": idx,
+                "worker_start": worker_start - clock_offset,
+                "worker_end": worker_end - clock_offset,
+                "counter": counters,
+                "latencies": latencies,
+            }
+        )
+
+
+def run_worker(*args, **kwargs):
+    """Target of worker processes, with the arguments of LoadWorker."""
+    LoadWorker(*args, **kwargs).run()
+
+
+class LoadResults:
+    """Merges messages of all workers, on the coordinator clock."""
+
+    def __init__(self, on_result: Callable[[str, ExecutionResult], None]):
+        self._on_result = on_result
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self.latencies: Dict[str, QuantileSketch] = {}
+        self.begin: Optional[int] = None
+        self.end: Optional[int] = None
+        # Workers which finished without reporting their results
+        self.failed_workers: List[int] = []
+
+    def handle(self, msg: dict) -> bool:
+        """
+        Process a single worker message.
+        Returns true when the worker has finished.
+        """
+        if msg["type"] == "results":
+            for fn_name, ret in msg["items"]:
+                if isinstance(ret, dict):
+                    ret = ExecutionResult.deserialize(ret)
+                self._on_result(fn_name, ret)
+            return False
+        elif msg["type"] == "done":
+            if self.begin is None or msg["worker_start"] < self.begin:
+                self.begin = msg["worker_start"]
+            if self.end is None or msg["worker_end"] > self.end:
+                self.end = msg["worker_end"]
+            for fn_name, counter in msg["counter"].items():
+                total = self.counters.setdefault(fn_name, {"success": 0, "failure": 0})
+                total["success"] += counter["success"]
+                total["failure"] += counter["failure"]
+            for fn_name, sketch in msg.get("latencies", {}).items():
+                if isinstance(sketch, dict):
+                    sketch = QuantileSketch.deserialize(sketch)
+                self.latencies.setdefault(fn_name, QuantileSketch()).merge(sketch)
+            return True
+        elif msg["type"] == "exit":
+            # Worker process died before reporting its results.
+            self.failed_workers.append(msg["worker"])
+            return True
+        raise RuntimeError(f"Unknown message type {msg['type']}")
+
+
+class LoadCoordinator(LoggingBase):
+    def __init__(
+        self,
+        address: Address,
+        n_agents: int,
+        sync_rounds: int = 16,
+        start_delay: float = 5.0,
+        drain_timeout: float = DRAIN_TIMEOUT,
+    ):
+        """
+        :param address: address to listen on
+        :param n_agents: number of agents to wait for
+        :param sync_rounds: number of ping-pong exchanges for estimating the clock offset
+        :param start_delay: time between the start message and the start, in seconds
+        :param drain_timeout: time to wait for results after the end of the schedule, in seconds
+        """
+        super().__init__()
+        self._address = address
+        self._n_agents = n_agents
+        self._sync_rounds = sync_rounds
+        self._start_delay = start_delay
+        self._drain_timeout = drain_timeout
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.LoadCoordinator"
+
+    def _clock_offset(self, conn: Connection) -> Tuple[int, int]:
+        """
+        Returns the offset of agent clock to the local one and the round trip,
+        in nanoseconds.
+        """
+        best: Optional[Tuple[int, int]] = None
+        for _ in range(self._sync_rounds):
+            t0 = time.time_ns()
+            conn.send({"type": "ping", "t0": t0})
+            msg = conn.recv()
+            t2 = time.time_ns()
+            if msg is None or msg["type"] != "pong":
+                raise RuntimeError("Agent disconnected during clock synchronization")
+            rtt = t2 - t0
+            offset = msg["t1"] - (t0 + t2) // 2
+            if best is None or rtt < best[1]:
+                best = (offset, rtt)
+        assert best
+        return best
+
+    def run(
+        self,
+        functions: Dict[str, dict],
+        schedule: ScheduleConfig,
+        results: LoadResults,
+        concurrency: int = 1,
+    ):
+        """
+        Wait for agents, distribute the schedule and merge results until all workers finish.
+        Workers whose connection, or the connection of their agent, closes before they
+        report results, and workers which do not finish before the deadline, are marked
+        as failed.
+
+        :param functions: function name to the serialized function and its input
+        :param schedule: the entire schedule, loaded by ScheduleSpec.load - agents
+            receive the specification and every worker loads its own shard
+        :param results: receives messages of workers
+        :param concurrency: maximal number of requests in flight of each worker
+        """
+        spec = schedule.spec
+        if spec is None:
+            raise ValueError("Agents load the schedule themselves, it has to be loaded from files")
+        server = socket.create_server(self._address, backlog=1024)
+        self.logging.info(f"Waiting for {self._n_agents} agents on {self._address}")
+        agents: List[Tuple[Connection, dict]] = []
+        while len(agents) < self._n_agents:
+            sock, addr = server.accept()
+            conn = Connection(sock)
+            hello = conn.recv()
+            if hello is None or hello["type"] != "hello":
+                conn.close()
+                continue
+            offset, rtt = self._clock_offset(conn)
+            hello["offset"] = offset
+            agents.append((conn, hello))
+            self.logging.info(
+                f"Agent {hello['host']} ({addr[0]}) with {hello['processes']} processes, "
+                f"clock offset {offset / 1e6:.3f} ms, round trip {rtt / 1e6:.3f} ms"
+            )
+
+        # Agents create triggers and convert the schedule before the start time is set
+        for conn, _ in agents:
+            conn.send({"type": "prepare", "functions": functions, "schedule": spec.serialize()})
+        for conn, hello in agents:
+            msg = conn.recv()
+            if msg is None or msg["type"] != "ready":
+                raise RuntimeError(f"Agent {hello['host']} disconnected while preparing")
+
+        messages: queue.Queue = queue.Queue()
+
+        def read(conn: Connection, workers: Set[int], agent: bool):
+            """
+            Forward messages of the connection, and report its workers once it closes.
+            Workers of a worker connection are known from its messages.
+            """
+            try:
+                while True:
+                    msg = conn.recv()
+                    if msg is None:
+                        break
+                    if "worker" in msg:
+                        workers.add(msg["worker"])
+                    messages.put(msg)
+            except (OSError, ValueError) as e:
+                self.logging.error(f"Reading results failed: {e}")
+            finally:
+                conn.close()
+                messages.put({"type": "closed", "workers": sorted(workers), "agent": agent})
+
+        def accept():
+            while True:
+                try:
+                    sock, _ = server.accept()
+                except OSError:
+                    break
+                conn = Connection(sock)
+                conn.settimeout(None)
+                threading.Thread(target=read, args=(conn, set(), False), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+
+        n_workers = sum(hello["processes"] for _, hello in agents)
+        start = time.time_ns() + int(self._start_delay * 1e9)
+        worker = 0
+        for conn, hello in agents:
+            conn.send(
+                {
+                    "type": "start",
+                    "start": start,
+                    "offset": hello["offset"],
+                    "concurrency": concurrency,
+                    "n_workers": n_workers,
+                    "workers": list(range(worker, worker + hello["processes"])),
+                }
+            )
+            shards = set(range(worker, worker + hello["processes"]))
+            worker += hello["processes"]
+            conn.settimeout(None)
+            threading.Thread(target=read, args=(conn, shards, True), daemon=True).start()
+        self.logging.info(f"Starting {n_workers} workers in {self._start_delay} seconds")
+
+        deadline = (
+            time.monotonic()
+            + (start - time.time_ns() + schedule.duration) / 1e9
+            + self._drain_timeout
+        )
+        finished: Set[int] = set()
+        # Workers of closed agent connections, with the time to give up on them
+        orphaned: Dict[int, float] = {}
+
+        def fail(idx: int, reason: str):
+            self.logging.error(f"Worker {idx} failed: {reason}")
+            results.handle({"type": "exit", "worker": idx})
+            finished.add(idx)
+
+        while len(finished) < n_workers:
+            now = time.monotonic()
+            for idx, give_up in list(orphaned.items()):
+                if idx in finished:
+                    del orphaned[idx]
+                elif now > give_up:
+                    del orphaned[idx]
+                    fail(idx, "its agent disconnected before the worker reported results")
+            if now > deadline:
+                for idx in sorted(set(range(n_workers)) - finished):
+                    fail(idx, "no results before the deadline")
+                break
+            try:
+                msg = messages.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if msg["type"] == "closed":
+                for idx in msg["workers"]:
+                    if idx in finished:
+                        continue
+                    if msg["agent"]:
+                        # Results might still arrive over the connection of the worker
+                        orphaned.setdefault(idx, now + DISCONNECT_GRACE)
+                    else:
+                        fail(idx, "connection closed before the worker reported results")
+            elif msg["type"] == "exit" and msg["worker"] in finished:
+                # The failure of the worker was already detected by its connection
+                continue
+            elif results.handle(msg):
+                finished.add(msg["worker"])
+        server.close()
+
+
+class LoadAgent(LoggingBase):
+    def __init__(
+        self,
+        coordinator: Address,
+        processes: int,
+        prepare_triggers: Callable[[Dict[str, dict]], dict],
+    ):
+        """
+        :param coordinator: address of the coordinator
+        :param processes: number of worker processes on this host
+        :param prepare_triggers: creates triggers from functions serialized by the coordinator
+        """
+        super().__init__()
+        self._coordinator = coordinator
+        self._processes = processes
+        self._prepare_triggers = prepare_triggers
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.LoadAgent"
+
+    def run(self):
+        conn = Connection.connect(self._coordinator)
+        conn.settimeout(None)
+        conn.send({"type": "hello", "host": socket.gethostname(), "processes": self._processes})
+        with tempfile.TemporaryDirectory(prefix="sebs_schedule_") as schedule_dir:
+            while True:
+                msg = conn.recv()
+                if msg is None:
+                    raise RuntimeError("Coordinator closed the connection before the start")
+                if msg["type"] == "ping":
+                    conn.send({"type": "pong", "t0": msg["t0"], "t1": time.time_ns()})
+                elif msg["type"] == "prepare":
+                    triggers = self._prepare_triggers(msg["functions"])
+                    # Parsed once on this host instead of once by every worker
+                    schedule = ScheduleSpec.deserialize(msg["schedule"]).columnar(schedule_dir)
+                    conn.send({"type": "ready"})
+                elif msg["type"] == "start":
+                    break
+
+            offset = msg["offset"]
+            start = msg["start"] + offset
+            self.logging.info(f"Starting {len(msg['workers'])} workers, clock offset {offset} ns")
+            workers = []
+            for idx in msg["workers"]:
+                p = multiprocessing.Process(
+                    target=run_worker,
+                    args=(
+                        idx,
+                        triggers,
+                        schedule,
+                        msg["n_workers"],
+                        start,
+                        SocketSink(self._coordinator),
+                    ),
+                    kwargs={"concurrency": msg["concurrency"], "clock_offset": offset},
+                )
+                workers.append((idx, p))
+                p.start()
+            for idx, p in workers:
+                p.join()
+                if p.exitcode != 0:
+                    self.logging.error(f"Worker {idx} failed with exit code {p.exitcode}")
+                    conn.send({"type": "exit", "worker": idx, "code": p.exitcode})
+        conn.close()
@@ -3,7 +3,6 @@ import socket
 import os
 import time
 import glob
-import pandas as pd
 from datetime import datetime
 from itertools import repeat
 from typing import Dict, TYPE_CHECKING
@@ -62,8 +61,9 @@ class NetworkPingPong(Experiment):
         self._storage.download_bucket(self.benchmark_input["output-bucket"], self._out_dir)
 
     def process(self, directory: str):
+        import pandas as pd
 
-        full_data: Dict[str, pd.Dataframe] = {}
+        full_data: Dict[str, "pd.DataFrame"] = {}
         for f in glob.glob(os.path.join(directory, "network-ping-pong", "*.csv")):
 
             request_id = os.path.basename(f).split("-", 1)[1].split(".")[0]
@@ -11,7 +11,6 @@ from sebs.experiments.experiment import Experiment
 from sebs.experiments.result import Result as ExperimentResult
 from sebs.experiments.config import Config as ExperimentConfig
 from sebs.utils import serialize
-from sebs.statistics import basic_stats, ci_tstudents, ci_le_boudec
 
 # import cycle
 if TYPE_CHECKING:
@@ -85,8 +84,12 @@ class PerfCost(Experiment):
             self.run_configuration(settings, settings["repetitions"], suffix=str(memory))
 
     def compute_statistics(self, times: List[float]):
+        from sebs.statistics import QuantileSketch, ci_tstudents, ci_le_boudec, sketch_stats
 
-        mean, median, std, cv = basic_stats(times)
+        # Sorted once for confidence intervals of all levels
+        sketch = QuantileSketch(exact_limit=len(times))
+        sketch.add_many(times)
+        mean, median, std, cv = sketch_stats(sketch)
         self.logging.info(f"Mean {mean} [ms], median {median} [ms], std {std}, CV {cv}")
         for alpha in [0.95, 0.99]:
             ci_interval = ci_tstudents(alpha, times)
@@ -98,7 +101,7 @@ class PerfCost(Experiment):
             )
 
             if len(times) > 20:
-                ci_interval = ci_le_boudec(alpha, times)
+                ci_interval = ci_le_boudec(alpha, sketch)
                 interval_width = ci_interval[1] - ci_interval[0]
                 ratio = 100 * interval_width / median / 2.0
                 self.logging.info(
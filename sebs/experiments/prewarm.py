@@ -0,0 +1,100 @@
+import concurrent.futures
+import math
+from typing import Any, Callable, Dict, List
+
+from sebs.utils import LoggingBase
+
+"""
+    Warm-up phase before a measured experiment.
+
+    A function has as many warm containers as concurrent requests it received:
+    OpenWhisk starts a new container for every request that finds no idle one.
+    We send rounds of concurrent blocking invocations until a round of each function
+    finds all its containers warm. Results of the warm-up are kept apart from
+    the measured invocations.
+"""
+
+# Default memory of an OpenWhisk action in MB.
+DEFAULT_CONTAINER_MEMORY = 128
+
+
+def max_concurrency(
+    n_invokers: int, invoker_memory: int, container_memory: int = DEFAULT_CONTAINER_MEMORY
+) -> int:
+    """
+    Number of containers fitting into the container pools of all invokers.
+
+    :param n_invokers: number of invoker instances
+    :param invoker_memory: memory of the container pool of a single invoker, in MB
+    :param container_memory: memory of a single container, in MB
+    """
+    return math.floor((n_invokers * invoker_memory) / container_memory)
+
+
+def plan_containers(
+    target: int, memory: Dict[str, int], n_invokers: int, invoker_memory: int
+) -> Dict[str, int]:
+    """
+    Number of warm containers for each function.
+    When the targets do not fit into the container pools, all functions are
+    scaled down proportionally, keeping at least one container for each.
+
+    :param target: requested number of warm containers of each function
+    :param memory: memory of each function, in MB
+    """
+    capacity = n_invokers * invoker_memory
+    requested = sum(target * mem for mem in memory.values())
+    if requested <= capacity:
+        return {fn: target for fn in memory.keys()}
+    scale = capacity / requested
+    return {fn: max(1, math.floor(target * scale)) for fn in memory.keys()}
+
+
+class Prewarmer(LoggingBase):
+    def __init__(self, invoke: Callable[[str], Any], max_rounds: int = 3):
+        """
+        :param invoke: blocking invocation of a function
+        :param max_rounds: maximal number of rounds of concurrent invocations
+        """
+        super().__init__()
+        self._invoke = invoke
+        self._max_rounds = max_rounds
+
+    @staticmethod
+    def typename() -> str:
+        return "Experiment.Prewarmer"
+
+    def run(self, containers: Dict[str, int]) -> Dict[str, List[Any]]:
+        """
+        Invoke functions until each one has the requested number of warm containers.
+        Returns the warm-up invocations of each function.
+        """
+        results: Dict[str, List[Any]] = {fn: [] for fn in containers.keys()}
+        pending = {fn: n for fn, n in containers.items() if n > 0}
+        workers = max(sum(pending.values()), 1)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for round_idx in range(self._max_rounds):
+                if not pending:
+                    break
+                futures = {
+                    pool.submit(self._invoke, fn): fn for fn, n in pending.items() for _ in range(n)
+                }
+                cold: Dict[str, int] = {fn: 0 for fn in pending.keys()}
+                for fut in concurrent.futures.as_completed(futures):
+                    fn = futures[fut]
+                    try:
+                        ret = fut.result()
+                    except Exception as e:
+                        self.logging.error(f"Warm-up invocation of {fn} failed: {e}")
+                        cold[fn] += 1
+                        continue
+                    ret.stats.warmup = True
+                    if ret.stats.failure or ret.stats.cold_start:
+                        cold[fn] += 1
+                    results[fn].append(ret)
+                self.logging.info(f"Warm-up round {round_idx + 1}, cold or failed: {cold}")
+                # The next round checks that containers started in this round are reused.
+                pending = {fn: pending[fn] for fn in pending.keys() if cold[fn] > 0}
+        if pending:
+            self.logging.warning(f"Functions not warm after {self._max_rounds} rounds: {pending}")
+        return results
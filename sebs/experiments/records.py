@@ -0,0 +1,388 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from sebs.faas.function import ExecutionResult, timestamp_ns
+
+"""
+    Columnar store of invocation records.
+
+    Every invocation is one row; columns are typed NumPy arrays stored together
+    in a compressed .npz file, which loads without parsing and without
+    building an object per invocation. Missing integer values are stored as
+    INT_MISSING, missing floats as NaN and missing strings as empty strings.
+
+    Strings are not stored as fixed-width arrays, where the longest value sets
+    the size of every row. Columns with few distinct values, the function and
+    the failure reason, are stored as codes into a vocabulary, and the other
+    ones as UTF-8 bytes of all rows with the offset of each row.
+
+    Only the fields used by the analysis are kept from the raw benchmark output:
+    its begin and end timestamps and the request id. The JSON export of
+    a Result keeps the entire output.
+
+    Records written before a column was added are read with the missing value
+    in every row of that column.
+"""
+
+INT_MISSING = np.iinfo(np.int64).min
+
+# Integer fields of ExecutionTimes, all except client timestamps.
+TIME_FIELDS = [
+    "client",
+    "benchmark",
+    "initialization",
+    "waitTime",
+    "initTime",
+    "latencyCorrection",
+    "sendLateness",
+    "scheduled",
+    "sent",
+    "received",
+    "accepted",
+    "started",
+    "finished",
+]
+FLOAT_TIME_FIELDS = ["http_startup", "http_first_byte_return"]
+
+CATEGORY = "category"
+STRING = "str"
+
+COLUMNS: List[Tuple[str, str]] = [
+    ("function", CATEGORY),
+    # Key of the invocation in the result, when it is not the request id,
+    # e.g., of a failed invocation without one.
+    ("key", STRING),
+    ("request_id", STRING),
+    ("failure", "bool"),
+    ("failure_reason", CATEGORY),
+    ("cold_start", "bool"),
+    ("warmup", "bool"),
+    ("memory_used", "float64"),
+    # Client timestamps in nanoseconds since epoch.
+    ("client_begin", "int64"),
+    ("client_end", "int64"),
+    *[(field, "int64") for field in TIME_FIELDS],
+    *[(field, "float64") for field in FLOAT_TIME_FIELDS],
+    ("provider_initialization", "int64"),
+    ("provider_execution", "int64"),
+    ("billed_time", "int64"),
+    ("billed_memory", "int64"),
+    ("gb_seconds", "float64"),
+    # Begin and end of execution reported by the benchmark, seconds since epoch.
+    ("output_begin", "float64"),
+    ("output_end", "float64"),
+    ("output_request_id", STRING),
+]
+METADATA_KEY = "__metadata__"
+# Arrays of encoded string columns are stored under the column name with a suffix.
+CODES_SUFFIX = "__codes"
+VOCABULARY_SUFFIX = "__vocabulary"
+DATA_SUFFIX = "__data"
+OFFSETS_SUFFIX = "__offsets"
+
+
+def _int(value: Any) -> int:
+    return INT_MISSING if value is None else int(value)
+
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+class Strings:
+    """UTF-8 bytes of all rows, the row i spans data[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @staticmethod
+    def encode(values: List[str]) -> "Strings":
+        encoded = [value.encode() for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return Strings(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, mask: np.ndarray) -> "Strings":
+        rows = np.arange(len(self))[mask]
+        begin = self.offsets[:-1][rows]
+        lengths = self.offsets[1:][rows] - begin
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Position of every selected byte in the data of all rows
+        positions = np.repeat(begin - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return Strings(self.data[positions], offsets)
+
+    @staticmethod
+    def concat(parts: List["Strings"]) -> "Strings":
+        shifts = np.cumsum([0] + [len(p.data) for p in parts[:-1]])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        offsets.extend(p.offsets[1:] + shift for p, shift in zip(parts, shifts))
+        return Strings(np.concatenate([p.data for p in parts]), np.concatenate(offsets))
+
+    def empty(self) -> np.ndarray:
+        return self.offsets[1:] == self.offsets[:-1]
+
+    def decode(self) -> np.ndarray:
+        data = self.data.tobytes()
+        bounds = zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())
+        return np.array([data[begin:end].decode() for begin, end in bounds], dtype=object)
+
+    def arrays(self, name: str) -> Dict[str, np.ndarray]:
+        return {f"{name}{DATA_SUFFIX}": self.data, f"{name}{OFFSETS_SUFFIX}": self.offsets}
+
+    @staticmethod
+    def from_arrays(data: Any, name: str) -> "Strings":
+        return Strings(data[f"{name}{DATA_SUFFIX}"], data[f"{name}{OFFSETS_SUFFIX}"])
+
+
+class Categories:
+    """Strings of a column with few distinct values, as codes into a vocabulary."""
+
+    def __init__(self, codes: np.ndarray, vocabulary: List[str]):
+        self.codes = codes
+        self.vocabulary = vocabulary
+
+    @staticmethod
+    def encode(values: List[str]) -> "Categories":
+        indices: Dict[str, int] = {}
+        codes = [indices.setdefault(value, len(indices)) for value in values]
+        return Categories(np.array(codes, dtype=np.int32), list(indices))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, mask: np.ndarray) -> "Categories":
+        return Categories(self.codes[mask], self.vocabulary)
+
+    @staticmethod
+    def concat(parts: List["Categories"]) -> "Categories":
+        """Codes into the union of vocabularies of all parts."""
+        indices: Dict[str, int] = {}
+        codes = []
+        for part in parts:
+            mapping = [indices.setdefault(value, len(indices)) for value in part.vocabulary]
+            codes.append(np.array(mapping, dtype=np.int32)[part.codes])
+        return Categories(np.concatenate(codes).astype(np.int32), list(indices))
+
+    def empty(self) -> np.ndarray:
+        return np.array([value == "" for value in self.vocabulary], dtype=bool)[self.codes]
+
+    def decode(self) -> np.ndarray:
+        # Rows share the string objects of the vocabulary
+        return np.array(self.vocabulary, dtype=object)[self.codes]
+
+    def arrays(self, name: str) -> Dict[str, np.ndarray]:
+        return {
+            f"{name}{CODES_SUFFIX}": self.codes,
+            **Strings.encode(self.vocabulary).arrays(f"{name}{VOCABULARY_SUFFIX}"),
+        }
+
+    @staticmethod
+    def from_arrays(data: Any, name: str) -> "Categories":
+        vocabulary = Strings.from_arrays(data, f"{name}{VOCABULARY_SUFFIX}").decode().tolist()
+        return Categories(data[f"{name}{CODES_SUFFIX}"], vocabulary)
+
+
+Column = Union[np.ndarray, Strings, Categories]
+
+
+def _missing(dtype: str, length: int) -> Column:
+    """Column of the missing value, e.g., of records written before the column was added."""
+    if dtype == CATEGORY:
+        return Categories(np.zeros(length, dtype=np.int32), [""])
+    elif dtype == STRING:
+        return Strings(np.zeros(0, dtype=np.uint8), np.zeros(length + 1, dtype=np.int64))
+    elif dtype == "int64":
+        return np.full(length, INT_MISSING, dtype=np.int64)
+    elif dtype == "float64":
+        return np.full(length, np.nan)
+    return np.zeros(length, dtype=dtype)
+
+
+def _concat(parts: List[Column]) -> Column:
+    if isinstance(parts[0], Strings):
+        return Strings.concat(parts)  # type: ignore
+    if isinstance(parts[0], Categories):
+        return Categories.concat(parts)  # type: ignore
+    return np.concatenate(parts)  # type: ignore
+
+
+class InvocationRecords:
+    def __init__(self, columns: Dict[str, Column], metadata: Optional[dict] = None):
+        self.columns = columns
+        self.metadata = metadata if metadata is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.columns["function"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Values of a column, strings are decoded to an array of objects."""
+        values = self.columns[column]
+        if isinstance(values, (Strings, Categories)):
+            return values.decode()
+        return values
+
+    def empty(self, column: str) -> np.ndarray:
+        """Rows with an empty string, without decoding the column."""
+        values = self.columns[column]
+        assert isinstance(values, (Strings, Categories))
+        return values.empty()
+
+    def categories(self, column: str) -> Categories:
+        values = self.columns[column]
+        assert isinstance(values, Categories)
+        return values
+
+    def select(self, mask: np.ndarray) -> "InvocationRecords":
+        return InvocationRecords({k: v[mask] for k, v in self.columns.items()}, self.metadata)
+
+    @staticmethod
+    def concat(parts: List["InvocationRecords"]) -> "InvocationRecords":
+        """Rows of all parts, with the metadata of the first one."""
+        if not parts:
+            return InvocationRecords.from_stream([])
+        columns = {
+            name: _concat(
+                [p.columns[name] if name in p.columns else _missing(dtype, len(p)) for p in parts]
+            )
+            for name, dtype in COLUMNS
+        }
+        return InvocationRecords(columns, parts[0].metadata)
+
+    def functions(self) -> List[str]:
+        return list(dict.fromkeys(self["function"].tolist()))
+
+    @staticmethod
+    def from_invocations(
+        invocations: Dict[str, Dict[str, ExecutionResult]], metadata: Optional[dict] = None
+    ) -> "InvocationRecords":
+        return InvocationRecords.from_stream(
+            (
+                (func, key, inv)
+                for func, func_invocations in invocations.items()
+                for key, inv in func_invocations.items()
+            ),
+            metadata,
+        )
+
+    @staticmethod
+    def from_stream(
+        invocations: Iterable[Tuple[str, str, ExecutionResult]], metadata: Optional[dict] = None
+    ) -> "InvocationRecords":
+        """
+        Records of (function name, key, invocation) triples, e.g., read lazily from a result log.
+        """
+        rows: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+        for func, key, inv in invocations:
+            times, stats, output = inv.times, inv.stats, inv.output or {}
+            rows["function"].append(func)
+            rows["key"].append(key if key != inv.request_id else "")
+            rows["request_id"].append(inv.request_id)
+            rows["failure"].append(bool(stats.failure))
+            rows["failure_reason"].append(getattr(stats, "failure_reason", None) or "")
+            rows["cold_start"].append(bool(stats.cold_start))
+            rows["warmup"].append(bool(getattr(stats, "warmup", False)))
+            rows["memory_used"].append(_float(stats.memory_used))
+            for field in ["client_begin", "client_end"]:
+                value = getattr(times, field, None)
+                rows[field].append(INT_MISSING if value is None else timestamp_ns(value))
+            for field in TIME_FIELDS:
+                rows[field].append(_int(getattr(times, field, None)))
+            for field in FLOAT_TIME_FIELDS:
+                rows[field].append(_float(getattr(times, field, None)))
+            rows["provider_initialization"].append(_int(inv.provider_times.initialization))
+            rows["provider_execution"].append(_int(inv.provider_times.execution))
+            rows["billed_time"].append(_int(inv.billing.billed_time))
+            rows["billed_memory"].append(_int(inv.billing.memory))
+            rows["gb_seconds"].append(_float(inv.billing.gb_seconds))
+            rows["output_begin"].append(_float(output.get("begin")))
+            rows["output_end"].append(_float(output.get("end")))
+            rows["output_request_id"].append(str(output.get("request_id", "")))
+        columns: Dict[str, Column] = {}
+        for name, dtype in COLUMNS:
+            if dtype == CATEGORY:
+                columns[name] = Categories.encode(rows[name])
+            elif dtype == STRING:
+                columns[name] = Strings.encode(rows[name])
+            else:
+                columns[name] = np.array(rows[name], dtype=dtype)
+        return InvocationRecords(columns, metadata)
+
+    def to_invocations(self) -> Dict[str, Dict[str, ExecutionResult]]:
+        invocations: Dict[str, Dict[str, ExecutionResult]] = {}
+        rows = {name: self[name].tolist() for name, _ in COLUMNS}
+        for i in range(len(self)):
+            inv = ExecutionResult()
+            inv.request_id = rows["request_id"][i]
+            inv.stats.failure = rows["failure"][i]
+            if rows["failure_reason"][i]:
+                inv.stats.failure_reason = rows["failure_reason"][i]
+            inv.stats.cold_start = rows["cold_start"][i]
+            inv.stats.warmup = rows["warmup"][i]
+            if not np.isnan(rows["memory_used"][i]):
+                inv.stats.memory_used = rows["memory_used"][i]
+            for field in ["client_begin", "client_end", *TIME_FIELDS]:
+                if rows[field][i] != INT_MISSING:
+                    setattr(inv.times, field, rows[field][i])
+            for field in FLOAT_TIME_FIELDS:
+                if not np.isnan(rows[field][i]):
+                    setattr(inv.times, field, rows[field][i])
+            inv.provider_times.initialization = rows["provider_initialization"][i]
+            inv.provider_times.execution = rows["provider_execution"][i]
+            if rows["billed_time"][i] != INT_MISSING:
+                inv.billing.billed_time = rows["billed_time"][i]
+            if rows["billed_memory"][i] != INT_MISSING:
+                inv.billing.memory = rows["billed_memory"][i]
+            inv.billing.gb_seconds = rows["gb_seconds"][i]
+            if not np.isnan(rows["output_begin"][i]):
+                inv.output = {
+                    "begin": repr(rows["output_begin"][i]),
+                    "end": repr(rows["output_end"][i]),
+                    "is_cold": rows["cold_start"][i],
+                }
+                if rows["output_request_id"][i]:
+                    inv.output["request_id"] = rows["output_request_id"][i]
+            func_invocations = invocations.setdefault(rows["function"][i], {})
+            key = rows["key"][i] or inv.request_id
+            if not key:
+                # Records without keys, numbered as in Result.add_invocation
+                key = f"failed-{len(func_invocations)}"
+            func_invocations[key] = inv
+        return invocations
+
+    def save(self, path: str):
+        arrays: Dict[str, Any] = {}
+        for name, values in self.columns.items():
+            if isinstance(values, (Strings, Categories)):
+                arrays.update(values.arrays(name))
+            else:
+                arrays[name] = values
+        # Metadata is stored as a JSON string, so the file loads without pickle.
+        arrays[METADATA_KEY] = np.array(json.dumps(self.metadata))
+        np.savez_compressed(path, **arrays)
+
+    @staticmethod
+    def load(path: str) -> "InvocationRecords":
+        columns: Dict[str, Column] = {}
+        with np.load(path, allow_pickle=False) as data:
+            for name, dtype in COLUMNS:
+                if dtype == CATEGORY:
+                    if f"{name}{CODES_SUFFIX}" in data.files:
+                        columns[name] = Categories.from_arrays(data, name)
+                elif dtype == STRING:
+                    if f"{name}{OFFSETS_SUFFIX}" in data.files:
+                        columns[name] = Strings.from_arrays(data, name)
+                elif name in data.files:
+                    columns[name] = data[name]
+            metadata = json.loads(str(data[METADATA_KEY])) if METADATA_KEY in data.files else {}
+        length = len(columns["function"])
+        for name, dtype in COLUMNS:
+            if name not in columns:
+                columns[name] = _missing(dtype, length)
+        return InvocationRecords(columns, metadata)
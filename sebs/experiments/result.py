@@ -1,11 +1,19 @@
+import json
+import os
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple  # noqa
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING  # noqa
 
 from sebs.cache import Cache
 from sebs.faas.config import Config as DeploymentConfig
 from sebs.faas.function import Function, ExecutionResult
-from sebs.utils import LoggingHandlers
+from sebs.utils import LoggingHandlers, serialize
+from sebs.experiments.archive import ArchiveWriter, read_result
 from sebs.experiments.config import Config as ExperimentConfig
+from sebs.experiments.result_log import ResultLog
+
+# Records need NumPy, which is imported only when they are used
+if TYPE_CHECKING:
+    from sebs.experiments.records import InvocationRecords
 
 
 class Result:
@@ -30,12 +38,73 @@ class Result:
         else:
             self._metrics = metrics
         self.result_bucket = result_bucket
+        self._log: Optional[ResultLog] = None
+        self._keep_invocations = True
+        # Number of invocations of each function, also when they are not kept in memory.
+        self._counts: Dict[str, int] = {
+            func: len(func_invocations) for func, func_invocations in self._invocations.items()
+        }
+        # Invocations dispatched but not collected by an interrupted run, read from its log.
+        self.pending: Dict[str, Dict[str, dict]] = {}
 
     def begin(self):
         self.begin_time = datetime.now().timestamp()
+        if self._log is not None:
+            self._log.write({"type": "begin", "time": self.begin_time})
+
+    def begin_measurement(self):
+        """Start of the measured phase after a warm-up, which replaces the begin time."""
+        self.begin_time = datetime.now().timestamp()
+        if self._log is not None:
+            self._log.write({"type": "measure_begin", "time": self.begin_time})
 
     def end(self):
         self.end_time = datetime.now().timestamp()
+        if self._log is not None:
+            self._log.write(
+                {
+                    "type": "end",
+                    "time": self.end_time,
+                    "metrics": self._metrics,
+                    "result_bucket": self.result_bucket,
+                }
+            )
+
+    def stream_to(
+        self,
+        path: str,
+        keep_invocations: bool = False,
+        sync_interval: float = 1.0,
+        resume: bool = False,
+    ):
+        """
+        Write the result to a log as invocations are added, replacing an existing log.
+        Without keeping invocations, they are read back from the log when needed
+        and the memory used by the result does not grow during the experiment.
+        With resume, invocations are appended to the log of an interrupted run
+        and its invocations become part of the result; its invocations that were
+        dispatched but never collected are available in pending.
+        """
+        resume = resume and os.path.exists(path)
+        if resume and keep_invocations:
+            for func, func_invocations in Result._log_invocations(path).items():
+                self._invocations.setdefault(func, {}).update(func_invocations)
+        if resume:
+            for record in ResultLog.read(path, "invocation"):
+                self._counts[record["function"]] = self._counts.get(record["function"], 0) + 1
+            self.pending = Result._log_pending(path)
+        self._log = ResultLog(path, sync_interval, append=resume)
+        self._keep_invocations = keep_invocations
+        if not resume:
+            self._log.write({"type": "header", **self._metadata()})
+
+    def close_log(self):
+        if self._log is not None:
+            self._log.close()
+
+    @property
+    def log_path(self) -> Optional[str]:
+        return self._log.path if self._log is not None else None
 
     def times(self) -> Tuple[int, int]:
         return self.begin_time, self.end_time
@@ -43,12 +112,44 @@ class Result:
     def add_result_bucket(self, result_bucket: str):
         self.result_bucket = result_bucket
 
+    def add_dispatch(self, func: Function, request_id: str, scheduled: int, sent: int):
+        """
+        Record an invocation when it is sent, before its result is collected,
+        so that an interrupted experiment keeps its activation ID and send times.
+        Times are in nanoseconds since epoch.
+        """
+        if self._log is not None:
+            self._log.write(
+                {
+                    "type": "dispatch",
+                    "function": func.name,
+                    "id": request_id,
+                    "scheduled": scheduled,
+                    "sent": sent,
+                }
+            )
+
     def add_invocation(self, func: Function, invocation: ExecutionResult):
         # the function has most likely failed, thus no request id
         if invocation.request_id:
             req_id = invocation.request_id
         else:
-            req_id = f"failed-{len(self._invocations.get(func.name, []))}"
+            req_id = f"failed-{self._counts.get(func.name, 0)}"
+        self._counts[func.name] = self._counts.get(func.name, 0) + 1
+        if func.name in self.pending:
+            self.pending[func.name].pop(req_id, None)
+
+        if self._log is not None:
+            self._log.write(
+                {
+                    "type": "invocation",
+                    "function": func.name,
+                    "id": req_id,
+                    "result": invocation.serialize(),
+                }
+            )
+            if not self._keep_invocations:
+                return
 
         if func.name in self._invocations:
             self._invocations.get(func.name)[req_id] = invocation  # type: ignore
@@ -56,11 +157,20 @@ class Result:
             self._invocations[func.name] = {req_id: invocation}
 
     def functions(self) -> List[str]:
-        return list(self._invocations.keys())
+        return list(self._counts.keys())
 
     def invocations(self, func: str) -> Dict[str, ExecutionResult]:
+        if not self._keep_invocations:
+            self.load_invocations()
         return self._invocations[func]
 
+    def load_invocations(self):
+        """Read back invocations that were written only to the log."""
+        if self._log is None or self._keep_invocations:
+            return
+        self._invocations = Result._log_invocations(self._log.path)
+        self._keep_invocations = True
+
     def metrics(self, func: str) -> dict:
         if func not in self._metrics:
             self._metrics[func] = {}
@@ -84,3 +194,140 @@ class Result:
         ret.begin_time = cached_config["begin_time"]
         ret.end_time = cached_config["end_time"]
         return ret
+
+    def serialize(self) -> dict:
+        self.load_invocations()
+        metadata = self._metadata()
+        return {
+            **metadata,
+            # Key used by results written before serialize was defined
+            "_metrics": metadata["metrics"],
+            "_invocations": {
+                func: {req_id: invoc.serialize() for req_id, invoc in func_invocations.items()}
+                for func, func_invocations in self._invocations.items()
+            },
+        }
+
+    def _metadata(self) -> dict:
+        """Everything except invocations, in JSON types."""
+        metadata = {
+            "config": self.config,
+            "metrics": self._metrics,
+            "result_bucket": self.result_bucket,
+            "begin_time": getattr(self, "begin_time", None),
+            "end_time": getattr(self, "end_time", None),
+        }
+        return json.loads(serialize(metadata))
+
+    def records(self) -> "InvocationRecords":
+        """Invocations as a columnar table, with the rest of the result as metadata."""
+        from sebs.experiments.records import InvocationRecords
+
+        if self._keep_invocations:
+            return InvocationRecords.from_invocations(self._invocations, self._metadata())
+        return InvocationRecords.from_stream(
+            (
+                (record["function"], record["id"], ExecutionResult.deserialize(record["result"]))
+                for record in ResultLog.read(self._log.path, "invocation")  # type: ignore
+            ),
+            self._metadata(),
+        )
+
+    def save_records(self, path: str):
+        self.records().save(path)
+
+    def save_archive(self, path: str, benchmark: str):
+        """Write the result to a compressed archive, as the result of the benchmark."""
+        with ArchiveWriter(path) as writer:
+            writer.add_metadata(benchmark, {**self._metadata(), "_metrics": self._metrics})
+            if self._keep_invocations:
+                for func, func_invocations in self._invocations.items():
+                    writer.add_invocations(
+                        benchmark,
+                        func,
+                        ((req_id, invoc.serialize()) for req_id, invoc in func_invocations.items()),
+                    )
+            else:
+                for record in ResultLog.read(self._log.path, "invocation"):  # type: ignore
+                    writer.add_invocation(
+                        benchmark, record["function"], record["id"], record["result"]
+                    )
+
+    @staticmethod
+    def load_records(path: str, cache: Cache, handlers: LoggingHandlers) -> "Result":
+        from sebs.experiments.records import InvocationRecords
+
+        records = InvocationRecords.load(path)
+        ret = Result.deserialize({**records.metadata, "_invocations": {}}, cache, handlers)
+        ret._invocations = records.to_invocations()
+        ret._counts = {func: len(invocs) for func, invocs in ret._invocations.items()}
+        return ret
+
+    @staticmethod
+    def _log_invocations(path: str) -> Dict[str, Dict[str, ExecutionResult]]:
+        invocations: Dict[str, Dict[str, ExecutionResult]] = {}
+        for record in ResultLog.read(path, "invocation"):
+            invocations.setdefault(record["function"], {})[
+                record["id"]
+            ] = ExecutionResult.deserialize(record["result"])
+        return invocations
+
+    @staticmethod
+    def _log_pending(path: str) -> Dict[str, Dict[str, dict]]:
+        """Dispatched invocations of the log without a collected result."""
+        pending: Dict[str, Dict[str, dict]] = {}
+        for record in ResultLog.read(path):
+            if record["type"] == "dispatch":
+                pending.setdefault(record["function"], {})[record["id"]] = {
+                    "scheduled": record["scheduled"],
+                    "sent": record["sent"],
+                }
+            elif record["type"] == "invocation":
+                pending.get(record["function"], {}).pop(record["id"], None)
+        return {func: func_pending for func, func_pending in pending.items() if func_pending}
+
+    @staticmethod
+    def load_log(path: str, cache: Cache, handlers: LoggingHandlers) -> "Result":
+        """
+        Rebuild the result from its log, also when the experiment was interrupted -
+        then the end time is missing and only completed invocations are present.
+        Invocations dispatched but not collected before the interruption are in pending.
+        """
+        config: dict = {}
+        # A resumed experiment began with the first run
+        begin: Optional[float] = None
+        measure_begin: Optional[float] = None
+        for record in ResultLog.read(path):
+            if record["type"] == "header":
+                config = {**record, "_invocations": {}}
+            elif record["type"] == "begin" and begin is None:
+                begin = record["time"]
+            elif record["type"] == "measure_begin" and measure_begin is None:
+                measure_begin = record["time"]
+            elif record["type"] == "end":
+                config["end_time"] = record["time"]
+                config["metrics"] = record["metrics"]
+                config["result_bucket"] = record["result_bucket"]
+        if measure_begin is not None:
+            config["begin_time"] = measure_begin
+        elif begin is not None:
+            config["begin_time"] = begin
+        ret = Result.deserialize(config, cache, handlers)
+        ret._invocations = Result._log_invocations(path)
+        ret._counts = {func: len(invocs) for func, invocs in ret._invocations.items()}
+        ret.pending = Result._log_pending(path)
+        return ret
+
+    @staticmethod
+    def load(
+        path: str, cache: Cache, handlers: LoggingHandlers, benchmark: Optional[str] = None
+    ) -> "Result":
+        """
+        Result from any of its formats: columnar records, a log, a compressed archive
+        or a JSON export. The benchmark selects a result of an archive with several ones.
+        """
+        if path.endswith(".npz"):
+            return Result.load_records(path, cache, handlers)
+        elif path.endswith(".jsonl"):
+            return Result.load_log(path, cache, handlers)
+        return Result.deserialize(read_result(path, benchmark), cache, handlers)
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from sebs.utils import serialize
+
+"""
+    Append-only log of an experiment result, in JSON Lines.
+
+    Every invocation is written as soon as it is added to the result, so
+    an interrupted experiment keeps all invocations completed before the
+    interruption, and results do not have to be kept in memory.
+    The log is flushed after every record and synced to disk at most once
+    per sync interval; a record cut short by a crash is skipped when reading.
+
+    Record types:
+    - "header": configuration of the experiment, always the first record
+    - "begin", "end": experiment begin and end time, the end record carries metrics
+    - "measure_begin": begin of the measured phase after a warm-up, used as the begin time
+    - "dispatch": function name, activation ID, scheduled and actual send time [ns]
+      of an invocation sent before its result is collected
+    - "invocation": function name and serialized ExecutionResult
+"""
+
+
+class ResultLog:
+    def __init__(self, path: str, sync_interval: float = 1.0, append: bool = False):
+        """
+        :param path: log file, replaced when it exists
+        :param sync_interval: seconds between fsync of the log
+        :param append: append to an existing log instead, e.g., to resume an experiment
+        """
+        self.path = path
+        self._sync_interval = sync_interval
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        if append:
+            ResultLog._drop_partial_record(path)
+        self._file = open(path, "a" if append else "w")
+
+    @staticmethod
+    def _drop_partial_record(path: str):
+        """Remove a record cut short by a crash, before appending to the log."""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            end = f.read().rfind(b"\n") + 1
+            f.truncate(end)
+
+    def write(self, record: dict):
+        line = serialize(record)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= self._sync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    @staticmethod
+    def read(path: str, record_type: Optional[str] = None) -> Iterator[dict]:
+        """Records of the log, optionally only of the given type."""
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last record of an interrupted experiment
+                    if not line.endswith("\n"):
+                        break
+                    raise
+                if record_type is None or record["type"] == record_type:
+                    yield record
@@ -1,30 +1,457 @@
-from typing import List
+import heapq
+import itertools
+import json
+import math
+import os
+import tempfile
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
 
 class ScheduleObject:
     def __init__(self, timestamp: int, fn_name: str):
         self.timestamp = timestamp
         self.fn_name = fn_name
-    
+
     def __lt__(self, other: "ScheduleObject"):
         return self.timestamp < other.timestamp
-        
+
+
+"""
+    Columnar schedule format: a directory with invocations sorted by timestamp,
+    stored as int64 nanosecond timestamps and uint16 function indices,
+    together with the list of function names.
+    Arrays are memory-mapped and read in chunks, so the memory used by
+    the scheduler does not depend on the length of the schedule.
+"""
+TIMESTAMPS_FILE = "timestamps.npy"
+FUNCTIONS_FILE = "functions.npy"
+NAMES_FILE = "functions.json"
+CHUNK_SIZE = 65536
+
+# Index of the shard and number of shards, see ScheduleConfig.shard
+Shard = Tuple[int, int]
+
+
+def write_columnar(path: str, invocations: Dict[str, Sequence[int]]):
+    """
+    Write a columnar schedule from unsorted invocation timestamps of each function.
+    """
+    fns = list(invocations.keys())
+    if len(fns) > np.iinfo(np.uint16).max:
+        raise ValueError(f"Columnar schedule supports at most 65535 functions, got {len(fns)}")
+    timestamps = np.concatenate(
+        [np.asarray(invocations[fn], dtype=np.int64) for fn in fns] or [np.zeros(0, np.int64)]
+    )
+    functions = np.concatenate(
+        [np.full(len(invocations[fn]), idx, dtype=np.uint16) for idx, fn in enumerate(fns)]
+        or [np.zeros(0, np.uint16)]
+    )
+    order = np.argsort(timestamps, kind="stable")
+    _save_columnar(path, fns, timestamps[order], functions[order])
+
+
+def _count_inversions(timestamps: Sequence[int]) -> int:
+    """Number of timestamps smaller than the preceding one."""
+    following = itertools.islice(timestamps, 1, None)
+    return sum(1 for prev, cur in zip(timestamps, following) if cur < prev)
+
+
+def _save_columnar(path: str, fns: List[str], timestamps: np.ndarray, functions: np.ndarray):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, TIMESTAMPS_FILE), timestamps)
+    np.save(os.path.join(path, FUNCTIONS_FILE), functions)
+    with open(os.path.join(path, NAMES_FILE), "w") as f:
+        json.dump(fns, f)
+
 
 class ScheduleConfig:
-    """Helper class to deserialize from json file to configuration 
-    file for scheduling experiment."""
+    """Helper class to deserialize from json file to configuration
+    file for scheduling experiment.
+
+    The schedule is iterated lazily: each pass over `schedule` starts
+    a new iteration of the underlying source.
+
+    Transforms (warp, window, scale_rate, merge, shard) return a new schedule and
+    do not modify the original one, so a single trace can be loaded once
+    and replayed at many load levels."""
+
     def __init__(self):
-        self.fns = []  # List of fns to use for preparation
-        self.schedule: List[ScheduleObject] = []
-        
+        self.fns: List[str] = []  # List of fns to use for preparation
+        self._source: Callable[[], Iterator[ScheduleObject]] = lambda: iter(())
+        # Length of the trace in nanoseconds and number of invocations,
+        # computed on demand when the source does not provide them.
+        self._duration: Optional[Callable[[], int]] = None
+        self._length: Optional[int] = None
+        # Functions whose invocations were not sorted in the input,
+        # with the number of arrivals earlier than their predecessor.
+        self.unsorted: Dict[str, int] = {}
+        # Files and transforms of a schedule loaded by ScheduleSpec.load,
+        # None for schedules transformed afterwards.
+        self.spec: Optional["ScheduleSpec"] = None
+
     @staticmethod
-    def deserialize(config: dict) -> "ScheduleConfig":
+    def deserialize(config: dict, shard: Optional[Shard] = None) -> "ScheduleConfig":
+        """
+        Invocations of each function are expected to be sorted already, which
+        lets us replace a global sort with a lazy k-way merge of per-function streams.
+        Unsorted functions are reported in `unsorted` and sorted individually.
+
+        With a shard, only every n-th invocation of the functions, counted
+        across all of them in order, is kept - shards of all indices are
+        a partition of the schedule. The duration is the one of the whole schedule.
+        """
         cfg = ScheduleConfig()
+        streams: List[Tuple[str, Sequence[int]]] = []
+        length = 0
+        # Invocations of the previous functions in the whole schedule
+        total = 0
+        last = 0
         for fn_dict in config["functions"]:
             fn_name = fn_dict["name"]
             cfg.fns.append(fn_name)
             invocations = fn_dict["invocations"]
+            inversions = _count_inversions(invocations)
+            if inversions > 0:
+                cfg.unsorted[fn_name] = cfg.unsorted.get(fn_name, 0) + inversions
+                invocations = sorted(invocations)
+            if len(invocations) > 0:
+                last = max(last, invocations[-1])
+            if shard is not None:
+                # Round robin continues with the next function where the previous one stopped
+                idx, n = shard
+                first = (idx - total) % n
+                total += len(invocations)
+                invocations = invocations[first::n]
+            streams.append((fn_name, invocations))
+            length += len(invocations)
+
+        def stream(fn_name: str, invocations: Sequence[int]) -> Iterator[ScheduleObject]:
             for ts in invocations:
-                so = ScheduleObject(ts, fn_name)
-                cfg.schedule.append(so)
-        cfg.schedule.sort(key=lambda so: so.timestamp)
-        return cfg
\ No newline at end of file
+                yield ScheduleObject(ts, fn_name)
+
+        def iterate() -> Iterator[ScheduleObject]:
+            return heapq.merge(
+                *[stream(fn_name, inv) for fn_name, inv in streams], key=lambda so: so.timestamp
+            )
+
+        cfg._source = iterate
+        cfg._length = length
+        cfg._duration = lambda: last
+        return cfg
+
+    @staticmethod
+    def load(path: str, shard: Optional[Shard] = None) -> "ScheduleConfig":
+        """
+        Load a JSON schedule file or a directory with a columnar schedule,
+        optionally only one shard of it.
+        """
+        if os.path.isdir(path):
+            return ScheduleConfig.load_columnar(path, shard)
+        with open(path, "r") as fp:
+            return ScheduleConfig.deserialize(json.load(fp), shard)
+
+    @staticmethod
+    def load_columnar(path: str, shard: Optional[Shard] = None) -> "ScheduleConfig":
+        """
+        With a shard, only every n-th invocation is read from the arrays, and the
+        order is not checked again - the whole schedule is loaded before it is sharded.
+        """
+        with open(os.path.join(path, NAMES_FILE), "r") as f:
+            fns = json.load(f)
+        timestamps = np.load(os.path.join(path, TIMESTAMPS_FILE), mmap_mode="r")
+        first, step = shard if shard is not None else (0, 1)
+
+        def iterate() -> Iterator[ScheduleObject]:
+            # Opened on each pass, which keeps the mapping private to the process iterating it.
+            ts = np.load(os.path.join(path, TIMESTAMPS_FILE), mmap_mode="r")
+            fn = np.load(os.path.join(path, FUNCTIONS_FILE), mmap_mode="r")
+            for begin in range(first, len(ts), CHUNK_SIZE * step):
+                end = begin + CHUNK_SIZE * step
+                chunk_fns = fn[begin:end:step].tolist()
+                chunk_ts = ts[begin:end:step].tolist()
+                for t, f in zip(chunk_ts, chunk_fns):
+                    yield ScheduleObject(t, fns[f])
+
+        cfg = ScheduleConfig()
+        cfg.fns = fns
+        cfg._source = iterate
+        cfg._length = len(range(first, len(timestamps), step))
+        last = int(timestamps[-1]) if len(timestamps) > 0 else 0
+        cfg._duration = lambda: last
+        if shard is not None:
+            return cfg
+        functions = np.load(os.path.join(path, FUNCTIONS_FILE), mmap_mode="r")
+        for begin in range(0, len(timestamps), CHUNK_SIZE):
+            # Chunks overlap by one element to compare across their boundary.
+            lower, upper = max(begin - 1, 0), begin + CHUNK_SIZE
+            chunk = np.asarray(timestamps[lower:upper])
+            later = np.asarray(functions[lower:upper])[1:]
+            counts = np.bincount(later[np.diff(chunk) < 0], minlength=len(fns))
+            for idx in np.flatnonzero(counts):
+                cfg.unsorted[fns[idx]] = cfg.unsorted.get(fns[idx], 0) + int(counts[idx])
+        if cfg.unsorted:
+            raise ValueError(f"Columnar schedule {path} is not sorted: {cfg.unsorted}")
+        return cfg
+
+    def save_columnar(self, path: str):
+        timestamps = array("q")
+        functions = array("H")
+        index = {fn: idx for idx, fn in enumerate(self.fns)}
+        for so in self.schedule:
+            timestamps.append(so.timestamp)
+            functions.append(index[so.fn_name])
+        _save_columnar(
+            path,
+            self.fns,
+            np.frombuffer(timestamps, dtype=np.int64),
+            np.frombuffer(functions, dtype=np.uint16),
+        )
+
+    @property
+    def schedule(self) -> Iterator[ScheduleObject]:
+        """Invocations sorted by timestamp."""
+        return self._source()
+
+    def __iter__(self) -> Iterator[ScheduleObject]:
+        return self._source()
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self.schedule)
+        return self._length
+
+    @property
+    def duration(self) -> int:
+        if self._duration is None:
+            last = 0
+            for so in self.schedule:
+                last = so.timestamp
+            self._duration = lambda: last
+        return self._duration()
+
+    @property
+    def rps(self) -> float:
+        if self.duration == 0:
+            return 0.0
+        return len(self) / (self.duration / 1_000_000_000)
+
+    def _derive(
+        self,
+        source: Callable[[], Iterator[ScheduleObject]],
+        duration: Optional[Callable[[], int]],
+        length: Optional[int] = None,
+    ) -> "ScheduleConfig":
+        cfg = ScheduleConfig()
+        cfg.fns = list(self.fns)
+        cfg._source = source
+        cfg._duration = duration
+        cfg._length = length
+        return cfg
+
+    def warp(self, factor: float) -> "ScheduleConfig":
+        """
+        Speed up (factor > 1) or slow down (factor < 1) the trace.
+        Relative spacing of arrivals does not change.
+        """
+        if factor <= 0:
+            raise ValueError(f"Time warp factor must be positive, got {factor}")
+        return self._derive(
+            lambda: (ScheduleObject(int(so.timestamp / factor), so.fn_name) for so in self),
+            lambda: int(self.duration / factor),
+            self._length,
+        )
+
+    def window(self, begin: int, end: Optional[int] = None) -> "ScheduleConfig":
+        """
+        Keep invocations in [begin, end), in nanoseconds, and move the window to the origin.
+        """
+        if end is not None and end < begin:
+            raise ValueError(f"Window ends before it begins: [{begin}, {end})")
+
+        def iterate() -> Iterator[ScheduleObject]:
+            for so in self:
+                if end is not None and so.timestamp >= end:
+                    break
+                if so.timestamp >= begin:
+                    yield ScheduleObject(so.timestamp - begin, so.fn_name)
+
+        if end is not None:
+            return self._derive(iterate, lambda: end - begin)
+        return self._derive(iterate, lambda: max(self.duration - begin, 0))
+
+    def scale_rate(self, target_rps: float, rps: Optional[float] = None) -> "ScheduleConfig":
+        """
+        Thin or duplicate invocations to reach the target request rate.
+
+        Arrivals are never moved: each arrival is kept, dropped, or repeated
+        at the same timestamp, so bursts of the trace remain bursts.
+        Every function is scaled by the same ratio and the fractional part
+        is carried over between consecutive arrivals of a function, which
+        spreads dropped and repeated invocations evenly across the trace.
+
+        The ratio is computed from `rps`, when given, instead of the rate of
+        this schedule - e.g., from the rate of the whole schedule for a shard.
+        """
+        if target_rps < 0:
+            raise ValueError(f"Target request rate must not be negative, got {target_rps}")
+
+        def iterate() -> Iterator[ScheduleObject]:
+            source_rps = rps if rps is not None else self.rps
+            if source_rps == 0:
+                yield from self
+                return
+            ratio = target_rps / source_rps
+            carry: Dict[str, float] = {}
+            for so in self:
+                acc = carry.get(so.fn_name, 0.5) + ratio
+                copies = math.floor(acc)
+                carry[so.fn_name] = acc - copies
+                for _ in range(copies):
+                    yield ScheduleObject(so.timestamp, so.fn_name)
+
+        return self._derive(iterate, lambda: self.duration)
+
+    def merge(self, *others: "ScheduleConfig") -> "ScheduleConfig":
+        """
+        Combine schedules that start at the same origin.
+        """
+        configs = [self, *others]
+        cfg = self._derive(
+            lambda: heapq.merge(*configs, key=lambda so: so.timestamp),
+            lambda: max(c.duration for c in configs),
+        )
+        for other in others:
+            cfg.fns.extend(fn for fn in other.fns if fn not in cfg.fns)
+        return cfg
+
+    def shard(self, idx: int, n: int) -> "ScheduleConfig":
+        """
+        Every n-th invocation, starting with idx.
+        We use a simple round robin distribution to distribute the schedule uniformly.
+        """
+        return self._derive(lambda: itertools.islice(self, idx, None, n), lambda: self.duration)
+
+
+class ScheduleSpec:
+    """
+    Schedule files and the transforms applied to them, in the order of `load`.
+
+    Worker processes receive the specification instead of their invocations, which
+    keeps it picklable and the start message of remote agents short, and load
+    their own shard. Paths must therefore be readable by every worker, also
+    on the hosts of remote agents.
+
+    A shard is read from the schedule files directly, before the transforms,
+    so a worker never iterates invocations of other workers. JSON files still
+    have to be parsed entirely; `columnar` converts them once per host.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        window_begin: Optional[float] = None,
+        window_end: Optional[float] = None,
+        time_warp: Optional[float] = None,
+        target_rps: Optional[float] = None,
+        source_rps: Optional[float] = None,
+    ):
+        """
+        :param paths: the main schedule followed by the schedules merged with it
+        :param window_begin: seconds of the trace, invocations before it are skipped
+        :param window_end: seconds of the trace, invocations after it are skipped
+        :param time_warp: speed up (> 1) or slow down (< 1) factor
+        :param target_rps: request rate reached by dropping or repeating invocations
+        :param source_rps: request rate before scaling to the target rate,
+            computed by `load` so that shards are scaled by the same ratio
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.window_begin = window_begin
+        self.window_end = window_end
+        self.time_warp = time_warp
+        self.target_rps = target_rps
+        self.source_rps = source_rps
+
+    def _transform(self, schedules: List[ScheduleConfig]) -> ScheduleConfig:
+        """Merge the schedules, then apply the window and time warp in this order."""
+        schedule = schedules[0].merge(*schedules[1:]) if len(schedules) > 1 else schedules[0]
+        if self.window_begin is not None or self.window_end is not None:
+            schedule = schedule.window(
+                int((self.window_begin or 0) * 1_000_000_000),
+                int(self.window_end * 1_000_000_000) if self.window_end is not None else None,
+            )
+        if self.time_warp is not None:
+            schedule = schedule.warp(self.time_warp)
+        return schedule
+
+    def load(self) -> ScheduleConfig:
+        """Merge the schedules, then apply the window, time warp and rate in this order."""
+        schedules = [ScheduleConfig.load(path) for path in self.paths]
+        schedule = self._transform(schedules)
+        if self.target_rps is not None:
+            self.source_rps = schedule.rps
+            schedule = schedule.scale_rate(self.target_rps, self.source_rps)
+        unsorted: Dict[str, int] = {}
+        for loaded in schedules:
+            for fn_name, count in loaded.unsorted.items():
+                unsorted[fn_name] = unsorted.get(fn_name, 0) + count
+        schedule.unsorted = unsorted
+        schedule.spec = self
+        return schedule
+
+    def shard(self, idx: int, n: int) -> ScheduleConfig:
+        """
+        Invocations of worker idx out of n, read from every file with the same shard.
+        Shards of all workers are a partition of the schedule; with a target rate,
+        every shard is scaled by the same ratio, so their union has the target rate.
+        """
+        if self.target_rps is not None and self.source_rps is None:
+            self.source_rps = self._transform([ScheduleConfig.load(p) for p in self.paths]).rps
+        schedule = self._transform([ScheduleConfig.load(path, (idx, n)) for path in self.paths])
+        if self.target_rps is not None:
+            schedule = schedule.scale_rate(self.target_rps, self.source_rps)
+        return schedule
+
+    def columnar(self, directory: str) -> "ScheduleSpec":
+        """
+        The same specification with JSON files converted to columnar schedules
+        in the directory, which workers read without parsing the entire file.
+        """
+        paths = []
+        for path in self.paths:
+            if not os.path.isdir(path):
+                converted = tempfile.mkdtemp(prefix="schedule_", dir=directory)
+                ScheduleConfig.load(path).save_columnar(converted)
+                path = converted
+            paths.append(path)
+        return ScheduleSpec(
+            paths,
+            self.window_begin,
+            self.window_end,
+            self.time_warp,
+            self.target_rps,
+            self.source_rps,
+        )
+
+    def serialize(self) -> dict:
+        return {
+            "paths": self.paths,
+            "window_begin": self.window_begin,
+            "window_end": self.window_end,
+            "time_warp": self.time_warp,
+            "target_rps": self.target_rps,
+            "source_rps": self.source_rps,
+        }
+
+    @staticmethod
+    def deserialize(config: dict) -> "ScheduleSpec":
+        return ScheduleSpec(
+            config["paths"],
+            config["window_begin"],
+            config["window_end"],
+            config["time_warp"],
+            config["target_rps"],
+            config.get("source_rps"),
+        )
@@ -14,14 +14,65 @@ from sebs.utils import LoggingBase
 
 """
     Times are reported in microseconds.
+
+    Results are kept for every invocation of long experiments and sent between
+    processes, so they use slots instead of a per-instance dictionary.
+    Unset slots stand for unknown values and are omitted in serialization.
 """
 
 
-class ExecutionTimes:
+def timestamp_ns(timestamp) -> int:
+    """Nanoseconds since epoch of a datetime, its string form, or an integer timestamp."""
+    if isinstance(timestamp, int):
+        return timestamp
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return round(timestamp.timestamp() * 1_000_000) * 1000
+
+
+class _Slotted:
+
+    __slots__ = ()
+
+    def serialize(self) -> dict:
+        return {
+            field: getattr(self, field)
+            for cls in type(self).__mro__
+            for field in getattr(cls, "__slots__", ())
+            if hasattr(self, field)
+        }
+
+    def _update(self, cached_obj: dict):
+        for key, value in cached_obj.items():
+            setattr(self, key, value)
+
+
+class ExecutionTimes(_Slotted):
+
+    __slots__ = (
+        "client",
+        "client_begin",
+        "client_end",
+        "benchmark",
+        "initialization",
+        "http_startup",
+        "http_first_byte_return",
+        "waitTime",
+        "initTime",
+        "latencyCorrection",
+        "sendLateness",
+        "scheduled",
+        "sent",
+        "received",
+        "accepted",
+        "started",
+        "finished",
+    )
 
     client: int
-    client_begin: datetime
-    client_end: datetime
+    # Client timestamps in nanoseconds since epoch
+    client_begin: int
+    client_end: int
     benchmark: int
     initialization: int
     http_startup: int
@@ -38,6 +89,20 @@ class ExecutionTimes:
     initTime: int
     # Time spent in open-closed workload
     latencyCorrection: int
+    # Difference between the actual and the scheduled send time of the request
+    # in open-loop schedules, in nanoseconds
+    sendLateness: int
+    # Life cycle of a request, in nanoseconds since epoch. Fields are present only
+    # when known - e.g., there is no schedule in closed-loop experiments, and the
+    # result of a non-blocking invocation is not received as a response.
+    # Client clock: scheduled send time, actual send time, response received.
+    scheduled: int
+    sent: int
+    received: int
+    # Platform clock: request accepted by the controller, execution start and end.
+    accepted: int
+    started: int
+    finished: int
     
 
     def __init__(self):
@@ -48,11 +113,17 @@ class ExecutionTimes:
     @staticmethod
     def deserialize(cached_obj: dict) -> "ExecutionTimes":
         ret = ExecutionTimes()
-        ret.__dict__.update(cached_obj)
+        ret._update(cached_obj)
+        # Results written before timestamps were stored as integers
+        for field in ("client_begin", "client_end"):
+            if isinstance(cached_obj.get(field), str):
+                setattr(ret, field, timestamp_ns(cached_obj[field]))
         return ret
 
 
-class ProviderTimes:
+class ProviderTimes(_Slotted):
+
+    __slots__ = ("initialization", "execution")
 
     initialization: int
     execution: int
@@ -64,29 +135,38 @@ class ProviderTimes:
     @staticmethod
     def deserialize(cached_obj: dict) -> "ProviderTimes":
         ret = ProviderTimes()
-        ret.__dict__.update(cached_obj)
+        ret._update(cached_obj)
         return ret
 
 
-class ExecutionStats:
+class ExecutionStats(_Slotted):
+
+    __slots__ = ("memory_used", "cold_start", "failure", "warmup", "failure_reason")
 
     memory_used: Optional[float]
     cold_start: bool
     failure: bool
+    # Invocation of the warm-up phase, excluded from metrics.
+    warmup: bool
+    failure_reason: Optional[str]
 
     def __init__(self):
         self.memory_used = None
         self.cold_start = False
         self.failure = False
+        self.warmup = False
+        self.failure_reason = None
 
     @staticmethod
     def deserialize(cached_obj: dict) -> "ExecutionStats":
         ret = ExecutionStats()
-        ret.__dict__.update(cached_obj)
+        ret._update(cached_obj)
         return ret
 
 
-class ExecutionBilling:
+class ExecutionBilling(_Slotted):
+
+    __slots__ = ("_memory", "_billed_time", "_gb_seconds")
 
     _memory: Optional[int]
     _billed_time: Optional[int]
@@ -124,12 +204,14 @@ class ExecutionBilling:
     @staticmethod
     def deserialize(cached_obj: dict) -> "ExecutionBilling":
         ret = ExecutionBilling()
-        ret.__dict__.update(cached_obj)
+        ret._update(cached_obj)
         return ret
 
 
 class ExecutionResult:
 
+    __slots__ = ("output", "request_id", "times", "provider_times", "stats", "billing")
+
     output: dict
     request_id: str
     times: ExecutionTimes
@@ -148,8 +230,8 @@ class ExecutionResult:
     @staticmethod
     def from_times(client_time_begin: datetime, client_time_end: datetime) -> "ExecutionResult":
         ret = ExecutionResult()
-        ret.times.client_begin = client_time_begin
-        ret.times.client_end = client_time_end
+        ret.times.client_begin = timestamp_ns(client_time_begin)
+        ret.times.client_end = timestamp_ns(client_time_end)
         ret.times.client = int((client_time_end - client_time_begin) / timedelta(microseconds=1))
         return ret
 
@@ -177,6 +259,16 @@ class ExecutionResult:
         ret.request_id = cached_config["request_id"]
         ret.output = cached_config["output"]
         return ret
+
+    def serialize(self) -> dict:
+        return {
+            "output": self.output,
+            "request_id": self.request_id,
+            "times": self.times.serialize(),
+            "provider_times": self.provider_times.serialize(),
+            "stats": self.stats.serialize(),
+            "billing": self.billing.serialize(),
+        }
     
 
 class OpenWhiskExecutionResult:
@@ -190,11 +282,21 @@ class OpenWhiskExecutionResult:
     # activation will skip initialization and this field will be -1.
     initTime: int
     executionResult: ExecutionResult
-    failureReason: str
+
+    __slots__ = ("waitTime", "initTime", "executionResult")
     
     @property
     def stats(self):
         return self.executionResult.stats
+
+    # Stored with the execution statistics, so it is kept in experiment results.
+    @property
+    def failureReason(self) -> Optional[str]:
+        return self.executionResult.stats.failure_reason
+
+    @failureReason.setter
+    def failureReason(self, reason: str):
+        self.executionResult.stats.failure_reason = reason
     
     @property
     def request_id(self):
@@ -208,19 +310,28 @@ class OpenWhiskExecutionResult:
     @staticmethod
     def from_times(client_time_begin: datetime, client_time_end: datetime) -> "OpenWhiskExecutionResult":
         ret = OpenWhiskExecutionResult()
-        ret.executionResult = ExecutionResult()
-        ret.executionResult.times.client_begin = client_time_begin
-        ret.executionResult.times.client_end = client_time_end
-        ret.executionResult.times.client = int((client_time_end - client_time_begin) / timedelta(microseconds=1))
+        ret.executionResult = ExecutionResult.from_times(client_time_begin, client_time_end)
         return ret
         
     def parse_benchmark_output(self, output: dict):
         self.executionResult.parse_benchmark_output(output["response"]["result"])
+        times = self.executionResult.times
         for annotation in output["annotations"]:
             if annotation["key"] == "waitTime":
-                self.executionResult.times.waitTime = annotation["value"]
+                times.waitTime = annotation["value"]
             if annotation["key"] == "initTime":
-                self.executionResult.times.initTime = annotation["value"]
+                times.initTime = annotation["value"]
+        # Activation record reports milliseconds since epoch; start includes initialization.
+        if "start" in output and "end" in output:
+            times.started = output["start"] * 1_000_000
+            times.finished = output["end"] * 1_000_000
+            if hasattr(times, "waitTime"):
+                times.accepted = times.started - times.waitTime * 1_000_000
+
+    # Wait and initialization times are kept in the execution times,
+    # so the result is read back as an ExecutionResult.
+    def serialize(self) -> dict:
+        return self.executionResult.serialize()
         
     
 
@@ -235,6 +346,14 @@ class NonBlockingExecutionResult:
         self.failure = False
         self.activation_timestamp = 0
         self.return_timestamp = 0
+
+    def serialize(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "failure": self.failure,
+            "activation_timestamp": self.activation_timestamp,
+            "return_timestamp": self.return_timestamp,
+        }
         
     @staticmethod
     def deserialize(response: str, begin: int, end: int) -> "NonBlockingExecutionResult":
@@ -339,7 +458,7 @@ class Trigger(ABC, LoggingBase):
         pass
     
     @abstractmethod
-    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> ExecutionResult:
+    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> OpenWhiskExecutionResult:
         pass
 
     @abstractmethod
@@ -1,11 +1,9 @@
 from abc import ABC
 from abc import abstractmethod
 from random import randrange
-from typing import Dict, List, Optional, Tuple, Type, Union
+from typing import Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
 import uuid
 
-import docker
-
 from sebs.benchmark import Benchmark
 from sebs.cache import Cache
 from sebs.config import SeBSConfig
@@ -15,6 +13,9 @@ from sebs.faas.storage import PersistentStorage
 from sebs.utils import LoggingBase
 from .config import Config
 
+if TYPE_CHECKING:
+    import docker
+
 """
     This class provides basic abstractions for the FaaS system.
     It provides the interface for initialization of the system and storage
@@ -29,7 +30,7 @@ class System(ABC, LoggingBase):
         self,
         system_config: SeBSConfig,
         cache_client: Cache,
-        docker_client: docker.client,
+        docker_client: "docker.client",
     ):
         super().__init__()
         self._system_config = system_config
@@ -42,7 +43,7 @@ class System(ABC, LoggingBase):
         return self._system_config
 
     @property
-    def docker_client(self) -> docker.client:
+    def docker_client(self) -> "docker.client":
         return self._docker_client
 
     @property
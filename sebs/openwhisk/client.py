@@ -0,0 +1,233 @@
+import http.client
+import json
+import os
+import queue
+import ssl
+import threading
+import time
+from base64 import b64encode
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from sebs.utils import LoggingBase
+
+"""
+    Minimal client of the OpenWhisk controller REST API.
+
+    Invocations are sent over a pool of keep-alive HTTP connections, which
+    removes the cost of forking the `wsk` binary for every request.
+    The pool is safe to share between threads and is reset after a fork,
+    so that worker processes never share sockets with their parent.
+"""
+
+
+class ControllerResponse:
+    def __init__(self, status: int, body: Any, begin: int, end: int):
+        self.status = status
+        self.body = body
+        # Client-side timestamps of sending the request and receiving the response,
+        # in nanoseconds since epoch.
+        self.begin = begin
+        self.end = end
+
+
+class OpenWhiskRESTClient(LoggingBase):
+    # Keep-alive connections that were closed by the server.
+    RETRY_EXCEPTIONS = (
+        http.client.RemoteDisconnected,
+        http.client.CannotSendRequest,
+        http.client.BadStatusLine,
+        ConnectionResetError,
+        BrokenPipeError,
+    )
+
+    def __init__(
+        self,
+        api_host: str,
+        auth: str,
+        namespace: str = "_",
+        verify_ssl: bool = True,
+        pool_size: int = 128,
+        timeout: float = 300.0,
+    ):
+        super().__init__()
+        if "://" not in api_host:
+            api_host = f"https://{api_host}"
+        url = urlsplit(api_host)
+        if not url.hostname:
+            raise ValueError(f"Invalid OpenWhisk API host {api_host}")
+        self._scheme = url.scheme
+        self._host: str = url.hostname
+        self._port = url.port
+        self._api_host = api_host
+        self._auth = auth
+        self._namespace = namespace
+        self._verify_ssl = verify_ssl
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._headers = {
+            "Authorization": "Basic " + b64encode(auth.encode()).decode(),
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        }
+        self._reset_pool()
+
+    @staticmethod
+    def typename() -> str:
+        return "OpenWhisk.RESTClient"
+
+    @property
+    def api_host(self) -> str:
+        return self._api_host
+
+    @property
+    def namespace(self) -> str:
+        return self._namespace
+
+    def _reset_pool(self):
+        self._pid = os.getpid()
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=self._pool_size)
+        self._pool_lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Connections cannot be transferred between processes.
+        state = self.__dict__.copy()
+        for key in ["_pool", "_pool_lock", "_logging", "wrapper"]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        LoggingBase.__init__(self)
+        self._reset_pool()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self._scheme == "https":
+            context = ssl.create_default_context()
+            if not self._verify_ssl:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            return http.client.HTTPSConnection(
+                self._host, self._port, timeout=self._timeout, context=context
+            )
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        if self._pid != os.getpid():
+            with self._pool_lock:
+                if self._pid != os.getpid():
+                    self._reset_pool()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _release(self, conn: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(
+        self, method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None
+    ) -> ControllerResponse:
+        url = f"/api/v1/namespaces/{quote(self._namespace, safe='')}/{path}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        data = json.dumps(body).encode() if body is not None else None
+
+        # A pooled connection might have been closed by the server in the meantime.
+        # In such case, we retry once with a fresh connection.
+        for attempt in range(2):
+            conn = self._acquire() if attempt == 0 else self._new_connection()
+            try:
+                begin = time.time_ns()
+                conn.request(method, url, body=data, headers=self._headers)
+                response = conn.getresponse()
+                payload = response.read()
+                end = time.time_ns()
+            except self.RETRY_EXCEPTIONS:
+                conn.close()
+                if attempt == 1:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            try:
+                parsed = json.loads(payload) if payload else {}
+            except json.decoder.JSONDecodeError:
+                parsed = {"error": payload.decode("utf-8", errors="replace")}
+            return ControllerResponse(response.status, parsed, begin, end)
+        raise RuntimeError("Unreachable")
+
+    def invoke(self, action: str, payload: dict, blocking: bool) -> ControllerResponse:
+        return self.request(
+            "POST",
+            f"actions/{quote(action, safe='')}",
+            params={"blocking": "true" if blocking else "false", "result": "false"},
+            body=payload,
+        )
+
+    def get_activation(self, activation_id: str) -> ControllerResponse:
+        return self.request("GET", f"activations/{quote(activation_id, safe='')}")
+
+    def list_activations(
+        self,
+        since: Optional[int] = None,
+        upto: Optional[int] = None,
+        limit: int = 200,
+        skip: int = 0,
+        name: Optional[str] = None,
+    ) -> ControllerResponse:
+        params: Dict[str, Any] = {"docs": "true", "limit": limit, "skip": skip}
+        if since is not None:
+            params["since"] = since
+        if upto is not None:
+            params["upto"] = upto
+        if name is not None:
+            params["name"] = name
+        return self.request("GET", "activations", params=params)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def read_wskprops(path: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read API host and authorization key from the configuration of `wsk`.
+    The CLI stores them in ~/.wskprops unless WSK_CONFIG_FILE points elsewhere.
+    """
+    if path is None:
+        default_path = os.path.join(os.path.expanduser("~"), ".wskprops")
+        path = os.environ.get("WSK_CONFIG_FILE", default_path)
+    props: Dict[str, str] = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                if "=" in line:
+                    key, val = line.strip().split("=", 1)
+                    props[key.strip()] = val.strip()
+    return props.get("APIHOST"), props.get("AUTH")
+
+
+def activation_failure(activation: dict) -> Optional[str]:
+    """
+    Return the failure reason of a finished activation record, None if it succeeded.
+    """
+    response = activation.get("response", {})
+    if response.get("success", False):
+        return None
+    result = response.get("result", {})
+    if isinstance(result, dict) and "error" in result:
+        return str(result["error"])
+    return str(response.get("status", "unknown failure"))
@@ -0,0 +1,186 @@
+import concurrent.futures
+import datetime
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sebs.faas.function import NonBlockingExecutionResult, OpenWhiskExecutionResult
+from sebs.openwhisk.client import OpenWhiskRESTClient
+from sebs.openwhisk.triggers import ACTIVATION_MARGIN, DEFAULT_ACTION_TIMEOUT, LibraryTrigger
+from sebs.utils import LoggingBase
+
+"""
+    Bulk collection of results of non-blocking OpenWhisk invocations.
+
+    With the REST API, activation records are first pulled in pages with the
+    activations list API, using since/upto windows that cover the experiment.
+    Activations that were not found there, and all activations when invoking
+    through wsk, are fetched one by one with bounded parallelism and a
+    per-activation exponential backoff.
+
+    Results are passed to the callback in the calling thread as soon as they arrive.
+"""
+
+# Key identifying the pending activation for the caller, e.g., benchmark name.
+PendingActivation = Tuple[Hashable, LibraryTrigger, NonBlockingExecutionResult]
+CollectCallback = Callable[[Hashable, OpenWhiskExecutionResult], None]
+
+
+class ActivationCollector(LoggingBase):
+    def __init__(
+        self,
+        parallelism: int = 32,
+        page_size: int = 200,
+        window: int = 10_000,
+        initial_backoff: float = 0.125,
+        max_backoff: float = 5.0,
+        timeout: Optional[float] = None,
+    ):
+        """
+        :param parallelism: maximal number of concurrent requests
+        :param page_size: number of activation records per page of the list API
+        :param window: length of since/upto windows of the list API in milliseconds
+        :param initial_backoff: first delay of polling an unfinished activation, in seconds
+        :param max_backoff: maximal delay of polling an unfinished activation, in seconds
+        :param timeout: give up on an activation that is not finished after that many seconds,
+            by default the timeout of its action and a margin, as in parse_nb_results
+        """
+        super().__init__()
+        self._parallelism = parallelism
+        self._page_size = page_size
+        self._window = window
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+
+    @staticmethod
+    def typename() -> str:
+        return "OpenWhisk.ActivationCollector"
+
+    def collect(
+        self,
+        pending: List[PendingActivation],
+        on_result: CollectCallback,
+        since: Optional[int] = None,
+        upto: Optional[int] = None,
+    ):
+        """
+        :param pending: activations to collect
+        :param on_result: callback receiving the key and the result of an activation
+        :param since: begin of the experiment, milliseconds since epoch
+        :param upto: end of the experiment, milliseconds since epoch
+        """
+        remaining: Dict[str, PendingActivation] = {item[2].request_id: item for item in pending}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._parallelism) as pool:
+
+            rest_clients = {
+                id(item[1].rest_client): item[1].rest_client
+                for item in pending
+                if item[1].rest_client is not None
+            }
+            if since is not None and len(rest_clients) == 1:
+                client = next(iter(rest_clients.values()))
+                self._collect_listed(pool, client, remaining, on_result, since, upto)
+
+            if len(remaining) > 0:
+                self.logging.info(f"Polling remaining {len(remaining)} activations.")
+                self._collect_polled(pool, remaining, on_result)
+
+    def _collect_listed(
+        self,
+        pool: concurrent.futures.ThreadPoolExecutor,
+        client: OpenWhiskRESTClient,
+        remaining: Dict[str, PendingActivation],
+        on_result: CollectCallback,
+        since: int,
+        upto: Optional[int],
+    ):
+        if upto is None:
+            upto = int(time.time() * 1000)
+        windows = [
+            (begin, min(begin + self._window, upto)) for begin in range(since, upto, self._window)
+        ]
+        futures = {pool.submit(self._list_window, client, w[0], w[1]) for w in windows}
+        found = 0
+        for fut in concurrent.futures.as_completed(futures):
+            try:
+                records, begin, end = fut.result()
+            except Exception as e:
+                self.logging.warning(f"Listing activations failed: {e}")
+                continue
+            for record in records:
+                item = remaining.pop(record.get("activationId", ""), None)
+                if item is None:
+                    continue
+                found += 1
+                key, trigger, _ = item
+                on_result(key, trigger.result_from_activation(record, begin, end))
+        self.logging.info(f"Retrieved {found} activations with the list API.")
+
+    def _list_window(
+        self, client: OpenWhiskRESTClient, since: int, upto: int
+    ) -> Tuple[List[dict], datetime.datetime, datetime.datetime]:
+        records: List[dict] = []
+        skip = 0
+        begin = datetime.datetime.now()
+        while True:
+            response = client.list_activations(
+                since=since, upto=upto, limit=self._page_size, skip=skip
+            )
+            if response.status != 200:
+                raise RuntimeError(f"Listing activations failed: {response.body}")
+            records.extend(response.body)
+            if len(response.body) < self._page_size:
+                break
+            skip += self._page_size
+        return records, begin, datetime.datetime.now()
+
+    def _collect_polled(
+        self,
+        pool: concurrent.futures.ThreadPoolExecutor,
+        remaining: Dict[str, PendingActivation],
+        on_result: CollectCallback,
+    ):
+        futures = {pool.submit(self._poll, item[1], item[2]): item for item in remaining.values()}
+        for fut in concurrent.futures.as_completed(futures):
+            key, _, nb_result = futures[fut]
+            try:
+                ret = fut.result()
+            except Exception as e:
+                # A single broken activation must not abort the collection
+                self.logging.error(f"Retrieving activation {nb_result.request_id} failed: {e}")
+                ret = self._failed_result(nb_result, str(e))
+            on_result(key, ret)
+            remaining.pop(nb_result.request_id, None)
+
+    @staticmethod
+    def _failed_result(
+        nb_result: NonBlockingExecutionResult, reason: str
+    ) -> OpenWhiskExecutionResult:
+        now = datetime.datetime.now()
+        ret = OpenWhiskExecutionResult.from_times(now, now)
+        ret.stats.failure = True
+        ret.executionResult.request_id = nb_result.request_id
+        ret.failureReason = reason
+        return ret
+
+    def _poll(
+        self, trigger: LibraryTrigger, nb_result: NonBlockingExecutionResult
+    ) -> OpenWhiskExecutionResult:
+        timeout = self._timeout
+        if timeout is None:
+            action_timeout = (
+                trigger.timeout if trigger.timeout is not None else DEFAULT_ACTION_TIMEOUT
+            )
+            timeout = action_timeout + ACTIVATION_MARGIN
+        deadline = time.monotonic() + timeout
+        backoff = self._initial_backoff
+        while True:
+            ret: Any = trigger.fetch_nb_result(nb_result)
+            if ret is not None:
+                return ret
+            if time.monotonic() > deadline:
+                return self._failed_result(
+                    nb_result, f"Activation not finished after {timeout} seconds"
+                )
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self._max_backoff)
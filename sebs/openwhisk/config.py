@@ -9,10 +9,41 @@ from typing import cast, Optional
 
 
 class OpenWhiskCredentials(Credentials):
+    def __init__(self, api_host: Optional[str] = None, auth: Optional[str] = None):
+        super().__init__()
+        self._api_host = api_host
+        self._auth = auth
+
+    @staticmethod
+    def typename() -> str:
+        return "OpenWhisk.Credentials"
+
+    @property
+    def api_host(self) -> Optional[str]:
+        return self._api_host
+
+    @property
+    def auth(self) -> Optional[str]:
+        return self._auth
+
     @staticmethod
     def deserialize(config: dict, cache: Cache, handlers: LoggingHandlers) -> Credentials:
-        return OpenWhiskCredentials()
+        """
+        The controller endpoint and the authorization key are only needed
+        for invocations through the REST API.
+        User config overrides the values configured for the `wsk` tool.
+        """
+        from sebs.openwhisk.client import read_wskprops
+
+        api_host, auth = read_wskprops()
+        if "credentials" in config:
+            api_host = config["credentials"].get("apiHost", api_host)
+            auth = config["credentials"].get("auth", auth)
+        ret = OpenWhiskCredentials(api_host, auth)
+        ret.logging_handlers = handlers
+        return ret
 
+    # Never store the authorization key in cache or results.
     def serialize(self) -> dict:
         return {}
 
@@ -178,6 +209,8 @@ class OpenWhiskConfig(Config):
         self.wsk_exec = config["wskExec"]
         self.wsk_bypass_security = config["wskBypassSecurity"]
         self.experimentalManifest = config["experimentalManifest"]
+        # Invoke actions through the controller REST API instead of wsk.
+        self.rest_invoke = config.get("restInvoke", False)
         self.cache = cache
 
     @property
@@ -200,6 +233,7 @@ class OpenWhiskConfig(Config):
             "wskExec": self.wsk_exec,
             "wskBypassSecurity": self.wsk_bypass_security,
             "experimentalManifest": self.experimentalManifest,
+            "restInvoke": self.rest_invoke,
             "credentials": self._credentials.serialize(),
             "resources": self._resources.serialize(),
         }
@@ -214,6 +248,9 @@ class OpenWhiskConfig(Config):
         res = OpenWhiskConfig(config, cached_config)
         res.logging_handlers = handlers
         res._resources = resources
+        res._credentials = cast(
+            OpenWhiskCredentials, OpenWhiskCredentials.deserialize(config, cache, handlers)
+        )
         return res
 
     def update_cache(self, cache: Cache):
@@ -224,4 +261,5 @@ class OpenWhiskConfig(Config):
         cache.update_config(
             val=self.experimentalManifest, keys=["openwhisk", "experimentalManifest"]
         )
+        cache.update_config(val=self.rest_invoke, keys=["openwhisk", "restInvoke"])
         self.resources.update_cache(cache)
@@ -7,12 +7,14 @@ import docker
 import traceback
 
 from sebs.benchmark import Benchmark
+from sebs.build_pipeline import step
 from sebs.cache import Cache
 from sebs.faas import System, PersistentStorage
 from sebs.faas.function import Function, ExecutionResult, Trigger
 from sebs.openwhisk.seq_benchmark import SequenceBenchmark
 from sebs.openwhisk.storage import Minio
 from sebs.openwhisk.triggers import LibraryTrigger, HTTPTrigger
+from sebs.openwhisk.client import OpenWhiskRESTClient
 from sebs.utils import DOCKER_DIR, LoggingHandlers, execute
 from .config import OpenWhiskConfig
 from .function import OpenWhiskFunction, OpenWhiskFunctionConfig
@@ -33,6 +35,7 @@ class OpenWhisk(System):
         super().__init__(system_config, cache_client, docker_client)
         self._config = config
         self.logging_handlers = logger_handlers
+        self._rest_client: Optional[OpenWhiskRESTClient] = None
 
         if self.config.resources.docker_username:
             if self.config.resources.docker_registry:
@@ -70,6 +73,8 @@ class OpenWhisk(System):
         return self.storage
 
     def shutdown(self) -> None:
+        if self._rest_client is not None:
+            self._rest_client.close()
         if hasattr(self, "storage") and self.config.shutdownStorage:
             self.storage.stop()
         if self.config.removeCluster:
@@ -96,6 +101,29 @@ class OpenWhisk(System):
             cmd.append("-i")
         return cmd
 
+    def get_rest_client(self) -> Optional[OpenWhiskRESTClient]:
+        """
+        Returns the shared client of the controller REST API, if REST invocations are enabled.
+        All library triggers share the same pool of keep-alive connections.
+        """
+        if not self.config.rest_invoke:
+            return None
+        if self._rest_client is None:
+            credentials = self.config.credentials
+            if not credentials.api_host or not credentials.auth:
+                raise RuntimeError(
+                    "OpenWhisk REST invocations require the API host and authorization key! "
+                    "Configure wsk or provide apiHost and auth in credentials."
+                )
+            self._rest_client = OpenWhiskRESTClient(
+                credentials.api_host,
+                credentials.auth,
+                verify_ssl=str(self.config.wsk_bypass_security).lower() != "true",
+            )
+            self._rest_client.logging_handlers = self.logging_handlers
+            self.logging.info(f"Invoking functions through REST API at {credentials.api_host}.")
+        return self._rest_client
+
     def find_image(self, repository_name, image_tag) -> bool:
 
         if self.config.experimentalManifest:
@@ -187,12 +215,13 @@ class OpenWhisk(System):
         self.logging.info(f"Jotham: tag={repository_name}:{image_tag}, path={build_dir}, buildargs={buildargs}")
         # docker build tag does not play nicely with / for the tag
         try:
-            image, _ = self.docker_client.images.build(
-                tag=f"{repository_name}:{image_tag}", 
-                path=build_dir, 
-                buildargs=buildargs, 
-                network_mode="host"
-            )
+            with step("image build"):
+                image, _ = self.docker_client.images.build(
+                    tag=f"{repository_name}:{image_tag}",
+                    path=build_dir,
+                    buildargs=buildargs,
+                    network_mode="host",
+                )
         except docker.errors.BuildError as e:
             traceback.print_exc()
             print(e)
@@ -202,15 +231,16 @@ class OpenWhisk(System):
             f"Push the benchmark base image {repository_name}:{image_tag} "
             f"to registry: {registry_name}."
         )
-        ret = self.docker_client.images.push(
-            repository=repository_name, tag=image_tag, stream=True, decode=True
-        )
-        self.logging.info("After push")
-        # doesn't raise an exception for some reason
-        for val in ret:
-            if "error" in val:
-                self.logging.error(f"Failed to push the image to registry {registry_name}")
-                raise RuntimeError(val)
+        with step("image push"):
+            ret = self.docker_client.images.push(
+                repository=repository_name, tag=image_tag, stream=True, decode=True
+            )
+            self.logging.info("After push")
+            # doesn't raise an exception for some reason
+            for val in ret:
+                if "error" in val:
+                    self.logging.error(f"Failed to push the image to registry {registry_name}")
+                    raise RuntimeError(val)
         self.logging.info("After push 2")
         return True
 
@@ -300,27 +330,28 @@ class OpenWhisk(System):
                         code_package.language_name,
                         code_package.language_version,
                     )
-                    subprocess.run(
-                        [
-                            *self.get_wsk_cmd(),
-                            "action",
-                            "create",
-                            func_name,
-                            "--web",
-                            "true",
-                            "--docker",
-                            docker_image,
-                            "--memory",
-                            str(code_package.benchmark_config.memory),
-                            "--timeout",
-                            str(code_package.benchmark_config.timeout * 1000),
-                            *self.storage_arguments(),
-                            code_package.code_location,
-                        ],
-                        stderr=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        check=True,
-                    )
+                    with step("register"):
+                        subprocess.run(
+                            [
+                                *self.get_wsk_cmd(),
+                                "action",
+                                "create",
+                                func_name,
+                                "--web",
+                                "true",
+                                "--docker",
+                                docker_image,
+                                "--memory",
+                                str(code_package.benchmark_config.memory),
+                                "--timeout",
+                                str(code_package.benchmark_config.timeout * 1000),
+                                *self.storage_arguments(),
+                                code_package.code_location,
+                            ],
+                            stderr=subprocess.PIPE,
+                            stdout=subprocess.PIPE,
+                            check=True,
+                        )
                     function_cfg.docker_image = docker_image
                     res = OpenWhiskFunction(
                         func_name, code_package.benchmark, code_package.hash, function_cfg
@@ -335,7 +366,9 @@ class OpenWhisk(System):
             raise RuntimeError("Failed to access wsk binary")
 
         # Add LibraryTrigger to a new function
-        trigger = LibraryTrigger(func_name, self.get_wsk_cmd())
+        trigger = LibraryTrigger(
+            func_name, self.get_wsk_cmd(), self.get_rest_client(), res.config.timeout
+        )
         trigger.logging_handlers = self.logging_handlers
         res.add_trigger(trigger)
 
@@ -431,7 +464,9 @@ class OpenWhisk(System):
         except FileNotFoundError:
             self.logging.error("Could not retrieve OpenWhisk functions - is path to wsk correct?")
             raise RuntimeError("Failed to access wsk binary")
-        trigger = LibraryTrigger(func_name, self.get_wsk_cmd())
+        trigger = LibraryTrigger(
+            func_name, self.get_wsk_cmd(), self.get_rest_client(), res.config.timeout
+        )
         trigger.logging_handlers = self.logging_handlers
         res.add_trigger(trigger)
         return res
@@ -455,27 +490,28 @@ class OpenWhisk(System):
         )
         print(*self.storage_arguments())
         try:
-            subprocess.run(
-                [
-                    *self.get_wsk_cmd(),
-                    "action",
-                    "update",
-                    function.name,
-                    "--web",
-                    "true",
-                    "--docker",
-                    docker_image,
-                    "--memory",
-                    str(code_package.benchmark_config.memory),
-                    "--timeout",
-                    str(code_package.benchmark_config.timeout * 1000),
-                    *self.storage_arguments(),
-                    code_package.code_location,
-                ],
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                check=True,
-            )
+            with step("register"):
+                subprocess.run(
+                    [
+                        *self.get_wsk_cmd(),
+                        "action",
+                        "update",
+                        function.name,
+                        "--web",
+                        "true",
+                        "--docker",
+                        docker_image,
+                        "--memory",
+                        str(code_package.benchmark_config.memory),
+                        "--timeout",
+                        str(code_package.benchmark_config.timeout * 1000),
+                        *self.storage_arguments(),
+                        code_package.code_location,
+                    ],
+                    stderr=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    check=True,
+                )
             function.config.docker_image = docker_image
 
         except FileNotFoundError as e:
@@ -579,5 +615,7 @@ class OpenWhisk(System):
         for trigger in function.triggers(Trigger.TriggerType.LIBRARY):
             trigger.logging_handlers = self.logging_handlers
             cast(LibraryTrigger, trigger).wsk_cmd = self.get_wsk_cmd()
+            cast(LibraryTrigger, trigger).rest_client = self.get_rest_client()
+            cast(LibraryTrigger, trigger).timeout = function.config.timeout
         for trigger in function.triggers(Trigger.TriggerType.HTTP):
             trigger.logging_handlers = self.logging_handlers
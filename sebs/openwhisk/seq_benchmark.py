@@ -26,6 +26,7 @@ from sebs.cache import Cache
 from sebs.faas.config import Resources
 from sebs.utils import find_benchmark, project_absolute_path, LoggingBase
 from sebs.faas.storage import PersistentStorage
+from sebs.source_hash import SourceHashes
 from sebs.benchmark import Benchmark, BenchmarkConfig, load_benchmark_input
 from typing import TYPE_CHECKING
 
@@ -83,8 +84,16 @@ class SequenceBenchmark(LoggingBase):
     
     @property  # noqa: A003
     def hash(self):
-        path = os.path.join(self.benchmark_path, self.language_name)
-        self._hash_value = Benchmark.hash_directory(path, self._deployment_name, self.language_name)
+        # Sources do not change during a run, the hash is computed once
+        if self._hash_value is None:
+            path = os.path.join(self.benchmark_path, self.language_name)
+            self._hash_value = Benchmark.hash_directory(
+                path,
+                self._deployment_name,
+                self.language_name,
+                SourceHashes.get(self._cache_client.cache_dir),
+                Benchmark.hash_algorithm(self._experiment_config),
+            )
         return self._hash_value
 
     @hash.setter  # noqa: A003
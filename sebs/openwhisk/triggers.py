@@ -2,21 +2,36 @@ import concurrent.futures
 import datetime
 import json
 import subprocess
-from typing import Dict, List, Optional  # noqa
+from typing import Dict, List, Optional, Tuple  # noqa
 import time
 
 from sebs.faas.function import ExecutionResult, NonBlockingExecutionResult, Trigger, OpenWhiskExecutionResult
+from sebs.openwhisk.client import OpenWhiskRESTClient, activation_failure
+
+# Maximal timeout of OpenWhisk actions, used when the timeout of the action is unknown
+DEFAULT_ACTION_TIMEOUT = 300
+# Seconds added to the action timeout before the activation is considered lost
+ACTIVATION_MARGIN = 60
+# Delays of polling an unfinished non-blocking activation, in seconds
+POLL_INITIAL_BACKOFF = 0.125
+POLL_MAX_BACKOFF = 5.0
 
 
 class LibraryTrigger(Trigger):
-    def __init__(self, fname: str, wsk_cmd: Optional[List[str]] = None):
+    def __init__(
+        self,
+        fname: str,
+        wsk_cmd: Optional[List[str]] = None,
+        rest_client: Optional[OpenWhiskRESTClient] = None,
+        timeout: Optional[int] = None,
+    ):
         super().__init__()
         self.fname = fname
         if wsk_cmd:
-            self._wsk_cmd = [*wsk_cmd, "action", "invoke", "--blocking", self.fname]
-            # no --result means non-blocking
-            self._nb_wsk_cmd = [*wsk_cmd, "action", "invoke", self.fname]
-            self._wsk_get_cmd = [*wsk_cmd, "activation", "get"]
+            self.wsk_cmd = wsk_cmd
+        # When set, invocations bypass wsk and use the controller REST API.
+        self._rest_client = rest_client
+        self._timeout = timeout
 
     @staticmethod
     def trigger_type() -> "Trigger.TriggerType":
@@ -30,16 +45,35 @@ class LibraryTrigger(Trigger):
     @wsk_cmd.setter
     def wsk_cmd(self, wsk_cmd: List[str]):
         self._wsk_cmd = [*wsk_cmd, "action", "invoke", "--blocking", self.fname]
-        
+        # no --result means non-blocking
+        self._nb_wsk_cmd = [*wsk_cmd, "action", "invoke", self.fname]
+        self._wsk_get_cmd = [*wsk_cmd, "activation", "get"]
+
     @property
     def nb_wsk_cmd(self) -> List[str]:
         assert self._nb_wsk_cmd
         return self._nb_wsk_cmd
-    
+
     @nb_wsk_cmd.setter
     def nb_wsk_cmd(self, wsk_cmd: List[str]):
-        self._wsk_cmd = [*wsk_cmd, "action", "invoke", self.fname]
-        
+        self._nb_wsk_cmd = [*wsk_cmd, "action", "invoke", self.fname]
+
+    @property
+    def rest_client(self) -> Optional[OpenWhiskRESTClient]:
+        return self._rest_client
+
+    @rest_client.setter
+    def rest_client(self, client: Optional[OpenWhiskRESTClient]):
+        self._rest_client = client
+
+    @property
+    def timeout(self) -> Optional[int]:
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout: Optional[int]):
+        self._timeout = timeout
+
     @property
     def wsk_get_cmd(self) -> List[str]:
         assert self._wsk_get_cmd
@@ -54,46 +88,67 @@ class LibraryTrigger(Trigger):
             params.append(json.dumps(value))
         return params
     
-    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> ExecutionResult:
-        """Blocks until result is done"""
-        command = self.wsk_get_cmd + [str(nb_result.request_id)]
-        error = None
-        self.logging.info(f"{command=}")
+    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> OpenWhiskExecutionResult:
+        """
+        Blocks until result is done, returns a failed result when the activation
+        does not finish within the timeout of the action and a margin.
+        """
+        timeout = self._timeout if self._timeout is not None else DEFAULT_ACTION_TIMEOUT
+        deadline = time.monotonic() + timeout + ACTIVATION_MARGIN
+        backoff = POLL_INITIAL_BACKOFF
         # We loop because it is possible when we arrive here, the non-blocking
         # result hasn't even been scheduled yet
-        while True: 
-            try:
-                # This is actual request time
-                begin = datetime.datetime.now()
-                response = subprocess.run(
-                    command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.DEVNULL,
+        while True:
+            ret = self.fetch_nb_result(nb_result)
+            if ret is not None:
+                return ret
+            if time.monotonic() > deadline:
+                self.logging.error(
+                    f"Activation {nb_result.request_id} of {self.fname} did not finish "
+                    f"within {timeout} s"
                 )
-                end = datetime.datetime.now()
-                parsed_response = response.stdout.decode("utf-8")
-                # This means that the activation was queued but did not finish
-                # From here, it is possible for it to timeout after 300 seconds
-                if 'error: Unable to get result' in parsed_response or parsed_response == "":
-                    # Busy poll
-                    time.sleep(0.125)
-                    continue
-                elif "error" in parsed_response or "Error" in parsed_response:
-                    # Doomed break
-                    error = ValueError("Failed")
-                    break
-                elif parsed_response != "" and not parsed_response.startswith("error:"):
-                    # Successful break
-                    break
-                else:
-                    raise ValueError("Some new error was encountered: " + parsed_response)
-            except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                end = datetime.datetime.now()
-                error = e
-                print(e)
-            except Exception as e:
-                print(e)
-            
+                now = datetime.datetime.now()
+                openwhisk_result = OpenWhiskExecutionResult.from_times(now, now)
+                openwhisk_result.stats.failure = True
+                openwhisk_result.executionResult.request_id = nb_result.request_id
+                openwhisk_result.failureReason = f"Activation not finished after {timeout} s"
+                return openwhisk_result
+            time.sleep(backoff)
+            backoff = min(backoff * 2, POLL_MAX_BACKOFF)
+
+    def fetch_nb_result(
+        self, nb_result: NonBlockingExecutionResult
+    ) -> Optional[OpenWhiskExecutionResult]:
+        """
+        Single attempt to retrieve the result of a non-blocking invocation.
+        Returns None when the activation has not finished yet.
+        """
+        if self._rest_client is not None:
+            return self._rest_fetch_nb_result(nb_result)
+        command = self.wsk_get_cmd + [str(nb_result.request_id)]
+        error: Optional[Exception] = None
+        self.logging.debug(f"{command=}")
+        # This is actual request time
+        begin = datetime.datetime.now()
+        try:
+            response = subprocess.run(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            end = datetime.datetime.now()
+            parsed_response = response.stdout.decode("utf-8")
+            # This means that the activation was queued but did not finish
+            # From here, it is possible for it to timeout after 300 seconds
+            if 'error: Unable to get result' in parsed_response or parsed_response == "":
+                return None
+            elif "error" in parsed_response or "Error" in parsed_response:
+                # Doomed break
+                error = ValueError("Failed")
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            end = datetime.datetime.now()
+            error = e
+
         openwhisk_result = OpenWhiskExecutionResult.from_times(begin, end)
         if error is not None:
             self.logging.error("Invocation of {} failed!".format(self.fname))
@@ -102,29 +157,33 @@ class LibraryTrigger(Trigger):
             openwhisk_result.executionResult.request_id = nb_result.request_id
             openwhisk_result.failureReason = str(error)
             return openwhisk_result
-        
+
         # This includes the success return code in the first line
         if "ok" in parsed_response:
             parsed_response = "\n".join(parsed_response.split("\n")[1:])
         return_content = json.loads(parsed_response)
         openwhisk_result.parse_benchmark_output(return_content)
+        openwhisk_result.executionResult.request_id = nb_result.request_id
         return openwhisk_result
-    
+
     def openwhisk_nonblocking_invoke(self, payload: Dict) -> NonBlockingExecutionResult:
+        if self._rest_client is not None:
+            return self._rest_nonblocking_invoke(payload)
         command = self.nb_wsk_cmd + self.get_command(payload)
         error = None
         try:
-            begin = datetime.datetime.now()
+            # Nanoseconds since epoch, as in the REST path
+            begin = time.time_ns()
             response = subprocess.run(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
                 check=True,
             )
-            end = datetime.datetime.now()
+            end = time.time_ns()
             parsed_response = response.stdout.decode("utf-8")
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            end = datetime.datetime.now()
+            end = time.time_ns()
             error = e
         
         if error is not None:
@@ -136,26 +195,34 @@ class LibraryTrigger(Trigger):
         ret = NonBlockingExecutionResult.deserialize(parsed_response, begin, end)
         return ret
 
-    def sync_invoke(self, payload: dict) -> ExecutionResult:
+    # Results of OpenWhisk wrap the ExecutionResult, callers unwrap them
+    def sync_invoke(self, payload: dict) -> OpenWhiskExecutionResult:  # type: ignore[override]
+        if self._rest_client is not None:
+            return self._rest_sync_invoke(payload)
         command = self.wsk_cmd + self.get_command(payload)
         self.logging.info(f"Command is {' '.join(command)}")
         error = None
         parsed_response = ""
         try:
             begin = datetime.datetime.now()
+            sent = time.time_ns()
             response = subprocess.run(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
                 check=True,
             )
+            received = time.time_ns()
             end = datetime.datetime.now()
             parsed_response = response.stdout.decode("utf-8")
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            received = time.time_ns()
             end = datetime.datetime.now()
             error = e
 
         openwhisk_result = OpenWhiskExecutionResult.from_times(begin, end)
+        openwhisk_result.executionResult.times.sent = sent
+        openwhisk_result.executionResult.times.received = received
         if error is not None:
             self.logging.error("Invocation of {} failed! Trace: {}".format(self.fname, parsed_response))
             openwhisk_result.stats.failure = True
@@ -169,6 +236,131 @@ class LibraryTrigger(Trigger):
         openwhisk_result.parse_benchmark_output(return_content)
         return openwhisk_result
 
+    def result_from_activation(
+        self, activation: dict, begin: datetime.datetime, end: datetime.datetime
+    ) -> OpenWhiskExecutionResult:
+        """
+        Convert an activation record returned by the controller.
+        Begin and end are the client times of the request that returned the record.
+        """
+        openwhisk_result = OpenWhiskExecutionResult.from_times(begin, end)
+        openwhisk_result.executionResult.request_id = activation.get("activationId", "")
+        failure = activation_failure(activation)
+        if failure is not None:
+            self.logging.error(f"Invocation of {self.fname} failed! Reason: {failure}")
+            openwhisk_result.stats.failure = True
+            openwhisk_result.failureReason = failure
+            return openwhisk_result
+        try:
+            openwhisk_result.parse_benchmark_output(activation)
+        except RuntimeError as e:
+            self.logging.error(f"Invocation of {self.fname} failed! Reason: {e}")
+            openwhisk_result.stats.failure = True
+            openwhisk_result.failureReason = str(e)
+        return openwhisk_result
+
+    def _rest_wait_activation(self, activation_id: str) -> Tuple[dict, int, int]:
+        """
+        Poll the controller until the activation record is available.
+        Returns the record and client timestamps of the successful request.
+        Raises TimeoutError when the activation does not finish within the
+        timeout of the action and a margin.
+        """
+        assert self._rest_client
+        timeout = self._timeout if self._timeout is not None else DEFAULT_ACTION_TIMEOUT
+        deadline = time.monotonic() + timeout + ACTIVATION_MARGIN
+        backoff = POLL_INITIAL_BACKOFF
+        while True:
+            response = self._rest_client.get_activation(activation_id)
+            # The activation was queued but has not finished yet.
+            if response.status == 404:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(
+                        f"Activation {activation_id} did not finish within {timeout} s"
+                    )
+                time.sleep(backoff)
+                backoff = min(backoff * 2, POLL_MAX_BACKOFF)
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Cannot retrieve activation {activation_id}: {response.body}")
+            return response.body, response.begin, response.end
+
+    def _rest_sync_invoke(self, payload: dict) -> OpenWhiskExecutionResult:
+        assert self._rest_client
+        begin = datetime.datetime.now()
+        sent = time.time_ns()
+        try:
+            response = self._rest_client.invoke(self.fname, payload, blocking=True)
+            activation = response.body
+            # The controller returns 202 when the blocking invocation exceeds its timeout.
+            # 502 indicates an application error and contains a full activation record.
+            if response.status == 202:
+                activation, _, _ = self._rest_wait_activation(activation["activationId"])
+            elif response.status not in (200, 502):
+                raise RuntimeError(f"Invocation returned {response.status}: {activation}")
+        except Exception as e:
+            end = datetime.datetime.now()
+            self.logging.error("Invocation of {} failed! Reason: {}".format(self.fname, e))
+            openwhisk_result = OpenWhiskExecutionResult.from_times(begin, end)
+            openwhisk_result.stats.failure = True
+            openwhisk_result.failureReason = str(e)
+            return openwhisk_result
+        received = time.time_ns()
+        end = datetime.datetime.now()
+        openwhisk_result = self.result_from_activation(activation, begin, end)
+        openwhisk_result.executionResult.times.sent = sent
+        openwhisk_result.executionResult.times.received = received
+        return openwhisk_result
+
+    def _rest_nonblocking_invoke(self, payload: dict) -> NonBlockingExecutionResult:
+        assert self._rest_client
+        ret = NonBlockingExecutionResult()
+        begin = time.time_ns()
+        try:
+            response = self._rest_client.invoke(self.fname, payload, blocking=False)
+        except Exception as e:
+            self.logging.error("Invocation of {} failed! Reason: {}".format(self.fname, e))
+            ret.failure = True
+            return ret
+        ret.activation_timestamp = begin
+        ret.return_timestamp = time.time_ns()
+        if response.status != 202 or "activationId" not in response.body:
+            self.logging.error(
+                "Invocation of {} failed! Output: {}".format(self.fname, response.body)
+            )
+            ret.failure = True
+        else:
+            ret.request_id = response.body["activationId"]
+        return ret
+
+    def _rest_fetch_nb_result(
+        self, nb_result: NonBlockingExecutionResult
+    ) -> Optional[OpenWhiskExecutionResult]:
+        assert self._rest_client
+        try:
+            response = self._rest_client.get_activation(nb_result.request_id)
+            # The activation was queued but has not finished yet.
+            if response.status == 404:
+                return None
+            if response.status != 200:
+                raise RuntimeError(
+                    f"Cannot retrieve activation {nb_result.request_id}: {response.body}"
+                )
+        except Exception as e:
+            now = datetime.datetime.now()
+            self.logging.error("Invocation of {} failed!".format(self.fname))
+            self.logging.error(e)
+            openwhisk_result = OpenWhiskExecutionResult.from_times(now, now)
+            openwhisk_result.stats.failure = True
+            openwhisk_result.executionResult.request_id = nb_result.request_id
+            openwhisk_result.failureReason = str(e)
+            return openwhisk_result
+        return self.result_from_activation(
+            response.body,
+            datetime.datetime.fromtimestamp(response.begin / 1e9),
+            datetime.datetime.fromtimestamp(response.end / 1e9),
+        )
+
     def async_invoke(self, payload: dict) -> concurrent.futures.Future:
         pool = concurrent.futures.ThreadPoolExecutor()
         fut = pool.submit(self.sync_invoke, payload)
@@ -200,7 +392,7 @@ class HTTPTrigger(Trigger):
     def trigger_type() -> Trigger.TriggerType:
         return Trigger.TriggerType.HTTP
     
-    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> ExecutionResult:
+    def parse_nb_results(self, nb_result: NonBlockingExecutionResult) -> OpenWhiskExecutionResult:
         raise ValueError("Openwhisk HTTP Trigger cannot support non-blocking invocation!")
 
     def openwhisk_nonblocking_invoke(self, payload: Dict) -> NonBlockingExecutionResult:
@@ -1,25 +1,27 @@
 import json
 import os
-from typing import Optional, Dict, Type
-
-import docker
+from typing import Optional, Dict, Type, TYPE_CHECKING
 
 import sebs.storage
 from sebs import types
-from sebs.local import Local
 from sebs.cache import Cache
+from sebs.sqlite_cache import SQLiteCache, has_database
 from sebs.config import SeBSConfig
-from sebs.benchmark import Benchmark, BenchmarkConfig
+# sebs.faas imports sebs.benchmark, which imports sebs.faas.config - import cycle
 from sebs.faas.system import System as FaaSSystem
+from sebs.benchmark import Benchmark, BenchmarkConfig
 from sebs.faas.storage import PersistentStorage
 from sebs.faas.config import Config
 from sebs.utils import has_platform, LoggingHandlers, LoggingBase, find_benchmark
 
 from sebs.experiments.config import Config as ExperimentConfig
-from sebs.experiments.schedule import ScheduleConfig
-from sebs.experiments import Experiment
 
-from sebs.openwhisk.seq_benchmark import SequenceBenchmark
+# Docker, the local deployment and NumPy are imported only when used
+if TYPE_CHECKING:
+    import docker
+
+    from sebs.experiments import Experiment
+    from sebs.experiments.schedule import ScheduleConfig
 
 
 class SeBS(LoggingBase):
@@ -28,7 +30,7 @@ class SeBS(LoggingBase):
         return self._cache_client
 
     @property
-    def docker_client(self) -> docker.client:
+    def docker_client(self) -> "docker.client":
         return self._docker_client
 
     @property
@@ -62,9 +64,20 @@ class SeBS(LoggingBase):
         output_dir: str,
         verbose: bool = False,
         logging_filename: Optional[str] = None,
+        cache_backend: Optional[str] = None,
     ):
         super().__init__()
-        self._cache_client = Cache(cache_dir)
+        # Caches with a database keep using it
+        if cache_backend is None:
+            cache_backend = "sqlite" if has_database(cache_dir) else "json"
+        if cache_backend == "sqlite":
+            self._cache_client: Cache = SQLiteCache(cache_dir)
+        else:
+            if has_database(cache_dir):
+                self.logging.warning(f"Cache {cache_dir} has a database, which won't be updated")
+            self._cache_client = Cache(cache_dir)
+        import docker
+
         self._docker_client = docker.from_env()
         self._config = SeBSConfig()
         self._output_dir = output_dir
@@ -89,6 +102,8 @@ class SeBS(LoggingBase):
         logging_filename: Optional[str] = None,
         deployment_config: Optional[Config] = None,
     ) -> FaaSSystem:
+        from sebs.local import Local
+
         name = config["name"]
         implementations: Dict[str, Type[FaaSSystem]] = {"local": Local}
 
@@ -136,12 +151,14 @@ class SeBS(LoggingBase):
     def get_experiment_config(self, config: dict) -> ExperimentConfig:
         return ExperimentConfig.deserialize(config)
     
-    def get_schedule_config(self, config: dict) -> ScheduleConfig:
+    def get_schedule_config(self, config: dict) -> "ScheduleConfig":
+        from sebs.experiments.schedule import ScheduleConfig
+
         return ScheduleConfig.deserialize(config)
 
     def get_experiment(
         self, experiment_type: str, config: dict, logging_filename: Optional[str] = None
-    ) -> Experiment:
+    ) -> "Experiment":
         from sebs.experiments import (
             Experiment,
             PerfCost,
@@ -178,6 +195,8 @@ class SeBS(LoggingBase):
         with open(os.path.join(benchmark_path, "config.json")) as json_file:
             benchmark_config = BenchmarkConfig.deserialize(json.load(json_file))
         if benchmark_config.is_wsk_sequence:
+            from sebs.openwhisk.seq_benchmark import SequenceBenchmark
+
             benchmark = SequenceBenchmark(
                 name,
                 deployment.name(),
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sebs.utils import LoggingBase, serialize
+
+"""
+    Memo of digests of benchmark sources, stored in <cache>/source_hashes.json.
+
+    A digest of a file is reused while its path, size and modification time
+    in nanoseconds stay the same, so computing the hash of a benchmark reads
+    only files changed since the last run. Files modified in the last seconds
+    are not memorized, as a later change could keep the same modification time.
+    The memo of a cache directory is loaded once per process and shared by all
+    benchmarks.
+"""
+
+MEMO_FILE = "source_hashes.json"
+VERSION = 1
+# Changes within the timestamp resolution of the filesystem are not detected
+RECENT_CHANGE = 2 * 10**9
+ALGORITHMS = ["md5", "blake2b"]
+
+# size, mtime_ns, algorithm, digest
+Entry = Tuple[int, int, str, str]
+
+
+def file_digest(path: str, algorithm: str) -> str:
+    hash_sum = hashlib.new(algorithm)
+    with open(path, "rb") as opened_file:
+        hash_sum.update(opened_file.read())
+    return hash_sum.hexdigest()
+
+
+def combine(files: List[Tuple[str, str]], algorithm: str) -> str:
+    """Hash of names and digests of files, in the given order."""
+    hash_sum = hashlib.new(algorithm)
+    for name, digest in files:
+        hash_sum.update(name.encode())
+        hash_sum.update(b"\0")
+        hash_sum.update(digest.encode())
+        hash_sum.update(b"\0")
+    return hash_sum.hexdigest()
+
+
+class SourceHashes(LoggingBase):
+
+    _instances: Dict[str, "SourceHashes"] = {}
+    _instances_lock = threading.Lock()
+
+    @staticmethod
+    def typename() -> str:
+        return "Benchmark.SourceHashes"
+
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self._path = os.path.join(cache_dir, MEMO_FILE)
+        self._lock = threading.Lock()
+        self._files: Dict[str, Entry] = {}
+        self._updated = False
+        if os.path.exists(self._path):
+            try:
+                with open(self._path, "r") as memo_file:
+                    memo = json.load(memo_file)
+                if memo["version"] == VERSION:
+                    self._files = {path: tuple(entry) for path, entry in memo["files"].items()}
+            except (ValueError, KeyError):
+                self.logging.warning(f"Ignoring invalid memo of source hashes {self._path}")
+
+    @staticmethod
+    def get(cache_dir: str) -> "SourceHashes":
+        """Memo of the cache directory, loaded on the first use in the process."""
+        cache_dir = os.path.abspath(cache_dir)
+        with SourceHashes._instances_lock:
+            if cache_dir not in SourceHashes._instances:
+                SourceHashes._instances[cache_dir] = SourceHashes(cache_dir)
+            return SourceHashes._instances[cache_dir]
+
+    def digest(self, path: str, algorithm: str) -> str:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._files.get(path)
+        if entry is not None and entry[:3] == (stat.st_size, stat.st_mtime_ns, algorithm):
+            return entry[3]
+        digest = file_digest(path, algorithm)
+        if time.time_ns() - stat.st_mtime_ns > RECENT_CHANGE:
+            with self._lock:
+                self._files[path] = (stat.st_size, stat.st_mtime_ns, algorithm, digest)
+                self._updated = True
+        return digest
+
+    def save(self):
+        """
+        Replace the memo atomically. Memos of concurrent processes are not merged,
+        the digests missing in the last written one are computed again.
+        """
+        with self._lock:
+            if not self._updated:
+                return
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as memo_file:
+                memo_file.write(serialize({"version": VERSION, "files": self._files}))
+            os.replace(tmp_path, self._path)
+            self._updated = False
@@ -0,0 +1,383 @@
+import datetime
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, TYPE_CHECKING
+
+from sebs.cache import Cache, update
+from sebs.utils import serialize
+
+if TYPE_CHECKING:
+    from sebs.benchmark import Benchmark
+    from sebs.faas.function import Function
+
+"""
+    Cache with configs stored in an SQLite database, <cache>/cache.sqlite.
+
+    Code packages, functions and storage of benchmarks are rows of separate
+    tables, found through their primary keys. Functions are also indexed by
+    benchmark and name, and code packages and functions by hash. Every update
+    is a single transaction, so that processes sharing the cache never lose each
+    other's updates, and the database runs in WAL mode, so that readers do not
+    wait for writers. Code packages are still copied into the cache directory.
+
+    On the first use of a cache directory, benchmark configs and cloud configs
+    stored in JSON files are imported into the database. The files are kept
+    but no longer updated.
+"""
+
+DATABASE = "cache.sqlite"
+SCHEMA_VERSION = 1
+# Seconds to wait for a transaction of another process
+BUSY_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS code_packages (
+    deployment TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    language TEXT NOT NULL,
+    language_version TEXT NOT NULL,
+    hash TEXT,
+    config TEXT NOT NULL,
+    PRIMARY KEY (deployment, benchmark, language, language_version)
+);
+CREATE INDEX IF NOT EXISTS code_packages_benchmark ON code_packages (benchmark);
+CREATE INDEX IF NOT EXISTS code_packages_hash ON code_packages (hash);
+CREATE TABLE IF NOT EXISTS functions (
+    deployment TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    language TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hash TEXT,
+    config TEXT NOT NULL,
+    PRIMARY KEY (deployment, benchmark, language, name)
+);
+CREATE INDEX IF NOT EXISTS functions_name ON functions (benchmark, name);
+CREATE INDEX IF NOT EXISTS functions_hash ON functions (hash);
+CREATE TABLE IF NOT EXISTS storage (
+    deployment TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    config TEXT NOT NULL,
+    PRIMARY KEY (deployment, benchmark)
+);
+CREATE TABLE IF NOT EXISTS clouds (
+    cloud TEXT PRIMARY KEY,
+    config TEXT NOT NULL
+);
+"""
+
+
+def has_database(cache_dir: str) -> bool:
+    return os.path.exists(os.path.join(cache_dir, DATABASE))
+
+
+class SQLiteCache(Cache):
+    def __init__(self, cache_dir: str):
+        path = os.path.join(os.path.abspath(cache_dir), DATABASE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Transactions are started explicitly, the lock of the cache serializes threads
+        self._db = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        super().__init__(cache_dir)
+
+    @staticmethod
+    def typename() -> str:
+        return "Benchmark.SQLiteCache"
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            # Take the write lock at once, a deferred upgrade could fail with a busy database
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            else:
+                self._db.execute("COMMIT")
+
+    def _query(self, query: str, *params) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def load_config(self):
+        with self._transaction() as db:
+            (version,) = db.execute("PRAGMA user_version").fetchone()
+            if version < SCHEMA_VERSION:
+                # executescript would commit the transaction
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        db.execute(statement)
+                if version == 0:
+                    self._migrate(db)
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            for cloud, config in db.execute("SELECT cloud, config FROM clouds"):
+                self.cached_config[cloud] = json.loads(config)
+
+    def _migrate(self, db: sqlite3.Connection):
+        """Import configs stored in JSON files of the directory layout."""
+        benchmarks = 0
+        for benchmark in sorted(os.listdir(self.cache_dir)):
+            config_file = os.path.join(self.cache_dir, benchmark, "config.json")
+            if not os.path.isfile(config_file):
+                continue
+            with open(config_file, "r") as fp:
+                config = json.load(fp)
+            for deployment, deployment_cfg in config.items():
+                for language, language_cfg in deployment_cfg.items():
+                    if language == "storage":
+                        self._insert_storage(db, deployment, benchmark, language_cfg)
+                        continue
+                    for version, package in language_cfg.get("code_package", {}).items():
+                        self._insert_package(db, deployment, benchmark, language, version, package)
+                    for name, function in language_cfg.get("functions", {}).items():
+                        self._insert_function(db, deployment, benchmark, language, name, function)
+            benchmarks += 1
+        clouds = 0
+        for cloud in ["azure", "aws", "gcp", "openwhisk"]:
+            cloud_config_file = os.path.join(self.cache_dir, "{}.json".format(cloud))
+            if os.path.exists(cloud_config_file):
+                with open(cloud_config_file, "r") as fp:
+                    config = json.load(fp)
+                db.execute(
+                    "INSERT OR REPLACE INTO clouds VALUES (?, ?)", (cloud, serialize(config))
+                )
+                clouds += 1
+        if benchmarks or clouds:
+            self.logging.info(
+                f"Imported {benchmarks} benchmarks and {clouds} cloud configs "
+                f"into {os.path.join(self.cache_dir, DATABASE)}"
+            )
+
+    @staticmethod
+    def _insert_package(
+        db: sqlite3.Connection,
+        deployment: str,
+        benchmark: str,
+        language: str,
+        language_version: str,
+        config: dict,
+    ):
+        db.execute(
+            "INSERT OR REPLACE INTO code_packages VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                deployment,
+                benchmark,
+                language,
+                language_version,
+                config.get("hash"),
+                serialize(config),
+            ),
+        )
+
+    @staticmethod
+    def _insert_function(
+        db: sqlite3.Connection,
+        deployment: str,
+        benchmark: str,
+        language: str,
+        name: str,
+        config: dict,
+    ):
+        db.execute(
+            "INSERT OR REPLACE INTO functions VALUES (?, ?, ?, ?, ?, ?)",
+            (deployment, benchmark, language, name, config.get("hash"), serialize(config)),
+        )
+
+    @staticmethod
+    def _insert_storage(db: sqlite3.Connection, deployment: str, benchmark: str, config: dict):
+        db.execute(
+            "INSERT OR REPLACE INTO storage VALUES (?, ?, ?)",
+            (deployment, benchmark, serialize(config)),
+        )
+
+    def shutdown(self):
+        if self.config_updated:
+            # Merge with cloud configs updated by other processes in the meantime
+            with self._transaction() as db:
+                for cloud in ["azure", "aws", "gcp", "openwhisk"]:
+                    if cloud in self.cached_config:
+                        row = db.execute(
+                            "SELECT config FROM clouds WHERE cloud = ?", (cloud,)
+                        ).fetchone()
+                        config = json.loads(row[0]) if row is not None else {}
+                        update(config, self.cached_config[cloud])
+                        self.logging.info("Update cached config {}".format(cloud))
+                        db.execute(
+                            "INSERT OR REPLACE INTO clouds VALUES (?, ?)",
+                            (cloud, serialize(config)),
+                        )
+
+    def get_benchmark_config(self, deployment: str, benchmark: str):
+        config: Dict[str, Any] = {}
+        with self._lock:
+            for language, version, package in self._db.execute(
+                "SELECT language, language_version, config FROM code_packages "
+                "WHERE deployment = ? AND benchmark = ?",
+                (deployment, benchmark),
+            ):
+                language_cfg = config.setdefault(language, {"code_package": {}, "functions": {}})
+                language_cfg["code_package"][version] = json.loads(package)
+            for language, name, function in self._db.execute(
+                "SELECT language, name, config FROM functions "
+                "WHERE deployment = ? AND benchmark = ?",
+                (deployment, benchmark),
+            ):
+                language_cfg = config.setdefault(language, {"code_package": {}, "functions": {}})
+                language_cfg["functions"][name] = json.loads(function)
+        storage = self._query(
+            "SELECT config FROM storage WHERE deployment = ? AND benchmark = ?",
+            deployment,
+            benchmark,
+        )
+        if storage is not None:
+            config["storage"] = storage
+        return config if config else None
+
+    def get_code_package(
+        self, deployment: str, benchmark: str, language: str, language_version: str
+    ) -> Optional[Dict[str, Any]]:
+        return self._query(
+            "SELECT config FROM code_packages WHERE deployment = ? AND benchmark = ? "
+            "AND language = ? AND language_version = ?",
+            deployment,
+            benchmark,
+            language,
+            language_version,
+        )
+
+    def get_functions(
+        self, deployment: str, benchmark: str, language: str
+    ) -> Optional[Dict[str, Any]]:
+        if self.ignore_functions:
+            return None
+        with self._lock:
+            functions = {
+                name: json.loads(config)
+                for name, config in self._db.execute(
+                    "SELECT name, config FROM functions "
+                    "WHERE deployment = ? AND benchmark = ? AND language = ?",
+                    (deployment, benchmark, language),
+                )
+            }
+            if functions:
+                return functions
+            # As in JSON configs, languages with a code package have functions
+            package = self._db.execute(
+                "SELECT 1 FROM code_packages "
+                "WHERE deployment = ? AND benchmark = ? AND language = ? LIMIT 1",
+                (deployment, benchmark, language),
+            ).fetchone()
+            return {} if package is not None else None
+
+    def get_storage_config(self, deployment: str, benchmark: str):
+        if self.ignore_storage:
+            return None
+        return self._query(
+            "SELECT config FROM storage WHERE deployment = ? AND benchmark = ?",
+            deployment,
+            benchmark,
+        )
+
+    def update_storage(self, deployment: str, benchmark: str, config: dict):
+        if self.ignore_storage:
+            return
+        with self._transaction() as db:
+            self._insert_storage(db, deployment, benchmark, config)
+
+    def _add_package_config(
+        self,
+        deployment_name: str,
+        benchmark: str,
+        language: str,
+        language_version: str,
+        language_config: dict,
+        cached_location: str,
+    ):
+        # don't store absolute path to avoid problems with moving cache dir
+        language_config["location"] = os.path.relpath(cached_location, self.cache_dir)
+        date = str(datetime.datetime.now())
+        language_config["date"] = {
+            "created": date,
+            "modified": date,
+        }
+        with self._transaction() as db:
+            self._insert_package(
+                db, deployment_name, benchmark, language, language_version, language_config
+            )
+
+    def _update_package_config(
+        self,
+        deployment_name: str,
+        benchmark: str,
+        language: str,
+        language_version: str,
+        code_hash: str,
+    ):
+        keys = (deployment_name, benchmark, language, language_version)
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT config FROM code_packages WHERE deployment = ? AND benchmark = ? "
+                "AND language = ? AND language_version = ?",
+                keys,
+            ).fetchone()
+            config = json.loads(row[0]) if row is not None else {}
+            config.setdefault("date", {})["modified"] = str(datetime.datetime.now())
+            config["hash"] = code_hash
+            self._insert_package(db, *keys, config)
+
+    def _has_code_package(self, db: sqlite3.Connection, benchmark: str) -> bool:
+        return (
+            db.execute(
+                "SELECT 1 FROM code_packages WHERE benchmark = ? LIMIT 1", (benchmark,)
+            ).fetchone()
+            is not None
+        )
+
+    def add_function(
+        self,
+        deployment_name: str,
+        language_name: str,
+        code_package: "Benchmark",
+        function: "Function",
+    ):
+        if self.ignore_functions:
+            return
+        with self._transaction() as db:
+            if not self._has_code_package(db, code_package.benchmark):
+                raise RuntimeError(
+                    "Can't cache function {} for a non-existing code package!".format(function.name)
+                )
+            self._insert_function(
+                db,
+                deployment_name,
+                code_package.benchmark,
+                code_package.language_name,
+                function.name,
+                function.serialize(),
+            )
+
+    def update_function(self, function: "Function"):
+        if self.ignore_functions:
+            return
+        config = function.serialize()
+        with self._transaction() as db:
+            if not self._has_code_package(db, function.benchmark):
+                raise RuntimeError(
+                    "Can't cache function {} for a non-existing code package!".format(function.name)
+                )
+            # Deployments and languages of the function, as in the locations of JSON configs
+            locations = db.execute(
+                "SELECT deployment, language FROM functions WHERE benchmark = ? AND name = ?",
+                (function.benchmark, function.name),
+            ).fetchall()
+            for deployment, language in locations:
+                self._insert_function(
+                    db, deployment, function.benchmark, language, function.name, config
+                )
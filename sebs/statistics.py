@@ -1,9 +1,8 @@
 import math
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from collections import namedtuple
 
 import numpy as np
-import scipy.stats as st
 
 BasicStats = namedtuple("BasicStats", "mean median std cv")
 
@@ -17,14 +16,24 @@ def basic_stats(times: List[float]) -> BasicStats:
 
 
 def ci_tstudents(alpha: float, times: List[float]) -> Tuple[float, float]:
+    # Imported on use, scipy.stats alone takes longer to import than the CLI
+    import scipy.stats as st
+
     mean = np.mean(times)
     return st.t.interval(alpha, len(times) - 1, loc=mean, scale=st.sem(times))
 
 
-def ci_le_boudec(alpha: float, times: List[float]) -> Tuple[float, float]:
-
-    sorted_times = sorted(times)
-    n = len(times)
+def ci_le_boudec(alpha: float, times: Union[List[float], "QuantileSketch"]) -> Tuple[float, float]:
+    """
+    Non-parametric confidence interval of the median.
+    Pass a sketch to compute intervals of many confidence levels without sorting again.
+    """
+    if isinstance(times, QuantileSketch):
+        sketch = times
+    else:
+        sketch = QuantileSketch(exact_limit=len(times))
+        sketch.add_many(times)
+    n = sketch.count
 
     # z(alfa/2)
     z_value = {0.95: 1.96, 0.99: 2.576}.get(alpha)
@@ -33,4 +42,196 @@ def ci_le_boudec(alpha: float, times: List[float]) -> Tuple[float, float]:
     low_pos = math.floor((n - z_value * math.sqrt(n)) / 2)
     high_pos = math.ceil(1 + (n + z_value * math.sqrt(n)) / 2)
 
-    return (sorted_times[low_pos], sorted_times[high_pos])
+    return (sketch.value_at_rank(low_pos), sketch.value_at_rank(high_pos))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a bounded relative error (DDSketch).
+
+    Values are counted in buckets with logarithmically growing bounds, so that
+    every quantile is estimated within the relative accuracy `alpha` and
+    the memory does not depend on the number of values: latencies between
+    a microsecond and an hour need fewer than 1100 buckets with 1% accuracy.
+    Sketches with the same accuracy are merged by adding bucket counts,
+    e.g., sketches of workers of a distributed experiment.
+
+    Small samples are kept exactly, and their quantiles are the same as
+    the ones of np.percentile, until they grow beyond `exact_limit` values.
+    Mean and standard deviation are always exact.
+    """
+
+    # Smaller values are counted as zero.
+    MIN_VALUE = 1e-9
+
+    def __init__(self, alpha: float = 0.01, exact_limit: int = 1000):
+        if not 0 < alpha < 1:
+            raise ValueError(f"Relative accuracy must be in (0, 1), got {alpha}")
+        self.alpha = alpha
+        self.exact_limit = exact_limit
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared differences from the mean
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        # Values of the exact mode, None once they are counted in buckets
+        self._values: Optional[List[float]] = []
+        self._sorted = True
+        self._zero = 0
+        self._positive: Dict[int, int] = {}
+        self._negative: Dict[int, int] = {}
+
+    @property
+    def exact(self) -> bool:
+        return self._values is not None
+
+    def add(self, value: float):
+        self.add_many([value])
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        n = len(values)
+        self._update_moments(n, float(np.mean(values)), float(np.var(values)) * n)
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+        if self._values is not None:
+            self._values.extend(values.tolist())
+            self._sorted = False
+            if len(self._values) > self.exact_limit:
+                self._to_buckets()
+        else:
+            self._count_buckets(values)
+
+    def _update_moments(self, count: int, mean: float, m2: float):
+        # Parallel variance algorithm of Chan et al.
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def _count_buckets(self, values: np.ndarray):
+        magnitude = np.abs(values)
+        small = magnitude < QuantileSketch.MIN_VALUE
+        self._zero += int(np.count_nonzero(small))
+        stores = [
+            (self._positive, ~small & (values > 0)),
+            (self._negative, ~small & (values < 0)),
+        ]
+        for store, mask in stores:
+            if not np.any(mask):
+                continue
+            indices = np.ceil(np.log(magnitude[mask]) / self._log_gamma).astype(np.int64)
+            for idx, n in zip(*np.unique(indices, return_counts=True)):
+                store[int(idx)] = store.get(int(idx), 0) + int(n)
+
+    def _to_buckets(self):
+        values = np.array(self._values if self._values is not None else [])
+        self._values = None
+        self._count_buckets(values)
+
+    def _bucket_value(self, idx: int) -> float:
+        gamma = math.exp(self._log_gamma)
+        return 2 * gamma**idx / (gamma + 1)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches with accuracy {self.alpha} and {other.alpha}")
+        if other.count == 0:
+            return
+        self._update_moments(other.count, other.mean, other._m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self._values is not None and other._values is not None:
+            self._values.extend(other._values)
+            self._sorted = False
+            if len(self._values) > self.exact_limit:
+                self._to_buckets()
+            return
+        if self._values is not None:
+            self._to_buckets()
+        if other._values is not None:
+            self._count_buckets(np.array(other._values))
+        else:
+            self._zero += other._zero
+            stores = [(self._positive, other._positive), (self._negative, other._negative)]
+            for store, other_store in stores:
+                for idx, n in other_store.items():
+                    store[idx] = store.get(idx, 0) + n
+
+    def value_at_rank(self, rank: int) -> float:
+        """Value at the given position of the sorted sample, counted from 0."""
+        if not 0 <= rank < self.count:
+            raise IndexError(f"Rank {rank} outside of a sample of {self.count} values")
+        if self._values is not None:
+            if not self._sorted:
+                self._values.sort()
+                self._sorted = True
+            return self._values[rank]
+        # Negative values in ascending order, then zeros and positive values.
+        for idx in sorted(self._negative.keys(), reverse=True):
+            rank -= self._negative[idx]
+            if rank < 0:
+                return max(-self._bucket_value(idx), self.min)
+        rank -= self._zero
+        if rank < 0:
+            return 0.0
+        for idx in sorted(self._positive.keys()):
+            rank -= self._positive[idx]
+            if rank < 0:
+                return min(self._bucket_value(idx), self.max)
+        return self.max
+
+    def percentile(self, p: float) -> float:
+        if self.count == 0:
+            return math.nan
+        if self._values is not None:
+            return float(np.percentile(self._values, p))
+        return self.value_at_rank(round(p / 100 * (self.count - 1)))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count > 0 else math.nan
+
+    def serialize(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "exact_limit": self.exact_limit,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self._m2,
+            # Bounds of an empty sketch are infinite, which is not valid JSON
+            "min": self.min if self.count > 0 else None,
+            "max": self.max if self.count > 0 else None,
+            "values": self._values,
+            "zero": self._zero,
+            "positive": self._positive,
+            "negative": self._negative,
+        }
+
+    @staticmethod
+    def deserialize(cached: dict) -> "QuantileSketch":
+        ret = QuantileSketch(cached["alpha"], cached["exact_limit"])
+        ret.count = cached["count"]
+        ret.mean = cached["mean"]
+        ret._m2 = cached["m2"]
+        if cached["count"] > 0:
+            ret.min = cached["min"]
+            ret.max = cached["max"]
+        ret._values = cached["values"]
+        ret._sorted = False
+        ret._zero = cached["zero"]
+        # JSON keys are strings
+        ret._positive = {int(idx): n for idx, n in cached["positive"].items()}
+        ret._negative = {int(idx): n for idx, n in cached["negative"].items()}
+        return ret
+
+
+def sketch_stats(sketch: QuantileSketch) -> BasicStats:
+    """basic_stats of the values counted in a sketch."""
+    cv = sketch.std / sketch.mean * 100
+    return BasicStats(sketch.mean, sketch.percentile(50), sketch.std, cv)
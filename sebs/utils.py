@@ -6,8 +6,14 @@ import subprocess
 import uuid
 import click
 import datetime
+import enum
 
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
 
 PROJECT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
 DOCKER_DIR = os.path.join(PROJECT_DIR, "dockerfiles")
@@ -18,24 +24,71 @@ def project_absolute_path(*paths: str):
     return os.path.join(PROJECT_DIR, *paths)
 
 
+def _encode_datetime(o: datetime.datetime):
+    return str(o)
+
+
+def _encode_enum(o: enum.Enum):
+    return o.value
+
+
+def _encode_sequence(o):
+    return list(o)
+
+
+def _encode_numpy(o):
+    return o.tolist()
+
+
+# Encoders of types without a serialize method, checked in order.
+JSON_ENCODERS: List[Tuple[type, Callable[[Any], Any]]] = [
+    (datetime.datetime, _encode_datetime),
+    (enum.Enum, _encode_enum),
+    (set, _encode_sequence),
+    (frozenset, _encode_sequence),
+]
+
+
+def _json_encoder(o):
+    if hasattr(o, "serialize"):
+        return o.serialize()
+    for cls, encoder in JSON_ENCODERS:
+        if isinstance(o, cls):
+            return encoder(o)
+    # Numbers and arrays of numpy, without importing it
+    if type(o).__module__ == "numpy":
+        return _encode_numpy(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
 class JSONSerializer(json.JSONEncoder):
     def default(self, o):
-        if hasattr(o, "serialize"):
-            return o.serialize()
-        elif isinstance(o, dict):
-            return str(o)
-        else:
-            try:
-                return vars(o)
-            except TypeError:
-                return str(o)
+        return _json_encoder(o)
+
+
+if orjson is not None:
+    # Datetimes are passed to the encoder to keep the format of the json module.
+    _ORJSON_OPTIONS = (
+        orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
 
+def serialize(obj, pretty: bool = False) -> str:
+    """
+    JSON of the object, e.g., of a result or a cache entry.
 
-def serialize(obj) -> str:
+    Output is compact and written with orjson when it is installed.
+    Pretty output is indented and has sorted keys, for files read by users.
+    orjson writes NaN and infinity as null, the json module as NaN and Infinity.
+    """
     if hasattr(obj, "serialize"):
-        return json.dumps(obj.serialize(), sort_keys=True, indent=2)
+        obj = obj.serialize()
+    if pretty:
+        return json.dumps(obj, default=_json_encoder, sort_keys=True, indent=2)
+    elif orjson is not None:
+        return orjson.dumps(obj, default=_json_encoder, option=_ORJSON_OPTIONS).decode()
     else:
-        return json.dumps(obj, cls=JSONSerializer, sort_keys=True, indent=2)
+        return json.dumps(obj, default=_json_encoder, separators=(",", ":"))
 
 
 # Executing with shell provides options such as wildcard expansion
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+from sebs.benchmark import Benchmark
+from sebs.dependency_cache import DependencyCache
+from sebs.faas.function import Language
+
+"""
+    Installed dependencies shared by builds with the same requirements.
+"""
+
+
+def _write(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _read(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+class DependencyCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DependencyCache(os.path.join(self.tmp.name, "cache"))
+        self.benchmark_path = os.path.join(self.tmp.name, "benchmark")
+        self.output_dir = os.path.join(self.tmp.name, "build")
+        _write(os.path.join(self.benchmark_path, "python", "function.py"), "def handler(): pass")
+        _write(os.path.join(self.output_dir, "function.py"), "def handler(): pass")
+        _write(os.path.join(self.output_dir, "requirements.txt"), "jinja2")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _key(self, image_id: str = "image") -> str:
+        # Only the attributes used by the key, without a cache client and Docker
+        benchmark = Benchmark.__new__(Benchmark)
+        benchmark._benchmark_path = self.benchmark_path
+        benchmark._deployment_name = "aws"
+        benchmark._language = Language.PYTHON
+        benchmark._language_version = "3.8"
+        return benchmark.dependencies_key(self.output_dir, image_id)
+
+    def test_key_sources(self):
+        key = self._key()
+        self.assertEqual(self._key(), key)
+        # Sources are not a part of the key without a package script
+        _write(os.path.join(self.output_dir, "function.py"), "def handler(): return 1")
+        _write(os.path.join(self.output_dir, "templates", "index.html"), "<html>")
+        self.assertEqual(self._key(), key)
+        # Requirements and the build image are
+        self.assertNotEqual(self._key("other-image"), key)
+        _write(os.path.join(self.output_dir, "requirements.txt.3.8"), "numpy")
+        with_version = self._key()
+        self.assertNotEqual(with_version, key)
+        _write(os.path.join(self.output_dir, "requirements.txt"), "jinja2==3.0")
+        self.assertNotEqual(self._key(), with_version)
+
+    def test_key_package_script(self):
+        key = self._key()
+        _write(os.path.join(self.benchmark_path, "python", "package.sh"), "echo")
+        with_script = self._key()
+        self.assertNotEqual(with_script, key)
+        self.assertEqual(self._key(), with_script)
+        # The package script runs on the sources, so they are a part of the key
+        _write(os.path.join(self.output_dir, "function.py"), "def handler(): return 1")
+        edited = self._key()
+        self.assertNotEqual(edited, with_script)
+        _write(os.path.join(self.output_dir, "templates", "index.html"), "<html>")
+        self.assertNotEqual(self._key(), edited)
+        _write(os.path.join(self.benchmark_path, "python", "package.sh"), "echo changed")
+        self.assertNotEqual(self._key(), edited)
+
+    def test_key(self):
+        first = os.path.join(self.tmp.name, "a", "requirements.txt")
+        second = os.path.join(self.tmp.name, "b", "requirements.txt")
+        _write(first, "jinja2")
+        _write(second, "jinja2")
+        missing = os.path.join(self.tmp.name, "missing.txt")
+        key = DependencyCache.key([first], "aws", "python")
+        # Files are named by their basename, missing ones are skipped
+        self.assertEqual(DependencyCache.key([second, missing], "aws", "python"), key)
+        self.assertNotEqual(DependencyCache.key([first], "aws", "nodejs"), key)
+        self.assertNotEqual(DependencyCache.key([first], "awspython"), key)
+        # And by the path relative to the root
+        self.assertNotEqual(
+            DependencyCache.key([first], "aws", "python", root=self.tmp.name),
+            DependencyCache.key([second], "aws", "python", root=self.tmp.name),
+        )
+
+    def test_put_get(self):
+        packages = os.path.join(self.output_dir, ".python_packages", "lib", "jinja2.py")
+        _write(packages, "jinja2")
+        archive = os.path.join(self.output_dir, "archive.zip")
+        _write(archive, "zip")
+        os.symlink("archive.zip", os.path.join(self.output_dir, "latest.zip"))
+        files = [".python_packages", "archive.zip", "latest.zip"]
+        key = self._key()
+        self.assertIsNone(self.cache.get(key, self.output_dir))
+        self.cache.put(key, self.output_dir, files)
+        self.assertTrue(os.path.isdir(self.cache.path(key)))
+        self.assertEqual(sorted(os.listdir(self.cache.path(key))), files)
+
+        # Later build steps modify the build directory in place
+        _write(packages, "modified")
+        _write(archive, "modified")
+        self.assertEqual(
+            _read(os.path.join(self.cache.path(key), ".python_packages", "lib", "jinja2.py")),
+            "jinja2",
+        )
+
+        target = os.path.join(self.tmp.name, "other_build")
+        os.makedirs(target)
+        _write(os.path.join(target, "archive.zip"), "stale")
+        self.assertEqual(self.cache.get(key, target), files)
+        self.assertEqual(
+            _read(os.path.join(target, ".python_packages", "lib", "jinja2.py")), "jinja2"
+        )
+        self.assertEqual(_read(os.path.join(target, "archive.zip")), "zip")
+        self.assertEqual(os.readlink(os.path.join(target, "latest.zip")), "archive.zip")
+        # Files are copied out of the entry, not linked to it
+        _write(os.path.join(target, ".python_packages", "lib", "jinja2.py"), "modified")
+        _write(os.path.join(target, "archive.zip"), "modified")
+        entry = self.cache.path(key)
+        self.assertEqual(
+            _read(os.path.join(entry, ".python_packages", "lib", "jinja2.py")), "jinja2"
+        )
+        self.assertEqual(_read(os.path.join(entry, "archive.zip")), "zip")
+        # A directory is replaced, not merged
+        _write(os.path.join(target, ".python_packages", "lib", "stale.py"), "stale")
+        self.cache.get(key, target)
+        self.assertEqual(os.listdir(os.path.join(target, ".python_packages", "lib")), ["jinja2.py"])
+
+    def test_put_existing(self):
+        _write(os.path.join(self.output_dir, "archive.zip"), "first")
+        self.cache.put("key", self.output_dir, ["archive.zip"])
+        _write(os.path.join(self.output_dir, "archive.zip"), "second")
+        self.cache.put("key", self.output_dir, ["archive.zip"])
+        self.assertEqual(_read(os.path.join(self.cache.path("key"), "archive.zip")), "first")
+        # No temporary entries are left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path("key"))), ["key"])
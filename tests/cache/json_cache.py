@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from sebs.cache import Cache
+
+from .sqlite_cache import code_package, function
+
+"""
+    Cache of benchmark configs in JSON files, shared by several clients.
+"""
+
+
+class JSONCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        os.makedirs(self.cache_dir)
+        Cache.cached_config.clear()
+        self.first = Cache(self.cache_dir)
+        self.second = Cache(self.cache_dir)
+
+    def tearDown(self):
+        Cache.cached_config.clear()
+        self.tmp.cleanup()
+
+    def test_interleaved_updates(self):
+        python = code_package(self.tmp.name)
+        nodejs = code_package(self.tmp.name, language="nodejs")
+        self.first.add_code_package("openwhisk", "python", python)
+        self.second.add_code_package("openwhisk", "nodejs", nodejs)
+        self.first.add_function("openwhisk", "python", python, function("first"))
+        self.second.add_function("openwhisk", "python", python, function("second"))
+        self.first.add_function("openwhisk", "nodejs", nodejs, function("first"))
+        self.second.update_function(function("first", code_hash="updated"))
+        self.first.update_function(function("second", code_hash="updated"))
+
+        for cache in [self.first, self.second, Cache(self.cache_dir)]:
+            self.assertIsNotNone(
+                cache.get_code_package("openwhisk", "110.dynamic-html", "python", "3.7")
+            )
+            self.assertIsNotNone(
+                cache.get_code_package("openwhisk", "110.dynamic-html", "nodejs", "3.7")
+            )
+            self.assertEqual(
+                cache.get_functions("openwhisk", "110.dynamic-html", "python"),
+                {
+                    "first": {"name": "first", "hash": "updated"},
+                    "second": {"name": "second", "hash": "updated"},
+                },
+            )
+            self.assertEqual(
+                cache.get_functions("openwhisk", "110.dynamic-html", "nodejs"),
+                {"first": {"name": "first", "hash": "updated"}},
+            )
+
+    def test_batch(self):
+        python = code_package(self.tmp.name)
+        self.first.add_code_package("openwhisk", "python", python)
+        with self.first.batch():
+            self.first.add_function("openwhisk", "python", python, function("fn"))
+            with self.first.batch():
+                self.first.update_storage("openwhisk", "110.dynamic-html", {"buckets": []})
+            # Visible in the cache making the updates, but not written yet
+            self.assertIn("fn", self.first.get_functions("openwhisk", "110.dynamic-html", "python"))
+            self.assertEqual(
+                self.second.get_functions("openwhisk", "110.dynamic-html", "python"), {}
+            )
+            self.assertIsNone(self.second.get_storage_config("openwhisk", "110.dynamic-html"))
+            # Updates of another process during the batch are kept
+            self.second.add_function("openwhisk", "python", python, function("other"))
+        self.assertEqual(
+            set(self.second.get_functions("openwhisk", "110.dynamic-html", "python")),
+            {"fn", "other"},
+        )
+        self.assertEqual(
+            self.second.get_storage_config("openwhisk", "110.dynamic-html"), {"buckets": []}
+        )
+        self.assertEqual(
+            set(self.first.get_functions("openwhisk", "110.dynamic-html", "python")),
+            {"fn", "other"},
+        )
+
+    def test_uncached_benchmark(self):
+        self.assertIsNone(self.first.get_benchmark_config("openwhisk", "110.dynamic-html"))
+        with self.assertRaises(RuntimeError):
+            self.first.update_function(function("fn"))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "110.dynamic-html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
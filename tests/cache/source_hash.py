@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from sebs import source_hash
+from sebs.benchmark import Benchmark
+from sebs.source_hash import RECENT_CHANGE, SourceHashes, file_digest
+
+"""
+    Hashes of benchmark sources, with digests of unchanged files memorized.
+"""
+
+
+def _write(path: str, content: str, mtime_ns: int):
+    with open(path, "w") as f:
+        f.write(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class SourceHashTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        # Old enough to be memorized
+        self.old = time.time_ns() - 10 * RECENT_CHANGE
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _benchmark(self, name: str, files: dict) -> str:
+        directory = os.path.join(self.tmp.name, name)
+        os.makedirs(directory)
+        for file_name, content in files.items():
+            _write(os.path.join(directory, file_name), content, self.old)
+        return directory
+
+    def test_hash_directory(self):
+        files = {
+            "function.py": "def handler(event): pass",
+            "requirements.txt": "jinja2",
+            "config.json": "{}",
+            "package.sh": "echo",
+            "ignored.txt": "not a source",
+        }
+        first = self._benchmark("first", files)
+        # The same files created in the reverse order
+        second = self._benchmark("second", dict(reversed(list(files.items()))))
+        memo = SourceHashes(self.cache_dir)
+        for algorithm in ("md5", "blake2b"):
+            expected = Benchmark.hash_directory(first, "aws", "python", algorithm=algorithm)
+            self.assertEqual(
+                Benchmark.hash_directory(first, "aws", "python", algorithm=algorithm), expected
+            )
+            self.assertEqual(
+                Benchmark.hash_directory(second, "aws", "python", algorithm=algorithm), expected
+            )
+            # The memo does not change the hash
+            self.assertEqual(
+                Benchmark.hash_directory(first, "aws", "python", memo, algorithm), expected
+            )
+            self.assertEqual(
+                Benchmark.hash_directory(second, "aws", "python", memo, algorithm), expected
+            )
+
+        md5 = Benchmark.hash_directory(first, "aws", "python")
+        _write(os.path.join(first, "ignored.txt"), "changed", self.old)
+        self.assertEqual(Benchmark.hash_directory(first, "aws", "python"), md5)
+        _write(os.path.join(first, "requirements.txt"), "jinja2==3.0", self.old)
+        self.assertNotEqual(Benchmark.hash_directory(first, "aws", "python"), md5)
+        # Contents moved between files
+        third = self._benchmark("third", {**files, "function.py": "echo", "package.sh": ""})
+        fourth = self._benchmark("fourth", {**files, "function.py": "", "package.sh": "echo"})
+        self.assertNotEqual(
+            Benchmark.hash_directory(third, "aws", "python"),
+            Benchmark.hash_directory(fourth, "aws", "python"),
+        )
+
+    def test_memo_reused(self):
+        path = os.path.join(self.tmp.name, "function.py")
+        _write(path, "first", self.old)
+        memo = SourceHashes(self.cache_dir)
+        digest = memo.digest(path, "md5")
+        self.assertEqual(digest, file_digest(path, "md5"))
+
+        with mock.patch.object(source_hash, "file_digest") as digest_mock:
+            self.assertEqual(memo.digest(path, "md5"), digest)
+            digest_mock.assert_not_called()
+        # Unchanged size and modification time are trusted, the file is not read again
+        _write(path, "other", self.old)
+        self.assertEqual(memo.digest(path, "md5"), digest)
+        # Another algorithm is not served from the memo
+        self.assertEqual(memo.digest(path, "blake2b"), file_digest(path, "blake2b"))
+
+        memo.save()
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, source_hash.MEMO_FILE)))
+        loaded = SourceHashes(self.cache_dir)
+        with mock.patch.object(source_hash, "file_digest") as digest_mock:
+            self.assertEqual(loaded.digest(path, "blake2b"), file_digest(path, "blake2b"))
+            digest_mock.assert_not_called()
+
+        # A change of the modification time invalidates the digest
+        _write(path, "other", self.old + 1)
+        self.assertEqual(loaded.digest(path, "md5"), file_digest(path, "md5"))
+        self.assertNotEqual(loaded.digest(path, "md5"), digest)
+
+    def test_recent_change(self):
+        path = os.path.join(self.tmp.name, "function.py")
+        recent = time.time_ns()
+        _write(path, "first", recent)
+        memo = SourceHashes(self.cache_dir)
+        self.assertEqual(memo.digest(path, "md5"), file_digest(path, "md5"))
+        # Changed within the timestamp resolution, with the same size and modification time
+        _write(path, "other", recent)
+        self.assertEqual(memo.digest(path, "md5"), file_digest(path, "md5"))
+        # Nothing was memorized, so nothing is written
+        memo.save()
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, source_hash.MEMO_FILE)))
+
+    def test_invalid_memo(self):
+        os.makedirs(self.cache_dir)
+        with open(os.path.join(self.cache_dir, source_hash.MEMO_FILE), "w") as f:
+            f.write("{not json")
+        path = os.path.join(self.tmp.name, "function.py")
+        _write(path, "first", self.old)
+        memo = SourceHashes(self.cache_dir)
+        self.assertEqual(memo.digest(path, "md5"), file_digest(path, "md5"))
+        memo.save()
+        self.assertEqual(SourceHashes(self.cache_dir).digest(path, "md5"), file_digest(path, "md5"))
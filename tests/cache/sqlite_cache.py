@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sebs.cache import Cache
+from sebs.sqlite_cache import SQLiteCache
+
+"""
+    Cache stored in an SQLite database, shared by several clients.
+"""
+
+
+def code_package(tmp_dir: str, benchmark: str = "110.dynamic-html", language: str = "python"):
+    package = mock.Mock()
+    package.benchmark = benchmark
+    package.language_name = language
+    package.language_version = "3.7"
+    package.code_location = os.path.join(tmp_dir, "code.zip")
+    package.hash = "package-hash"
+    package.serialize.return_value = {"size": 1, "hash": package.hash}
+    if not os.path.exists(package.code_location):
+        with open(package.code_location, "w") as f:
+            f.write("code")
+    return package
+
+
+def function(name: str, benchmark: str = "110.dynamic-html", code_hash: str = "hash"):
+    func = mock.Mock()
+    func.name = name
+    func.benchmark = benchmark
+    func.serialize.return_value = {"name": name, "hash": code_hash}
+    return func
+
+
+class SQLiteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        # Cloud configs are shared by all caches of the process
+        Cache.cached_config.clear()
+
+    def tearDown(self):
+        Cache.cached_config.clear()
+        self.tmp.cleanup()
+
+    def test_migration(self):
+        benchmark_dir = os.path.join(self.cache_dir, "110.dynamic-html")
+        os.makedirs(benchmark_dir)
+        config = {
+            "openwhisk": {
+                "python": {
+                    "code_package": {"3.7": {"hash": "package-hash", "location": "code.zip"}},
+                    "functions": {"fn": {"name": "fn", "hash": "fn-hash"}},
+                },
+                "storage": {"buckets": ["input"]},
+            }
+        }
+        with open(os.path.join(benchmark_dir, "config.json"), "w") as f:
+            json.dump(config, f)
+        with open(os.path.join(self.cache_dir, "openwhisk.json"), "w") as f:
+            json.dump({"resources": {"registry": "local"}}, f)
+
+        cache = SQLiteCache(self.cache_dir)
+        self.assertEqual(
+            cache.get_code_package("openwhisk", "110.dynamic-html", "python", "3.7"),
+            {"hash": "package-hash", "location": "code.zip"},
+        )
+        self.assertEqual(
+            cache.get_functions("openwhisk", "110.dynamic-html", "python"),
+            {"fn": {"name": "fn", "hash": "fn-hash"}},
+        )
+        self.assertEqual(
+            cache.get_storage_config("openwhisk", "110.dynamic-html"), {"buckets": ["input"]}
+        )
+        self.assertEqual(cache.get_config("openwhisk"), {"resources": {"registry": "local"}})
+        self.assertEqual(
+            cache.get_benchmark_config("openwhisk", "110.dynamic-html"), config["openwhisk"]
+        )
+
+    def test_shared_database(self):
+        first = SQLiteCache(self.cache_dir)
+        second = SQLiteCache(self.cache_dir)
+        first.add_code_package("openwhisk", "python", code_package(self.tmp.name))
+        first.add_function("openwhisk", "python", code_package(self.tmp.name), function("fn"))
+
+        second.update_function(function("fn", code_hash="updated"))
+        self.assertEqual(
+            first.get_functions("openwhisk", "110.dynamic-html", "python"),
+            {"fn": {"name": "fn", "hash": "updated"}},
+        )
+
+    def test_update_function_locations(self):
+        cache = SQLiteCache(self.cache_dir)
+        for deployment, language in [("openwhisk", "python"), ("local", "nodejs")]:
+            package = code_package(self.tmp.name, language=language)
+            cache.add_code_package(deployment, language, package)
+            cache.add_function(deployment, language, package, function("fn"))
+        # A function of the same name in another benchmark
+        other = code_package(self.tmp.name, benchmark="120.uploader")
+        cache.add_code_package("openwhisk", "python", other)
+        cache.add_function("openwhisk", "python", other, function("fn", "120.uploader"))
+
+        cache.update_function(function("fn", code_hash="updated"))
+        for deployment, language in [("openwhisk", "python"), ("local", "nodejs")]:
+            functions = cache.get_functions(deployment, "110.dynamic-html", language)
+            self.assertEqual(functions["fn"]["hash"], "updated")
+        functions = cache.get_functions("openwhisk", "120.uploader", "python")
+        self.assertEqual(functions["fn"]["hash"], "hash")
+
+    def test_get_functions(self):
+        cache = SQLiteCache(self.cache_dir)
+        # Benchmark not cached
+        self.assertIsNone(cache.get_functions("openwhisk", "110.dynamic-html", "python"))
+        # Code package without functions
+        cache.add_code_package("openwhisk", "python", code_package(self.tmp.name))
+        self.assertEqual(cache.get_functions("openwhisk", "110.dynamic-html", "python"), {})
+        self.assertIsNone(cache.get_functions("openwhisk", "110.dynamic-html", "nodejs"))
+        self.assertIsNone(cache.get_functions("aws", "110.dynamic-html", "python"))
+        cache.ignore_functions = True
+        self.assertIsNone(cache.get_functions("openwhisk", "110.dynamic-html", "python"))
+
+    def test_function_without_code_package(self):
+        cache = SQLiteCache(self.cache_dir)
+        with self.assertRaises(RuntimeError):
+            cache.add_function("openwhisk", "python", code_package(self.tmp.name), function("fn"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+
+from .dependency_cache import DependencyCacheTest
+from .json_cache import JSONCacheTest
+from .source_hash import SourceHashTest
+from .sqlite_cache import SQLiteCacheTest
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(DependencyCacheTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(JSONCacheTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(SQLiteCacheTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(SourceHashTest))
+    return suite
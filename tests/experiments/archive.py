@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sebs.experiments import archive
+from sebs.experiments.archive import ArchiveWriter, ResultArchive, read_result
+
+"""
+    Compressed result archives, read back by benchmark and function.
+"""
+
+
+def _result(n: int) -> dict:
+    return {
+        "begin_time": 1.0,
+        "end_time": 2.0,
+        "_invocations": {
+            "fn": {f"id-{i}": {"request_id": f"id-{i}", "times": {"client": i}} for i in range(n)},
+            "empty": {},
+        },
+    }
+
+
+class ResultArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "results.sebsz")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _roundtrip(self, compression: str):
+        result = _result(25)
+        with mock.patch.object(archive, "BLOCK_INVOCATIONS", 10):
+            with ArchiveWriter(self.path, compression) as writer:
+                writer.add_result("110.dynamic-html", result)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        with ResultArchive(self.path) as reader:
+            self.assertEqual(reader.compression, compression)
+            self.assertEqual(reader.benchmarks(), ["110.dynamic-html"])
+            self.assertEqual(sorted(reader.functions("110.dynamic-html")), ["empty", "fn"])
+            self.assertEqual(reader.count("110.dynamic-html", "fn"), 25)
+            self.assertEqual(len(reader._index["110.dynamic-html"]["functions"]["fn"]), 3)
+            self.assertEqual(reader.result("110.dynamic-html"), result)
+        self.assertEqual(read_result(self.path), result)
+
+    @unittest.skipIf(archive.zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        self.assertEqual(archive.default_compression(), "zstd")
+        self._roundtrip("zstd")
+
+    def test_zlib(self):
+        self._roundtrip("zlib")
+
+    def test_without_zstandard(self):
+        with mock.patch.object(archive, "zstandard", None):
+            self.assertEqual(archive.default_compression(), "zlib")
+            with ArchiveWriter(self.path) as writer:
+                writer.add_result("110.dynamic-html", _result(3))
+            self.assertEqual(read_result(self.path), _result(3))
+            with self.assertRaises(RuntimeError):
+                ArchiveWriter(self.path, "zstd")
+
+    def test_corrupt_trailer(self):
+        with ArchiveWriter(self.path, "zlib") as writer:
+            writer.add_result("110.dynamic-html", _result(3))
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with self.assertRaises(ValueError):
+            ResultArchive(self.path)
+
+    def test_failed_write(self):
+        with self.assertRaises(KeyError):
+            with ArchiveWriter(self.path, "zlib") as writer:
+                writer.add_result("110.dynamic-html", _result(3))
+                raise KeyError()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_multiple_benchmarks(self):
+        with ArchiveWriter(self.path, "zlib") as writer:
+            writer.add_result("110.dynamic-html", _result(3))
+            writer.add_result("120.uploader", _result(5))
+        with self.assertRaises(ValueError):
+            read_result(self.path)
+        self.assertEqual(read_result(self.path, "120.uploader"), _result(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import unittest
+
+import numpy as np
+
+from sebs.statistics import QuantileSketch, ci_le_boudec
+from sebs.utils import serialize
+
+"""
+    Mergeable quantile sketches of latencies.
+"""
+
+PERCENTILES = [0, 1, 25, 50, 90, 99, 99.9, 100]
+
+
+def _sample(n: int, seed: int = 0) -> np.ndarray:
+    # Latencies in milliseconds spanning several orders of magnitude
+    return np.random.default_rng(seed).lognormal(mean=3, sigma=1.5, size=n)
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def assertWithinAlpha(self, sketch: QuantileSketch, values: np.ndarray):
+        ordered = np.sort(values)
+        for rank in range(0, len(ordered), max(len(ordered) // 200, 1)):
+            expected = ordered[rank]
+            self.assertLessEqual(
+                abs(sketch.value_at_rank(rank) - expected),
+                sketch.alpha * abs(expected) + 1e-12,
+                f"rank {rank}",
+            )
+
+    def test_exact(self):
+        values = _sample(999)
+        sketch = QuantileSketch()
+        sketch.add_many(values[:500])
+        for value in values[500:]:
+            sketch.add(value)
+        self.assertTrue(sketch.exact)
+        for p in PERCENTILES:
+            self.assertEqual(sketch.percentile(p), np.percentile(values, p))
+        self.assertAlmostEqual(sketch.mean, np.mean(values))
+        self.assertAlmostEqual(sketch.std, np.std(values))
+
+    def test_buckets(self):
+        values = np.concatenate([_sample(20_000), -_sample(1_000, seed=1), np.zeros(10)])
+        sketch = QuantileSketch(alpha=0.02, exact_limit=100)
+        sketch.add_many(values)
+        self.assertFalse(sketch.exact)
+        self.assertWithinAlpha(sketch, values)
+        for p in PERCENTILES:
+            expected = np.sort(values)[round(p / 100 * (len(values) - 1))]
+            self.assertLessEqual(abs(sketch.percentile(p) - expected), 0.02 * abs(expected))
+        self.assertEqual(sketch.min, np.min(values))
+        self.assertEqual(sketch.max, np.max(values))
+        self.assertAlmostEqual(sketch.mean, np.mean(values))
+        self.assertAlmostEqual(sketch.std, np.std(values))
+
+    def test_merge(self):
+        parts = [_sample(50, seed=1), _sample(5_000, seed=2), _sample(700, seed=3)]
+        values = np.concatenate(parts)
+        sketches = []
+        for part in parts:
+            sketch = QuantileSketch(exact_limit=1000)
+            sketch.add_many(part)
+            sketches.append(sketch)
+        self.assertEqual([s.exact for s in sketches], [True, False, True])
+
+        # Exact into exact stays exact below the limit
+        merged = QuantileSketch(exact_limit=1000)
+        merged.merge(sketches[0])
+        merged.merge(sketches[2])
+        self.assertTrue(merged.exact)
+        self.assertEqual(merged.percentile(50), np.percentile(np.concatenate(parts[::2]), 50))
+        # Buckets into exact and exact into buckets
+        merged.merge(sketches[1])
+        self.assertFalse(merged.exact)
+        self.assertEqual(merged.count, len(values))
+        self.assertWithinAlpha(merged, values)
+        self.assertAlmostEqual(merged.mean, np.mean(values))
+        self.assertAlmostEqual(merged.std, np.std(values))
+        reverse = QuantileSketch()
+        for sketch in reversed(sketches):
+            reverse.merge(sketch)
+        self.assertWithinAlpha(reverse, values)
+        # Merging an empty sketch changes nothing
+        merged.merge(QuantileSketch())
+        self.assertEqual(merged.count, len(values))
+        with self.assertRaises(ValueError):
+            merged.merge(QuantileSketch(alpha=0.05))
+
+    def test_serialize(self):
+        for n in [0, 10, 5_000]:
+            sketch = QuantileSketch()
+            sketch.add_many(_sample(n))
+            # As sent by workers of the load generator
+            copy = QuantileSketch.deserialize(json.loads(serialize(sketch)))
+            self.assertEqual(copy.exact, sketch.exact)
+            self.assertEqual(copy.count, sketch.count)
+            self.assertEqual(copy.min, sketch.min)
+            self.assertEqual(copy.max, sketch.max)
+            for p in PERCENTILES:
+                np.testing.assert_equal(copy.percentile(p), sketch.percentile(p))
+            copy.merge(sketch)
+            self.assertEqual(copy.count, 2 * n)
+
+    def test_ci_le_boudec(self):
+        values = _sample(400).tolist()
+        sketch = QuantileSketch()
+        sketch.add_many(values[:150])
+        rest = QuantileSketch()
+        rest.add_many(values[150:])
+        sketch.merge(rest)
+        for alpha in [0.95, 0.99]:
+            self.assertEqual(ci_le_boudec(alpha, values), ci_le_boudec(alpha, sketch))
+            low, high = ci_le_boudec(alpha, values)
+            self.assertLess(low, np.median(values))
+            self.assertGreater(high, np.median(values))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from sebs.experiments.records import (
+    INT_MISSING,
+    Categories,
+    InvocationRecords,
+    Strings,
+)
+from sebs.faas.function import ExecutionResult
+
+"""
+    Columnar invocation records and their .npz files.
+"""
+
+
+def _invocation(request_id: str, failure: bool = False) -> ExecutionResult:
+    ret = ExecutionResult()
+    ret.request_id = request_id
+    ret.stats.failure = failure
+    if failure:
+        ret.stats.failure_reason = "timeout"
+    else:
+        ret.stats.cold_start = True
+        ret.times.client_begin = 1_700_000_000_000_000_000
+        ret.times.client_end = 1_700_000_001_000_000_000
+        ret.times.scheduled = 1_699_999_999_000_000_000
+        ret.output = {"begin": "1.5", "end": "2.25", "is_cold": True, "request_id": request_id}
+    return ret
+
+
+def _invocations() -> dict:
+    return {
+        "fn": {
+            "failed-0": _invocation("", failure=True),
+            "a": _invocation("a"),
+            "ą-ünïcode": _invocation("ą-ünïcode"),
+        },
+        "other": {"c": _invocation("c"), "failed-3": _invocation("", failure=True)},
+    }
+
+
+class InvocationRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_strings(self):
+        values = ["", "a", "ą-ünïcode", "", "long" * 100]
+        strings = Strings.encode(values)
+        self.assertEqual(strings.decode().tolist(), values)
+        self.assertEqual(strings.empty().tolist(), [True, False, False, True, False])
+        mask = np.array([False, True, True, False, True])
+        self.assertEqual(strings[mask].decode().tolist(), ["a", "ą-ünïcode", "long" * 100])
+        joined = Strings.concat([strings, Strings.encode(["b"])])
+        self.assertEqual(joined.decode().tolist(), values + ["b"])
+
+    def test_categories(self):
+        values = ["fn", "other", "fn", ""]
+        categories = Categories.encode(values)
+        self.assertEqual(categories.vocabulary, ["fn", "other", ""])
+        self.assertEqual(categories.decode().tolist(), values)
+        self.assertEqual(categories.empty().tolist(), [False, False, False, True])
+        joined = Categories.concat([categories, Categories.encode(["new", "fn"])])
+        self.assertEqual(joined.decode().tolist(), values + ["new", "fn"])
+        self.assertEqual(joined.vocabulary, ["fn", "other", "", "new"])
+
+    def test_roundtrip(self):
+        path = os.path.join(self.tmp.name, "records.npz")
+        invocations = _invocations()
+        InvocationRecords.from_invocations(invocations, {"begin_time": 1.0}).save(path)
+        records = InvocationRecords.load(path)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records.metadata, {"begin_time": 1.0})
+        self.assertEqual(records.functions(), ["fn", "other"])
+        self.assertEqual(records["failure_reason"].tolist(), ["timeout", "", "", "", "timeout"])
+        self.assertEqual(records["scheduled"][0], INT_MISSING)
+        self.assertTrue(np.isnan(records["output_begin"][0]))
+
+        loaded = records.to_invocations()
+        # Keys of failed invocations are kept
+        self.assertEqual(
+            {func: list(func_invocations) for func, func_invocations in loaded.items()},
+            {func: list(func_invocations) for func, func_invocations in invocations.items()},
+        )
+        for func, func_invocations in invocations.items():
+            for key, invocation in func_invocations.items():
+                ret = loaded[func][key]
+                self.assertEqual(ret.request_id, invocation.request_id)
+                self.assertEqual(ret.stats.failure, invocation.stats.failure)
+                self.assertEqual(ret.times.serialize(), invocation.times.serialize())
+                self.assertEqual(ret.output, invocation.output)
+
+    def test_missing_column(self):
+        path = os.path.join(self.tmp.name, "records.npz")
+        InvocationRecords.from_invocations({"fn": {"a": _invocation("a")}}).save(path)
+        # Records written before warm-up invocations and keys were stored
+        with np.load(path) as data:
+            arrays = {
+                name: data[name]
+                for name in data.files
+                if name != "warmup" and not name.startswith("key__")
+            }
+        np.savez_compressed(path, **arrays)
+
+        old = InvocationRecords.load(path)
+        self.assertEqual(old["warmup"].tolist(), [False])
+        self.assertEqual(old["key"].tolist(), [""])
+        new = InvocationRecords.from_invocations({"fn": {"b": _invocation("b")}})
+        del old.columns["warmup"]
+        records = InvocationRecords.concat([old, new])
+        self.assertEqual(records["warmup"].tolist(), [False, False])
+        self.assertEqual(records["request_id"].tolist(), ["a", "b"])
+        self.assertEqual(list(records.to_invocations()["fn"]), ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
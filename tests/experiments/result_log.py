@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sebs.experiments.result import Result
+from sebs.experiments.result_log import ResultLog
+from sebs.faas.function import ExecutionResult
+
+"""
+    Logs of results written while an experiment runs.
+"""
+
+
+def _result() -> Result:
+    config = mock.Mock()
+    config.serialize.return_value = {}
+    return Result(config, config)
+
+
+def _function(name: str):
+    func = mock.Mock()
+    func.name = name
+    return func
+
+
+def _invocation(request_id: str) -> ExecutionResult:
+    ret = ExecutionResult()
+    ret.request_id = request_id
+    return ret
+
+
+class ResultLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "experiments.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dispatch_logged_before_collection(self):
+        func = _function("fn")
+        result = _result()
+        result.stream_to(self.path)
+        result.add_dispatch(func, "collected", 1, 2)
+        result.add_dispatch(func, "lost", 3, 5)
+        result.add_invocation(func, _invocation("collected"))
+        # Interrupted before the second activation was collected, the log is not closed
+        dispatches = list(ResultLog.read(self.path, "dispatch"))
+        self.assertEqual([record["id"] for record in dispatches], ["collected", "lost"])
+
+        resumed = _result()
+        resumed.stream_to(self.path, resume=True)
+        self.assertEqual(resumed.pending, {"fn": {"lost": {"scheduled": 3, "sent": 5}}})
+        resumed.add_invocation(func, _invocation("lost"))
+        self.assertEqual(resumed.pending, {"fn": {}})
+        resumed.close_log()
+        result.close_log()
+
+    def test_partial_record(self):
+        func = _function("fn")
+        result = _result()
+        result.stream_to(self.path)
+        result.add_dispatch(func, "first", 1, 2)
+        result.close_log()
+        with open(self.path, "a") as f:
+            f.write('{"type": "dispatch", "function": "fn", "id": "sec')
+
+        resumed = _result()
+        resumed.stream_to(self.path, resume=True)
+        resumed.add_dispatch(func, "second", 3, 4)
+        resumed.close_log()
+        self.assertEqual(
+            [record["id"] for record in ResultLog.read(self.path, "dispatch")], ["first", "second"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
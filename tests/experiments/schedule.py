@@ -0,0 +1,277 @@
+import json
+import os
+import tempfile
+import unittest
+from typing import List, Tuple
+from unittest import mock
+
+import numpy as np
+
+from sebs.experiments import schedule as schedule_module
+from sebs.experiments.schedule import ScheduleConfig, ScheduleSpec, write_columnar
+
+"""
+    Schedule transforms and the specification replayed by load generator workers.
+"""
+
+SECOND = 1_000_000_000
+
+
+def _config(functions: dict) -> dict:
+    return {
+        "functions": [
+            {"name": fn_name, "invocations": invocations}
+            for fn_name, invocations in functions.items()
+        ]
+    }
+
+
+def _items(schedule: ScheduleConfig) -> List[Tuple[int, str]]:
+    return [(so.timestamp, so.fn_name) for so in schedule]
+
+
+class ScheduleConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # 100 invocations per second of "a" and 50 of "b", over ten seconds
+        self.functions = {
+            "a": list(range(0, 10 * SECOND, SECOND // 100)),
+            "b": list(range(SECOND // 200, 10 * SECOND, SECOND // 50)),
+        }
+        self.schedule = ScheduleConfig.deserialize(_config(self.functions))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name: str, functions: dict) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            json.dump(_config(functions), f)
+        return path
+
+    def assertSorted(self, schedule: ScheduleConfig):
+        timestamps = [so.timestamp for so in schedule]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_warp(self):
+        faster = self.schedule.warp(2.0)
+        self.assertSorted(faster)
+        self.assertEqual(len(faster), len(self.schedule))
+        self.assertEqual(faster.duration, self.schedule.duration // 2)
+        self.assertAlmostEqual(faster.rps, 2 * self.schedule.rps, delta=1.0)
+        self.assertEqual(_items(faster), [(int(ts / 2.0), fn) for ts, fn in _items(self.schedule)])
+        with self.assertRaises(ValueError):
+            self.schedule.warp(0)
+
+    def test_window(self):
+        window = self.schedule.window(2 * SECOND, 4 * SECOND)
+        self.assertSorted(window)
+        self.assertEqual(window.duration, 2 * SECOND)
+        expected = [
+            (ts - 2 * SECOND, fn)
+            for ts, fn in _items(self.schedule)
+            if 2 * SECOND <= ts < 4 * SECOND
+        ]
+        self.assertEqual(_items(window), expected)
+        self.assertEqual(len(window), 300)
+
+        tail = self.schedule.window(9 * SECOND)
+        self.assertSorted(tail)
+        self.assertEqual(len(tail), 150)
+        with self.assertRaises(ValueError):
+            self.schedule.window(2 * SECOND, SECOND)
+
+    def test_scale_rate(self):
+        for target in (30.0, 150.0, 420.0):
+            scaled = self.schedule.scale_rate(target)
+            self.assertSorted(scaled)
+            self.assertAlmostEqual(scaled.rps, target, delta=1.0)
+            self.assertEqual(scaled.duration, self.schedule.duration)
+            # Arrivals are dropped or repeated, never moved
+            timestamps = {so.timestamp for so in self.schedule}
+            self.assertTrue(all(so.timestamp in timestamps for so in scaled))
+            # Both functions are scaled by the same ratio
+            counts = {"a": 0, "b": 0}
+            for so in scaled:
+                counts[so.fn_name] += 1
+            self.assertAlmostEqual(counts["a"] / counts["b"], 2.0, delta=0.05)
+
+        self.assertEqual(len(self.schedule.scale_rate(0)), 0)
+        with self.assertRaises(ValueError):
+            self.schedule.scale_rate(-1)
+
+    def test_merge(self):
+        other = ScheduleConfig.deserialize(_config({"c": [1, SECOND, 11 * SECOND], "a": [7]}))
+        merged = self.schedule.merge(other)
+        self.assertSorted(merged)
+        self.assertEqual(merged.fns, ["a", "b", "c"])
+        self.assertEqual(len(merged), len(self.schedule) + len(other))
+        self.assertEqual(merged.duration, 11 * SECOND)
+        self.assertEqual(sorted(_items(merged)), sorted(_items(self.schedule) + _items(other)))
+
+    def test_transforms_keep_original(self):
+        expected = _items(self.schedule)
+        self.schedule.warp(3.0).window(SECOND).scale_rate(10.0)
+        self.assertEqual(_items(self.schedule), expected)
+        self.assertEqual(len(self.schedule), 1500)
+
+    def test_shard(self):
+        shards = [self.schedule.shard(idx, 3) for idx in range(3)]
+        for shard in shards:
+            self.assertSorted(shard)
+            self.assertEqual(shard.duration, self.schedule.duration)
+        union = [item for shard in shards for item in _items(shard)]
+        self.assertEqual(sorted(union), sorted(_items(self.schedule)))
+
+    def test_shard_source(self):
+        path = self._write("schedule.json", self.functions)
+        for n in (1, 3, 4):
+            shards = [ScheduleConfig.load(path, (idx, n)) for idx in range(n)]
+            for shard in shards:
+                self.assertSorted(shard)
+                self.assertEqual(shard.duration, self.schedule.duration)
+                self.assertEqual(len(shard), len(_items(shard)))
+            union = [item for shard in shards for item in _items(shard)]
+            self.assertEqual(sorted(union), sorted(_items(self.schedule)))
+            # Round robin keeps the shards balanced across functions
+            lengths = [len(shard) for shard in shards]
+            self.assertLessEqual(max(lengths) - min(lengths), 1)
+
+    def test_spec_shard(self):
+        first = self._write("first.json", self.functions)
+        second = self._write("second.json", {"c": list(range(0, 12 * SECOND, SECOND // 10))})
+        spec = ScheduleSpec([first, second], window_begin=1.0, window_end=9.0, time_warp=2.0)
+        schedule = spec.load()
+        self.assertSorted(schedule)
+        self.assertEqual(schedule.duration, 4 * SECOND)
+        for paths in (spec, spec.columnar(self.tmp.name)):
+            shards = [paths.shard(idx, 4) for idx in range(4)]
+            for shard in shards:
+                self.assertSorted(shard)
+            union = [item for shard in shards for item in _items(shard)]
+            self.assertEqual(sorted(union), sorted(_items(schedule)))
+
+    def test_spec_shard_rate(self):
+        path = self._write("schedule.json", self.functions)
+        spec = ScheduleSpec([path], target_rps=60.0)
+        schedule = spec.load()
+        self.assertAlmostEqual(schedule.rps, 60.0, delta=1.0)
+        self.assertAlmostEqual(spec.source_rps, self.schedule.rps)
+        shards = [spec.shard(idx, 4) for idx in range(4)]
+        for shard in shards:
+            self.assertSorted(shard)
+        # Every shard carries its own remainder, at most one per function
+        total = sum(len(shard) for shard in shards)
+        self.assertLessEqual(abs(total - len(schedule)), 2 * len(shards))
+
+    def test_spec_roundtrip(self):
+        path = self._write("schedule.json", self.functions)
+        spec = ScheduleSpec([path], 1.5, 8.0, 0.5, 25.0)
+        spec.load()
+        copy = ScheduleSpec.deserialize(json.loads(json.dumps(spec.serialize())))
+        self.assertEqual(copy.serialize(), spec.serialize())
+        self.assertEqual(copy.source_rps, spec.source_rps)
+        self.assertEqual(_items(copy.load()), _items(spec.load()))
+
+        # Specifications written before the source rate was stored
+        config = spec.serialize()
+        del config["source_rps"]
+        self.assertIsNone(ScheduleSpec.deserialize(config).source_rps)
+
+        columnar = spec.columnar(self.tmp.name)
+        self.assertTrue(os.path.isdir(columnar.paths[0]))
+        self.assertEqual(columnar.source_rps, spec.source_rps)
+        self.assertEqual(_items(columnar.load()), _items(spec.load()))
+
+    def test_merge_streams(self):
+        functions = {
+            "a": [0, 5, 5, 10, 40],
+            "b": [5, 6, 30],
+            "c": [],
+            "d": [1, 2, 3, 100],
+        }
+        schedule = ScheduleConfig.deserialize(_config(functions))
+        self.assertEqual(schedule.fns, ["a", "b", "c", "d"])
+        self.assertEqual(schedule.unsorted, {})
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual(schedule.duration, 100)
+        expected = sorted(
+            ((ts, fn_name) for fn_name, invocations in functions.items() for ts in invocations),
+            key=lambda item: item[0],
+        )
+        # Ties keep the order of functions in the file
+        self.assertEqual(_items(schedule), expected)
+        # Every pass starts a new merge
+        self.assertEqual(_items(schedule), expected)
+
+    def test_merge_unsorted(self):
+        functions = {"a": [30, 10, 20, 0], "b": [15, 25]}
+        schedule = ScheduleConfig.deserialize(_config(functions))
+        self.assertEqual(schedule.unsorted, {"a": 2})
+        self.assertSorted(schedule)
+        self.assertEqual(
+            _items(schedule),
+            [(0, "a"), (10, "a"), (15, "b"), (20, "a"), (25, "b"), (30, "a")],
+        )
+        self.assertEqual(schedule.duration, 30)
+        # The input is not modified
+        self.assertEqual(functions["a"], [30, 10, 20, 0])
+
+        path = self._write("unsorted.json", functions)
+        self.assertEqual(ScheduleSpec([path]).load().unsorted, {"a": 2})
+        shards = [ScheduleConfig.load(path, (idx, 2)) for idx in range(2)]
+        union = [item for shard in shards for item in _items(shard)]
+        self.assertEqual(sorted(union), _items(schedule))
+
+    def test_columnar_roundtrip(self):
+        path = os.path.join(self.tmp.name, "columnar")
+        self.schedule.save_columnar(path)
+        loaded = ScheduleConfig.load(path)
+        self.assertEqual(loaded.fns, ["a", "b"])
+        self.assertEqual(loaded.unsorted, {})
+        self.assertEqual(len(loaded), len(self.schedule))
+        self.assertEqual(loaded.duration, self.schedule.duration)
+        self.assertEqual(_items(loaded), _items(self.schedule))
+
+        # Unsorted invocations are sorted when written
+        written = os.path.join(self.tmp.name, "written")
+        write_columnar(written, {"b": [40, 10], "a": [30, 20, 0]})
+        self.assertEqual(
+            _items(ScheduleConfig.load_columnar(written)),
+            [(0, "a"), (10, "b"), (20, "a"), (30, "a"), (40, "b")],
+        )
+
+        empty = os.path.join(self.tmp.name, "empty")
+        write_columnar(empty, {})
+        self.assertEqual(len(ScheduleConfig.load_columnar(empty)), 0)
+        self.assertEqual(ScheduleConfig.load_columnar(empty).duration, 0)
+
+    def test_columnar_chunks(self):
+        path = os.path.join(self.tmp.name, "columnar")
+        self.schedule.save_columnar(path)
+        # Chunks smaller than the schedule, also not aligned with the shards
+        with mock.patch.object(schedule_module, "CHUNK_SIZE", 7):
+            self.assertEqual(_items(ScheduleConfig.load_columnar(path)), _items(self.schedule))
+            shards = [ScheduleConfig.load_columnar(path, (idx, 3)) for idx in range(3)]
+            for idx, shard in enumerate(shards):
+                self.assertEqual(_items(shard), _items(self.schedule.shard(idx, 3)))
+                self.assertEqual(len(shard), len(_items(shard)))
+                self.assertEqual(shard.duration, self.schedule.duration)
+
+    def test_columnar_unsorted(self):
+        path = os.path.join(self.tmp.name, "columnar")
+        self.schedule.save_columnar(path)
+        timestamps = np.load(os.path.join(path, schedule_module.TIMESTAMPS_FILE))
+        functions = np.load(os.path.join(path, schedule_module.FUNCTIONS_FILE))
+        # Swap two arrivals of different functions, the later one is out of order
+        timestamps[[10, 11]] = timestamps[[11, 10]]
+        self.assertNotEqual(functions[10], functions[11])
+        np.save(os.path.join(path, schedule_module.TIMESTAMPS_FILE), timestamps)
+
+        with mock.patch.object(schedule_module, "CHUNK_SIZE", 11):
+            # The inversion crosses the boundary of the first chunk
+            with self.assertRaises(ValueError) as ctx:
+                ScheduleConfig.load_columnar(path)
+        self.assertIn(self.schedule.fns[functions[11]], str(ctx.exception))
+        with self.assertRaises(ValueError):
+            ScheduleSpec([path]).load()
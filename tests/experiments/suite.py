@@ -0,0 +1,17 @@
+import unittest
+
+from .archive import ResultArchiveTest
+from .quantile_sketch import QuantileSketchTest
+from .records import InvocationRecordsTest
+from .result_log import ResultLogTest
+from .schedule import ScheduleConfigTest
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ResultArchiveTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(QuantileSketchTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(InvocationRecordsTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ResultLogTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ScheduleConfigTest))
+    return suite
@@ -0,0 +1,130 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from sebs.faas.function import NonBlockingExecutionResult
+from sebs.openwhisk import triggers
+from sebs.openwhisk.client import OpenWhiskRESTClient
+from sebs.openwhisk.triggers import LibraryTrigger
+
+"""
+    Invocations through the REST API against a stub OpenWhisk controller.
+
+    Activations of the action "slow" exceed the blocking timeout of the
+    controller, and the record of the activation "lost" is never available.
+"""
+
+ACTIVATION = {
+    "activationId": "finished",
+    "start": 1_000,
+    "end": 1_500,
+    "annotations": [{"key": "waitTime", "value": 5}, {"key": "initTime", "value": 10}],
+    "response": {
+        "success": True,
+        "result": {"begin": "1.0", "end": "1.25", "is_cold": True, "result": {}},
+    },
+}
+
+
+class StubController(BaseHTTPRequestHandler):
+    # Remaining GET requests of each activation answered with 404
+    pending = {"queued": 2, "lost": -1}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        self.rfile.read(int(self.headers["Content-Length"]))
+        action = url.path.split("/")[-1]
+        blocking = parse_qs(url.query)["blocking"] == ["true"]
+        if action == "slow":
+            self._reply(202, {"activationId": "lost"})
+        elif blocking:
+            self._reply(200, ACTIVATION)
+        else:
+            self._reply(202, {"activationId": "queued"})
+
+    def do_GET(self):
+        activation_id = urlsplit(self.path).path.split("/")[-1]
+        remaining = self.pending.get(activation_id, 0)
+        if remaining != 0:
+            self.pending[activation_id] = remaining - 1
+            self._reply(404, {"error": "The requested resource does not exist."})
+        else:
+            self._reply(200, {**ACTIVATION, "activationId": activation_id})
+
+
+class OpenWhiskInvokeFunctionREST(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubController)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        host, port = self.server.server_address
+        self.client = OpenWhiskRESTClient(f"http://{host}:{port}", "user:key")
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_blocking(self):
+        ret = LibraryTrigger("action", rest_client=self.client).sync_invoke({})
+        self.assertFalse(ret.stats.failure)
+        self.assertEqual(ret.request_id, "finished")
+        self.assertTrue(ret.executionResult.stats.cold_start)
+        self.assertEqual(ret.executionResult.times.benchmark, 250_000)
+
+    def test_nonblocking(self):
+        trigger = LibraryTrigger("action", rest_client=self.client)
+        nb_result = trigger.openwhisk_nonblocking_invoke({})
+        self.assertFalse(nb_result.failure)
+        self.assertEqual(nb_result.request_id, "queued")
+        # The activation is not finished for the first two requests
+        self.assertIsNone(trigger.fetch_nb_result(nb_result))
+        ret = trigger.parse_nb_results(nb_result)
+        self.assertFalse(ret.stats.failure)
+        self.assertEqual(ret.request_id, "queued")
+
+    def test_blocking_timeout(self):
+        trigger = LibraryTrigger("slow", rest_client=self.client, timeout=0)
+        with mock.patch.object(triggers, "ACTIVATION_MARGIN", 0.5):
+            ret = trigger.sync_invoke({})
+        self.assertTrue(ret.stats.failure)
+        self.assertIn("lost", ret.failureReason)
+
+    def test_missing_activation(self):
+        trigger = LibraryTrigger("action", rest_client=self.client)
+        nb_result = NonBlockingExecutionResult()
+        nb_result.request_id = "lost"
+        self.assertIsNone(trigger.fetch_nb_result(nb_result))
+
+    def test_nonblocking_timeout(self):
+        trigger = LibraryTrigger("action", rest_client=self.client, timeout=0)
+        nb_result = NonBlockingExecutionResult()
+        nb_result.request_id = "lost"
+        with mock.patch.object(triggers, "ACTIVATION_MARGIN", 0.5):
+            ret = trigger.parse_nb_results(nb_result)
+        self.assertTrue(ret.stats.failure)
+        self.assertEqual(ret.request_id, "lost")
+
+
+if __name__ == "__main__":
+    unittest.main()
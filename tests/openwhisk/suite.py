@@ -0,0 +1,9 @@
+import unittest
+
+from .invoke_function_rest import OpenWhiskInvokeFunctionREST
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(OpenWhiskInvokeFunctionREST))
+    return suite
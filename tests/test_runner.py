@@ -10,7 +10,7 @@ PROJECT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.path.
 sys.path.append(PROJECT_DIR)
 
 parser = argparse.ArgumentParser(description="Run tests.")
-parser.add_argument("--deployment", choices=["aws", "azure", "local"], nargs="+")
+parser.add_argument("--deployment", choices=["aws", "azure", "local", "openwhisk"], nargs="+")
 
 args = parser.parse_args()
 if not args.deployment:
@@ -37,11 +37,18 @@ class TracingStreamResult(testtools.StreamResult):
         elif kwargs["test_status"] == "success":
             print('{0[test_id]}: {0[test_status]}'.format(kwargs))
 
-cases = []
+# Tests of the benchmarking client itself do not need a deployment
+from cache import suite as cache_suite
+from experiments import suite as experiments_suite
+cases = list(cache_suite.suite()) + list(experiments_suite.suite())
 if "aws" in args.deployment:
     from aws import suite
     for case in suite.suite():
         cases.append(case)
+if "openwhisk" in args.deployment:
+    from openwhisk import suite as openwhisk_suite
+    for case in openwhisk_suite.suite():
+        cases.append(case)
 tests = []
 for case in cases:
     for c in case:
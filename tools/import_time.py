@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.path.pardir)
+CLI = os.path.join(PROJECT_DIR, "sebs.py")
+# Imported only by the commands which need them
+HEAVY_MODULES = [
+    "matplotlib",
+    "pandas",
+    "scipy",
+    "seaborn",
+    "tqdm",
+    "numpy",
+    "docker",
+    "boto3",
+    "botocore",
+    "google",
+    "azure",
+    "sebs.aws",
+    "sebs.azure",
+    "sebs.gcp",
+    "sebs.regression",
+]
+
+parser = argparse.ArgumentParser(description="Check import time of the SeBS CLI.")
+parser.add_argument("--repetitions", default=5, type=int, help="Runs of the CLI.")
+parser.add_argument(
+    "--budget", default=1.0, type=float, help="Maximal median startup time in seconds."
+)
+parser.add_argument("--top", default=10, type=int, help="Number of slowest imports to print.")
+parser.add_argument(
+    "--command", default="--help", type=str, help="Arguments of the CLI, e.g., 'local --help'."
+)
+args = parser.parse_args()
+
+
+def loaded_modules() -> set:
+    # Runs the CLI as __main__, click exits after printing help
+    script = (
+        "import runpy, sys\n"
+        f"sys.argv = [{CLI!r}] + {args.command.split()!r}\n"
+        "try:\n"
+        f"    runpy.run_path({CLI!r}, run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "sys.stderr.write('\\n'.join(sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    return set(out.stderr.splitlines())
+
+
+def slowest_imports(count: int):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI] + args.command.split(),
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    imports = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Only top-level imports, nested ones are included in their parent
+        if not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def startup_time() -> float:
+    begin = time.perf_counter()
+    subprocess.run(
+        [sys.executable, CLI] + args.command.split(),
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - begin
+
+
+ret = 0
+modules = loaded_modules()
+heavy = [
+    name
+    for name in HEAVY_MODULES
+    if any(module == name or module.startswith(name + ".") for module in modules)
+]
+if heavy:
+    print(f"Modules imported at startup of the CLI: {', '.join(heavy)}")
+    ret = 1
+
+print("Slowest imports (cumulative, us):")
+for cumulative, name in slowest_imports(args.top):
+    print(f"{cumulative:>10} {name}")
+
+times = [startup_time() for _ in range(args.repetitions)]
+median = statistics.median(times)
+print(f"Startup time of 'sebs.py {args.command}': median {median:.3f} s, max {max(times):.3f} s")
+if median > args.budget:
+    print(f"Startup time exceeds the budget of {args.budget:.3f} s")
+    ret = 1
+sys.exit(ret)
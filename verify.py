@@ -1,47 +1,23 @@
 """Verify that generated schedule actually fits in DURATION and is interleaved"""
 
-import heapq
-from typing import List
-import json
+import sys
+from collections import Counter
 
-class ScheduleObject:
-    fn_name: str
-    timestamp: int
-    
-    def __init__(self, fn_name, timestamp):
-        self.fn_name = fn_name
-        self.timestamp = timestamp
-        
-    def __repr__(self) -> str:
-        return f"{self.fn_name}@{self.timestamp}"
-        
-    def __lt__(self, other: "ScheduleObject"):
-        return self.timestamp < other.timestamp
-        
+from sebs.experiments.schedule import ScheduleConfig
 
-schedule_file = "generated_schedule.json"
-with open(schedule_file, "r") as inf:
-    schedule = json.load(inf)
+schedule_file = sys.argv[1] if len(sys.argv) > 1 else "generated_schedule.json"
+schedule = ScheduleConfig.load(schedule_file)
 
-traces: List[ScheduleObject] = []
+for name, count in schedule.unsorted.items():
+    print(f"{name}: {count} invocations out of order")
 
-fn_counts = {}
-
-for fn_obj in schedule["functions"]:
-    name = fn_obj["name"]
-    invocations = fn_obj["invocations"]
-    
-    print(fn_obj["name"])
-    for timestamp in invocations:
-        so = ScheduleObject(name, timestamp)
-        traces.append(so)
-    
-    fn_counts[name] = len(invocations)
-
-traces.sort(key=lambda so: so.timestamp)
+fn_counts = Counter()
 
 with open("verification.txt", "w") as outf:
-    for so in traces:
-        outf.write(f"{so}\n")
-    for name in fn_counts.keys():
-        outf.write(f"{name}: {fn_counts[name]}\n")
\ No newline at end of file
+    # Same k-way merge of per-function streams as used by the scheduler
+    for so in schedule.schedule:
+        outf.write(f"{so.fn_name}@{so.timestamp}\n")
+        fn_counts[so.fn_name] += 1
+    for name in schedule.fns:
+        print(name)
+        outf.write(f"{name}: {fn_counts[name]}\n")